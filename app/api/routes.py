@@ -3,13 +3,15 @@ from fastapi.responses import FileResponse
 from fastapi.security import APIKeyHeader
 from app.core import settings, logger, get_scheduler_jobs
 from app.modules import Alist2Strm
+from app.modules.alist2strm.catalog import AlistCatalog
 from pydantic import BaseModel
 import traceback
 from contextlib import suppress
 import asyncio
 import os
 from typing import Dict, List, Optional, Set
-from app.core.state import running_tasks
+from app.core.state import running_tasks, running_pipelines
+from app.utils import HTTPClient, RateLimiter, TTLCache
 from app.utils.bot import send_message
 
 api_key_header = APIKeyHeader(name="Authorization")
@@ -71,7 +73,11 @@ async def task_worker():
             # 使用信号量限制并发
             async with semaphore:
                 logger.info(f"开始执行任务: {task_id}")
-                await Alist2Strm(**new_server).run()
+                alist2strm = Alist2Strm(**new_server)
+                if new_server.get("resign"):
+                    await alist2strm.resign()
+                else:
+                    await alist2strm.run()
                 msg = f"任务 {task_id} 已完成"
                 if new_server.get("done_msg"):
                     msg += f" - {new_server.get('done_msg')}"
@@ -89,16 +95,20 @@ async def task_worker():
             
 asyncio.create_task(task_worker())
 
-async def execute_single_task(task_id: str, sub_dir: str = "", done_msg: str = ""):
+async def execute_single_task(
+    task_id: str, sub_dir: str = "", done_msg: str = "", resign: bool = False
+):
     """
     提交任务到队列
 
     :param task_id: 任务 ID
     :param sub_dir: 子目录
     :param done_msg: 任务完成回调消息
+    :param resign: 是否只使用新的签名令牌重新生成 .strm 文件（不列出 Alist 目录）
     :return: 提交结果
     """
-    if not settings.AlistServerList:
+    servers = await asyncio.to_thread(lambda: settings.AlistServerList)
+    if not servers:
         raise HTTPException(status_code=404, detail="未检测到任何 Alist2Strm 模块配置")
 
     # 检查任务是否已经在运行或排队
@@ -106,7 +116,7 @@ async def execute_single_task(task_id: str, sub_dir: str = "", done_msg: str = "
         return {"status": "warning", "message": f"任务 {task_id} 已在运行或排队中"}
 
     # 查找任务配置
-    server = next((s for s in settings.AlistServerList if s["id"] == task_id), None)
+    server = next((s for s in servers if s["id"] == task_id), None)
     if not server:
         raise HTTPException(status_code=404, detail=f"未找到 ID 为 {task_id} 的任务")
 
@@ -114,6 +124,7 @@ async def execute_single_task(task_id: str, sub_dir: str = "", done_msg: str = "
         # 将任务添加到队列并更新状态为 "排队中"
         new_server = server.copy()
         new_server["done_msg"] = done_msg
+        new_server["resign"] = resign
         if sub_dir:
             new_server["source_dir"] = new_server["source_dir"] + "/" + sub_dir
             new_server["target_dir"] = new_server["target_dir"] + "/" + sub_dir
@@ -141,6 +152,112 @@ async def trigger_alist2strm(request: TaskRequest = None):
     # 调用封装的任务执行逻辑
     return await execute_single_task(request.task_id)
 
+@router.post("/strm/resign")
+async def resign_alist2strm(request: TaskRequest = None):
+    """
+    更换签名令牌后重新生成任务的 .strm 文件，从本地目录读取文件列表，不列出 Alist 目录
+
+    :param request: 任务请求参数
+    """
+    if not request or not request.task_id:
+        return {"status": "failed", "message": "未指定 task_id"}
+
+    return await execute_single_task(request.task_id, resign=True)
+
+@router.get("/strm/stats")
+async def get_alist2strm_stats():
+    """
+    获取正在运行的 Alist2Strm 任务流水线各阶段的队列深度及处理计数
+    """
+    return {
+        task_id: pipeline.stats for task_id, pipeline in running_pipelines.items()
+    }
+
+@router.get("/alist/limits")
+async def get_alist_limits():
+    """
+    获取各 Alist 服务器限流器的限额及排队情况
+    """
+    return RateLimiter.all_stats()
+
+@router.get("/http/pools")
+async def get_http_pools():
+    """
+    获取各 HTTP 客户端的连接池状态
+    """
+    return HTTPClient.all_pool_stats()
+
+@router.get("/alist/cache")
+async def get_alist_cache():
+    """
+    获取 Alist 用户信息、存储列表及文件列表缓存的条目数及命中率
+    """
+    return TTLCache.all_stats()
+
+async def get_catalog(task_id: str) -> AlistCatalog:
+    """
+    校验任务 ID 并返回本地目录
+    """
+    servers = await asyncio.to_thread(lambda: settings.AlistServerList)
+    if not any(s["id"] == task_id for s in servers):
+        raise HTTPException(status_code=404, detail=f"未找到 ID 为 {task_id} 的任务")
+    return AlistCatalog()
+
+@router.get("/catalog/{task_id}")
+async def list_catalog(task_id: str, prefix: str = "/", limit: int = 100, offset: int = 0):
+    """
+    按路径前缀列出任务本地目录中记录的 Alist 路径
+
+    :param task_id: 任务 ID
+    :param prefix: 路径前缀
+    :param limit: 返回数量
+    :param offset: 偏移量
+    """
+    catalog = await get_catalog(task_id)
+    items = await asyncio.to_thread(catalog.list_prefix, task_id, prefix, limit, offset)
+    total = await asyncio.to_thread(catalog.count_prefix, task_id, prefix)
+    return {"items": items, "total": total}
+
+@router.get("/catalog/{task_id}/search")
+async def search_catalog(task_id: str, name: str, limit: int = 100, offset: int = 0):
+    """
+    按名称搜索任务本地目录中记录的 Alist 路径
+
+    :param task_id: 任务 ID
+    :param name: 名称关键字
+    :param limit: 返回数量
+    :param offset: 偏移量
+    """
+    catalog = await get_catalog(task_id)
+    items = await asyncio.to_thread(catalog.search, task_id, name, limit, offset)
+    total = await asyncio.to_thread(catalog.count_search, task_id, name)
+    return {"items": items, "total": total}
+
+@router.get("/catalog/{task_id}/path")
+async def get_catalog_path(task_id: str, path: str):
+    """
+    查询某个 Alist 路径是否已记录在任务本地目录中
+
+    :param task_id: 任务 ID
+    :param path: Alist 路径
+    """
+    catalog = await get_catalog(task_id)
+    item = await asyncio.to_thread(catalog.get, task_id, path)
+    if item is None:
+        raise HTTPException(status_code=404, detail=f"本地目录中未找到 {path}")
+    return item
+
+@router.get("/catalog/{task_id}/runs")
+async def get_catalog_runs(task_id: str, limit: int = 10):
+    """
+    获取任务最近的运行记录及目录树变化
+
+    :param task_id: 任务 ID
+    :param limit: 返回数量
+    """
+    catalog = await get_catalog(task_id)
+    return await asyncio.to_thread(catalog.runs, task_id, limit)
+
 class LogResponse(BaseModel):
     files: List[str]
     total: int
@@ -38,16 +38,15 @@ async def refresh_fs_list(task_id: str, sub_dir: str = "") -> bool:
     """
     刷新文件列表缓存
     """
-    server = next((s for s in settings.AlistServerList if s["id"] == task_id), None)
+    servers = await asyncio.to_thread(lambda: settings.AlistServerList)
+    server = next((s for s in servers if s["id"] == task_id), None)
     if not server:
         raise HTTPException(status_code=404, detail=f"未找到 ID 为 {task_id} 的任务")
     url = server.get("url", "")
     username = server.get("username", "")
     password = server.get("password", "")
     token = server.get("token", "")
-    client = AlistClient(
-        url, username, password, token
-    )
+    client = await AlistClient.connect(url, username, password, token)
 
     """递归刷新文件列表缓存"""
     async def refresh_fs_list_task(path: str):
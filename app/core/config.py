@@ -1,3 +1,4 @@
+from os import environ
 from pathlib import Path
 from yaml import safe_load
 
@@ -25,6 +26,20 @@ class SettingManager:
     WEBHOOK_TOKEN: str = "12345"
     TELEGRAM_API_KEY: str = ""
     TELEGRAM_USER_ID: str = ""
+    # HTTP 客户端设置
+    HTTP2: bool = True
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_KEEPALIVE_EXPIRY: float = 5.0
+    HTTP_TIMEOUT: float = 10
+    HTTP_CONNECT_TIMEOUT: float = 5
+    HTTP_TIMEOUTS: dict[str, float] = {}
+    HTTP_CLIENT_IDLE_TTL: float = 300
+    # Alist 用户信息及存储列表的缓存时间
+    ALIST_METADATA_TTL: float = 300
+    # Alist 文件列表的缓存时间及最大缓存目录数
+    FS_LIST_CACHE_TTL: float = 60
+    FS_LIST_CACHE_SIZE: int = 1024
 
     def __init__(self) -> None:
         """
@@ -59,6 +74,20 @@ class SettingManager:
             self.WEBHOOK_TOKEN = content.get("WEBHOOK_TOKEN", "12345")
             self.TELEGRAM_API_KEY = content.get("TELEGRAM_API_KEY", "")
             self.TELEGRAM_USER_ID = content.get("TELEGRAM_USER_ID", "")
+            self.HTTP2 = content.get("HTTP2", True)
+            self.HTTP_MAX_CONNECTIONS = content.get("HTTP_MAX_CONNECTIONS", 100)
+            self.HTTP_MAX_KEEPALIVE_CONNECTIONS = content.get(
+                "HTTP_MAX_KEEPALIVE_CONNECTIONS", 20
+            )
+            self.HTTP_KEEPALIVE_EXPIRY = content.get("HTTP_KEEPALIVE_EXPIRY", 5.0)
+            self.HTTP_TIMEOUT = content.get("HTTP_TIMEOUT", 10)
+            self.HTTP_CONNECT_TIMEOUT = content.get("HTTP_CONNECT_TIMEOUT", 5)
+            self.HTTP_TIMEOUTS = content.get("HTTP_TIMEOUTS") or {}
+            self.HTTP_CLIENT_IDLE_TTL = content.get("HTTP_CLIENT_IDLE_TTL", 300)
+            self.ALIST_METADATA_TTL = content.get("ALIST_METADATA_TTL", 300)
+            self.FS_LIST_CACHE_TTL = content.get("FS_LIST_CACHE_TTL", 60)
+            self.FS_LIST_CACHE_SIZE = content.get("FS_LIST_CACHE_SIZE", 1024)
+
     @property
     def BASE_DIR(self) -> Path:
         """
@@ -69,15 +98,19 @@ class SettingManager:
     @property
     def CONFIG_DIR(self) -> Path:
         """
-        配置文件路径
+        配置文件路径，可通过环境变量 AUTOFILM_CONFIG_DIR 指定
         """
+        if environ.get("AUTOFILM_CONFIG_DIR"):
+            return Path(environ["AUTOFILM_CONFIG_DIR"])
         return self.BASE_DIR / "config"
 
     @property
     def LOG_DIR(self) -> Path:
         """
-        日志文件路径
+        日志文件路径，可通过环境变量 AUTOFILM_LOG_DIR 指定
         """
+        if environ.get("AUTOFILM_LOG_DIR"):
+            return Path(environ["AUTOFILM_LOG_DIR"])
         return self.BASE_DIR / "logs"
 
     @property
@@ -87,6 +120,13 @@ class SettingManager:
         """
         return self.CONFIG_DIR / "config.yaml"
 
+    @property
+    def CATALOG(self) -> Path:
+        """
+        Alist 目录树本地数据库
+        """
+        return self.CONFIG_DIR / "catalog.db"
+
     @property
     def LOG(self) -> Path:
         """
@@ -103,6 +143,18 @@ class SettingManager:
             alist_server_list = safe_load(file).get("Alist2StrmList", [])
         return alist_server_list
 
+    @property
+    def AlistLimitList(self) -> list[dict[str, any]]:
+        with self.CONFIG.open(mode="r", encoding="utf-8") as file:
+            alist_limit_list = safe_load(file).get("AlistLimitList", None) or []
+        return alist_limit_list
+
+    @property
+    def ProviderProfiles(self) -> dict[str, dict[str, any]]:
+        with self.CONFIG.open(mode="r", encoding="utf-8") as file:
+            provider_profiles = safe_load(file).get("ProviderProfiles", None) or {}
+        return provider_profiles
+
     @property
     def Ani2AlistList(self) -> list[dict[str, any]]:
         with self.CONFIG.open(mode="r", encoding="utf-8") as file:
@@ -1,4 +1,7 @@
-from typing import Set
+from typing import Any, Dict, Set
 
 # 存储所有正在运行的任务（包括手动触发和定时触发）
-running_tasks: Set[str] = set()
\ No newline at end of file
+running_tasks: Set[str] = set()
+
+# 正在运行的 Alist2Strm 流水线（任务 ID -> Pipeline 对象），用于查看各阶段队列深度
+running_pipelines: Dict[str, Any] = {}
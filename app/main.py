@@ -14,6 +14,7 @@ from apscheduler.triggers.cron import CronTrigger
 from app.core import settings, logger, scheduler
 from app.extensions import LOGO
 from app.modules import Alist2Strm, Ani2Alist
+from app.modules.alist2strm.catalog import AlistCatalog
 from app.core.state import running_tasks
 
 
@@ -47,6 +48,10 @@ if __name__ == "__main__":
     logger.info(f"AutoFilm {settings.APP_VERSION} 启动中...")
     logger.debug(f"是否开启 DEBUG 模式: {settings.DEBUG}")
 
+    # 在事件循环启动前打开本地数据库，避免首次执行任务时阻塞事件循环
+    if settings.AlistServerList:
+        AlistCatalog()
+
     # 启动 FastAPI 服务
     if settings.ENABLE_API:
         api_thread = threading.Thread(target=run_fastapi, daemon=True)
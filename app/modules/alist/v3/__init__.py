@@ -1,3 +1,3 @@
 from app.modules.alist.v3.client import AlistClient
-from app.modules.alist.v3.path import AlistPath
+from app.modules.alist.v3.path import AlistPath, AlistServerInfo
 from app.modules.alist.v3.storage import AlistStorage
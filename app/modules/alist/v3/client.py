@@ -1,22 +1,79 @@
-from typing import Callable, AsyncGenerator
-from time import time
-
-from httpx import get, post, Response
-
-from app.core import logger
-from app.utils import HTTPClient, Multiton
-from app.modules.alist.v3.path import AlistPath
+from asyncio import (
+    Queue,
+    QueueFull,
+    CancelledError,
+    Semaphore,
+    Task,
+    as_completed,
+    create_task,
+    gather,
+    sleep,
+    to_thread,
+)
+from base64 import urlsafe_b64decode
+from contextlib import AsyncExitStack, asynccontextmanager
+from datetime import datetime
+from itertools import count
+from json import loads
+from typing import (
+    Callable,
+    AsyncGenerator,
+    AsyncIterable,
+    AsyncIterator,
+    Generator,
+    Iterable,
+)
+from time import monotonic, time
+from urllib.parse import quote, urlsplit
+
+from httpx import HTTPStatusError, Response
+
+from app.core import logger, settings
+from app.utils import (
+    HTTPClient,
+    Multiton,
+    RateLimiter,
+    Retry,
+    SingleFlight,
+    TTLCache,
+)
+from app.modules.alist.v3.path import AlistPath, AlistServerInfo
 from app.modules.alist.v3.storage import AlistStorage
+from app.modules.alist.v3.webdav import PROPFIND_BODY, PropfindParser
 
 
 class AlistClient(metaclass=Multiton):
     """
     Alist 客户端 API
+    通过 await AlistClient.connect(...) 获取已登录并缓存用户信息的客户端，
+    构造函数本身不发送请求
     """
 
     __HEADERS = {
         "Content-Type": "application/json",
     }
+    # 无法从令牌中解析过期时间时使用的有效期（alist 令牌默认有效期为 2 天）
+    TOKEN_TTL: int = 2 * 24 * 60 * 60
+    # 令牌剩余有效期小于该值时在后台提前刷新（秒）
+    TOKEN_REFRESH_AHEAD: int = 10 * 60
+    # Alist WebDAV 路径前缀
+    WEBDAV_PREFIX: str = "/dav"
+    # 搜索结果默认每页数量
+    SEARCH_PER_PAGE: int = 100
+    # 搜索索引默认的最大有效时间（秒），超过时视为过旧
+    SEARCH_INDEX_MAX_AGE: float = 24 * 60 * 60
+    # 已释放、等待空闲后关闭的客户端
+    __closing: set[Task] = set()
+    # /api/me 及存储列表缓存，同一服务器的客户端共享
+    __me_cache = TTLCache("alist_me", settings.ALIST_METADATA_TTL)
+    __storage_cache = TTLCache("alist_storage_list", settings.ALIST_METADATA_TTL)
+    # 文件列表缓存，避免 Webhook、手动及定时任务短时间内重复列出相同目录
+    __fs_list_cache = TTLCache(
+        "alist_fs_list", settings.FS_LIST_CACHE_TTL, settings.FS_LIST_CACHE_SIZE
+    )
+    # 每次请求第一页时分配的列表编号，其余页的缓存键包含该编号，
+    # 同一目录不同时间获取的页不会混合返回
+    __listing_ids = count(1)
 
     def __init__(
         self,
@@ -34,55 +91,221 @@ class AlistClient(metaclass=Multiton):
         :param token: Alist 永久令牌
         """
 
-        self.__client = HTTPClient()
         self.__token = {
             "token": "",  # 令牌 token str
             "expires": 0,  # 令牌过期时间（时间戳，-1为永不过期） int
         }
         self.base_path = ""
         self.id = 0
+        self.__flights = SingleFlight()  # 合并并发的登录及用户信息请求
+        self.__refresh_task: Task | None = None  # 后台提前刷新令牌的任务
+
+        self.url = self.normalize_url(url)
+        self.__limiter = RateLimiter.get(self.url)  # 同一服务器的所有任务共享限额
+        # 请求结果反馈给服务器限流器的自适应并发控制器
+        self.__client = HTTPClient(
+            controller=self.__limiter.controller,
+            hedger=self.__limiter.hedger,
+            name=self.url,
+        )
+        # 存储驱动与上级目录不同的目录（挂载点）-> 存储驱动，用于选择驱动对应的限额
+        self.__providers: dict[str, str] = {}
 
-        if not url.startswith("http"):
-            url = "https://" + url
-        self.url = url.rstrip("/")
-
+        self.__username = str(username or "")
+        self.___password = str(password or "")
         if token != "":
             self.__token["token"] = token
             self.__token["expires"] = -1
         elif username != "" and password != "":
-            self.__username = str(username)
-            self.___password = str(password)
+            pass
         else:
             raise ValueError("用户名及密码为空或令牌 Token 为空")
+        self.__config = (self.url, self.__username, self.___password, str(token))
+
+    @staticmethod
+    def normalize_url(url: str) -> str:
+        """
+        规范化 Alist 服务器地址（补全协议、去除末尾的 /）
+
+        :param url: Alist 服务器地址
+        :return: 规范化后的地址
+        """
+        if not url.startswith("http"):
+            url = "https://" + url
+        return url.rstrip("/")
+
+    @classmethod
+    async def connect(
+        cls,
+        url: str,
+        username: str,
+        password: str,
+        token: str = "",
+    ) -> "AlistClient":
+        """
+        获取 Alist 客户端，并异步获取（缓存的）用户信息
+        同一配置复用同一个客户端，配置文件中已不存在的客户端会被释放
+
+        :param url: Alist 服务器地址
+        :param username: Alist 用户名
+        :param password: Alist 密码
+        :param token: Alist 永久令牌
+        :return: AlistClient 对象
+        """
+        client = cls(url, username, password, token)
+        await cls.release_stale(keep=client)
+        await client.async_api_me()
+        return client
+
+    @classmethod
+    async def release_stale(cls, keep: "AlistClient | None" = None) -> None:
+        """
+        释放配置已变化（配置文件中不再存在对应的服务器地址及账户）的客户端
+
+        :param keep: 不释放的客户端
+        """
+        servers = await to_thread(
+            lambda: (settings.AlistServerList or []) + (settings.Ani2AlistList or [])
+        )
+        configured = {
+            (
+                cls.normalize_url(server.get("url", "")),
+                str(server.get("username") or ""),
+                str(server.get("password") or ""),
+                str(server.get("token") or ""),
+            )
+            for server in servers
+            if server.get("url")
+        }
+        for client in cls.instances():
+            if client is keep or client.__config in configured:
+                continue
+            logger.debug(f"{client.url} 的配置已变化，释放旧的 Alist 客户端")
+            cls.release(client)
+            # 仍在运行的任务可能正在使用该客户端，空闲后再关闭
+            task = create_task(client.__close_when_idle())
+            cls.__closing.add(task)
+            task.add_done_callback(cls.__closing.discard)
+
+    async def __close_when_idle(self, idle: float = 60) -> None:
+        """
+        客户端空闲（没有进行中的请求）超过 idle 秒后关闭
 
-        self.sync_api_me()
+        :param idle: 空闲时间（秒）
+        """
+        while True:
+            wait = idle - (monotonic() - self.__client.last_used)
+            if self.__client.inflight == 0 and wait <= 0:
+                break
+            await sleep(max(wait, 1))
+        await self.close()
 
     async def close(self) -> None:
         """
         关闭 HTTP 客户端
         """
-        await self.__client.close()
+        if self.__refresh_task is not None:
+            self.__refresh_task.cancel()
+        await self.__client.async_close()
 
     async def __request(
         self,
         method: str,
         url: str,
         auth: bool = True,
+        provider: str = "",
         **kwargs,
     ) -> Response:
         """
         发送 HTTP 请求
+        请求先后经过存储驱动对应的限流器及服务器限流器
+        令牌失效（401）时重新登录并重试一次
 
         :param method 请求方法
         :param url 请求 url
         :param auth header 中是否带有 alist 认证令牌
+        :param provider 请求涉及的存储驱动，用于选择驱动对应的限额
         """
 
+        resp = await self.__send(method, url, auth, provider, **kwargs)
+        if auth and self.__can_login and self.__is_unauthorized(resp):
+            logger.debug(f"{self.username} 的令牌已失效，重新登录")
+            await self.__refresh_token(stale=resp.request.headers["Authorization"])
+            resp = await self.__send(method, url, auth, provider, **kwargs)
+        return resp
+
+    async def __send(
+        self, method: str, url: str, auth: bool, provider: str, **kwargs
+    ) -> Response:
+        """
+        经过限流器发送 HTTP 请求（参数同 __request）
+        """
         if auth:
-            headers = kwargs.get("headers", self.__HEADERS.copy())
-            headers["Authorization"] = self.__get_token
+            headers = dict(kwargs.get("headers", self.__HEADERS))
+            headers["Authorization"] = await self.__get_token()
             kwargs["headers"] = headers
-        return await self.__client.request(method, url, **kwargs)
+        provider_limiter = RateLimiter.get_provider(self.url, provider)
+        if provider_limiter is None:
+            async with self.__limiter.limit():
+                return await self.__client.request(method, url, **kwargs)
+        async with provider_limiter.limit(), self.__limiter.limit():
+            return await self.__client.request(method, url, **kwargs)
+
+    @asynccontextmanager
+    async def __stream(
+        self, method: str, url: str, provider: str = "", **kwargs
+    ) -> AsyncIterator[Response]:
+        """
+        经过限流器发起流式请求，读取响应体期间占用限额
+
+        :param method 请求方法
+        :param url 请求 url
+        :param provider 请求涉及的存储驱动，用于选择驱动对应的限额
+        """
+        async with AsyncExitStack() as stack:
+            provider_limiter = RateLimiter.get_provider(self.url, provider)
+            if provider_limiter is not None:
+                await stack.enter_async_context(provider_limiter.limit())
+            await stack.enter_async_context(self.__limiter.limit())
+            yield await stack.enter_async_context(
+                self.__client.stream(method, url, **kwargs)
+            )
+
+    @staticmethod
+    def __is_unauthorized(resp: Response) -> bool:
+        """
+        判断响应是否为令牌失效
+        alist 令牌失效时 HTTP 状态码为 200，响应体以 {"code":401 开头，
+        只比较开头避免解析整个响应（如大目录的文件列表）
+        """
+        return resp.status_code == 401 or resp.content.startswith(b'{"code":401,')
+
+    def get_provider(self, path: str) -> str:
+        """
+        获取路径所在存储的驱动名称（根据已列出的目录推断）
+
+        :param path: 文件/目录路径
+        :return: 存储驱动名称，未知时返回空字符串
+        """
+        path = "/" + path.strip("/")
+        while True:
+            if path in self.__providers:
+                return self.__providers[path]
+            parent = path.rsplit("/", 1)[0] or "/"
+            if parent == path:
+                return ""
+            path = parent
+
+    def __set_provider(self, dir_path: str, provider: str) -> None:
+        """
+        记录目录列表返回的存储驱动，仅记录与上级目录不同的目录
+
+        :param dir_path: 目录路径
+        :param provider: 存储驱动名称
+        """
+        dir_path = "/" + dir_path.strip("/")
+        if provider and self.get_provider(dir_path) != provider:
+            self.__providers[dir_path] = provider
 
     async def __get(self, url: str, auth: bool = True, **kwargs) -> Response:
         """
@@ -119,29 +342,77 @@ class AlistClient(metaclass=Multiton):
         return self.___password
 
     @property
-    def __get_token(self) -> str:
+    def __can_login(self) -> bool:
+        """
+        是否可以使用用户名及密码重新登录
+        """
+        return self.__token["expires"] != -1 and bool(self.__username)
+
+    async def __get_token(self) -> str:
         """
         返回可用登录令牌
+        令牌过期时等待重新登录；即将过期时在后台提前刷新，当前请求继续使用旧令牌
 
         :return: 登录令牌 token
         """
 
         if self.__token["expires"] == -1:
-            logger.debug("使用永久令牌")
             return self.__token["token"]
-        else:
-            logger.debug("使用临时令牌")
-            now_stamp = int(time())
 
-            if self.__token["expires"] < now_stamp:  # 令牌过期需要重新更新
-                self.__token["token"] = self.api_auth_login()
-                self.__token["expires"] = (
-                    now_stamp + 2 * 24 * 60 * 60 - 5 * 60
-                )  # 2天 - 5分钟（alist 令牌有效期为 2 天，提前 5 分钟刷新）
+        remaining = self.__token["expires"] - time()
+        if remaining <= 0:  # 令牌过期需要重新更新
+            return await self.__refresh_token()
+        if remaining < self.TOKEN_REFRESH_AHEAD and (
+            self.__refresh_task is None or self.__refresh_task.done()
+        ):
+            logger.debug(f"{self.username} 的令牌即将过期，后台刷新令牌")
+            self.__refresh_task = create_task(self.__refresh_token())
+            self.__refresh_task.add_done_callback(self.__refresh_done)
+        return self.__token["token"]
+
+    @staticmethod
+    def __refresh_done(task: Task) -> None:
+        """
+        后台刷新令牌结束，失败时记录日志（下次请求会再次尝试）
+        """
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"后台刷新令牌失败：{task.exception()}")
+
+    async def __refresh_token(self, stale: str | None = None) -> str:
+        """
+        重新登录并更新令牌
+        同时只有一个登录请求，其他调用等待并共享结果
 
+        :param stale: 已失效的令牌，当前令牌已不是该令牌（已被其他请求刷新）时直接返回
+        :return: 新的登录令牌 token
+        """
+        if stale is not None and self.__token["token"] != stale:
             return self.__token["token"]
 
-    def api_auth_login(self) -> str:
+        async def login() -> str:
+            token = await self.async_api_auth_login()
+            self.__token["token"] = token
+            self.__token["expires"] = self.__token_expires(token)
+            return token
+
+        return await self.__flights.do("login", login)
+
+    def __token_expires(self, token: str) -> int:
+        """
+        获取令牌过期时间
+        alist 令牌为 JWT，从中解析 exp 字段，无法解析时按 TOKEN_TTL 计算
+
+        :param token: 登录令牌
+        :return: 过期时间（时间戳）
+        """
+        try:
+            payload = token.split(".")[1]
+            payload += "=" * (-len(payload) % 4)
+            return int(loads(urlsafe_b64decode(payload))["exp"])
+        except (IndexError, KeyError, TypeError, ValueError):
+            return int(time()) + self.TOKEN_TTL
+
+    async def async_api_auth_login(self) -> str:
         """
         登录 Alist 服务器认证账户信息
 
@@ -149,7 +420,7 @@ class AlistClient(metaclass=Multiton):
         """
 
         json = {"username": self.username, "password": self.__password}
-        resp = post(self.url + "/api/auth/login", json=json)
+        resp = await self.__post(self.url + "/api/auth/login", auth=False, json=json)
         if resp.status_code != 200:
             raise RuntimeError(f"更新令牌请求发送失败，状态码：{resp.status_code}")
 
@@ -161,49 +432,113 @@ class AlistClient(metaclass=Multiton):
         logger.debug(f"{self.username} 更新令牌成功")
         return result["data"]["token"]
 
-    def sync_api_me(self) -> None:
+    async def async_api_me(self, refresh: bool = False) -> dict:
         """
         获取用户信息
         获取当前用户 base_path 和 id 并分别保存在 self.base_path 和 self.id 中
+        结果会被缓存，并发调用只发送一次请求
+
+        :param refresh: 是否忽略缓存重新获取
+        :return: 用户信息
         """
 
-        headers = self.__HEADERS.copy()
-        headers["Authorization"] = self.__get_token
-        resp = get(self.url + "/api/me", headers=headers)
+        async def fetch() -> dict:
+            resp = await self.__get(self.url + "/api/me", idempotent=True)
 
-        if resp.status_code != 200:
-            raise RuntimeError(f"获取用户信息请求发送失败，状态码：{resp.status_code}")
+            if resp.status_code != 200:
+                raise RuntimeError(
+                    f"获取用户信息请求发送失败，状态码：{resp.status_code}"
+                )
 
-        result = resp.json()
+            result = resp.json()
 
-        if result["code"] != 200:
-            raise RuntimeError(f'获取用户信息失败，错误信息：{result["message"]}')
+            if result["code"] != 200:
+                raise RuntimeError(f'获取用户信息失败，错误信息：{result["message"]}')
 
-        try:
-            self.base_path: str = result["data"]["base_path"]
-            self.id: int = result["data"]["id"]
-        except:
-            raise RuntimeError("获取用户信息失败")
+            if not isinstance(result["data"], dict) or not {
+                "base_path",
+                "id",
+            } <= result["data"].keys():
+                raise RuntimeError("获取用户信息失败")
+            return result["data"]
+
+        # 同一服务器、同一账户的客户端共享缓存
+        url, username, _, token = self.__config
+        me = await self.__me_cache.get_or_load((url, username, token), fetch, refresh)
+        self.base_path: str = me["base_path"]
+        self.id: int = me["id"]
+        return me
 
-    async def async_api_fs_list(self, dir_path: str, refresh: bool = False) -> list[AlistPath]:
+    def __fs_list_key(
+        self, dir_path: str, page: int, per_page: int, listing: int = 0
+    ) -> tuple:
         """
-        获取文件列表
+        文件列表某一页的缓存键：(服务器, 账户, 目录, 页码, 每页数量, 列表编号)
+        第一页的列表编号为 0，其余页为第一页响应中的 listing
+        """
+        url, username, _, token = self.__config
+        return (url, username, token, dir_path, page, per_page, listing)
+
+    async def __api_fs_list_page(
+        self,
+        dir_path: str,
+        page: int,
+        per_page: int,
+        refresh: bool,
+        bypass_cache: bool = False,
+        listing: int = 0,
+    ) -> dict:
+        """
+        获取文件列表的某一页
+        结果按 __fs_list_key 缓存，相同的并发请求只发送一次；
+        刷新 Alist 服务器缓存或 bypass_cache 为 True 时跳过缓存，并用新结果更新缓存
+        重新获取的第一页带有新的列表编号 listing，其余页只复用同一编号下缓存的结果
 
         :param dir_path: 目录路径
-        :return: AlistPath 对象列表
+        :param page: 页码（从 1 开始）
+        :param per_page: 每页数量，为 0 时返回全部
+        :param refresh: 是否刷新 Alist 服务器缓存
+        :param bypass_cache: 是否跳过本地缓存
+        :param listing: 第一页的列表编号（仅 page 大于 1 时有效）
+        :return: 响应中的 data 字段
         """
 
-        logger.debug(f"获取目录 {dir_path} 下的文件列表")
+        async def fetch() -> dict:
+            data = await self.__fetch_fs_list_page(dir_path, page, per_page, refresh)
+            if page == 1:
+                data["listing"] = next(self.__listing_ids)
+            return data
+
+        data = await self.__fs_list_cache.get_or_load(
+            self.__fs_list_key(dir_path, page, per_page, listing if page > 1 else 0),
+            fetch,
+            refresh or bypass_cache,
+        )
+        self.__set_provider(dir_path, data.get("provider") or "")
+        return data
+
+    async def __fetch_fs_list_page(
+        self, dir_path: str, page: int, per_page: int, refresh: bool
+    ) -> dict:
+        """
+        请求文件列表的某一页（参数同 __api_fs_list_page）
+        """
 
         json = {
             "path": dir_path,
             "password": "",
-            "page": 1,
-            "per_page": 0,
+            "page": page,
+            "per_page": per_page,
             "refresh": refresh,
         }
 
-        resp = await self.__post(self.url + "/api/fs/list", json=json)
+        resp = await self.__post(
+            self.url + "/api/fs/list",
+            json=json,
+            provider=self.get_provider(dir_path.rstrip("/") or "/"),
+            idempotent=True,
+            hedge=not refresh,  # 刷新列表会让 alist 重新请求存储，不发送对冲请求
+        )
         if resp.status_code != 200:
             raise RuntimeError(
                 f"获取目录 {dir_path} 的文件列表请求发送失败，状态码：{resp.status_code}"
@@ -216,22 +551,104 @@ class AlistClient(metaclass=Multiton):
                 f'获取目录 {dir_path} 的文件列表失败，错误信息：{result["message"]}'
             )
 
-        file_list = []
-        for alist_path in result["data"]["content"]:
-            file_list.append(alist_path["name"])
+        return result["data"]
 
-        logger.debug(f"获取目录 {dir_path} 的文件列表成功，刷新缓存：{refresh}，文件列表：{file_list}")
+    async def iter_fs_list(
+        self,
+        dir_path: str,
+        refresh: bool = False,
+        per_page: int = 0,
+        max_workers: int = 4,
+    ) -> AsyncGenerator[AlistPath, None]:
+        """
+        分页获取文件列表
+        第一页返回后并发获取其余页，每页解析完成后立即逐个返回其中的条目
+        各页均来自同一次获取（缓存中的页与重新获取的页不会混合返回）
 
-        if result["data"]["total"] == 0:
-            return []
-        return [
-            AlistPath(
-                server_url=self.url,
-                base_path=self.base_path,
-                path=dir_path + "/" + alist_path["name"],
-                **alist_path,
+        :param dir_path: 目录路径
+        :param refresh: 是否刷新 Alist 服务器缓存（仅第一页请求刷新，所有页均跳过本地缓存）
+        :param per_page: 每页数量，为 0 时一次性获取全部
+        :param max_workers: 同时获取的页数
+        :return: AlistPath 对象生成器
+        """
+
+        logger.debug(f"获取目录 {dir_path} 下的文件列表")
+
+        parent = dir_path.rstrip("/") + "/"
+        server = AlistServerInfo.get(self.url, self.base_path)
+
+        def to_paths(data: dict) -> Generator[AlistPath, None, None]:
+            provider = data.get("provider") or ""
+            for alist_path in data["content"] or []:
+                alist_path.setdefault("provider", provider)
+                yield AlistPath(
+                    server=server, path=parent + alist_path["name"], **alist_path
+                )
+
+        per_page = max(0, per_page)
+        started = next(self.__listing_ids)  # 之后获取的第一页编号均大于该值
+        data = await self.__api_fs_list_page(dir_path, 1, per_page, refresh)
+        last_page = (data["total"] + per_page - 1) // per_page if per_page else 1
+        if data["listing"] < started and not all(
+            self.__fs_list_key(dir_path, page, per_page, data["listing"])
+            in self.__fs_list_cache
+            for page in range(2, last_page + 1)
+        ):
+            # 第一页来自缓存而其余页已过期或被淘汰，重新获取第一页，避免新旧页混合
+            data = await self.__api_fs_list_page(
+                dir_path, 1, per_page, False, bypass_cache=True
             )
-            for alist_path in result["data"]["content"]
+        total = data["total"]
+        logger.debug(
+            f"获取目录 {dir_path} 的文件列表成功，刷新缓存：{refresh}，文件数：{total}"
+        )
+        for path in to_paths(data):
+            yield path
+
+        if per_page == 0 or total <= per_page:
+            return
+
+        semaphore = Semaphore(max(1, max_workers))
+
+        async def fetch_page(page: int) -> dict:
+            async with semaphore:
+                return await self.__api_fs_list_page(
+                    dir_path,
+                    page,
+                    per_page,
+                    False,
+                    bypass_cache=refresh,
+                    listing=data["listing"],
+                )
+
+        pages = [
+            create_task(fetch_page(page))
+            for page in range(2, (total + per_page - 1) // per_page + 1)
+        ]
+        try:
+            for future in as_completed(pages):
+                for path in to_paths(await future):
+                    yield path
+        finally:
+            for task in pages:
+                task.cancel()
+            await gather(*pages, return_exceptions=True)
+
+    async def async_api_fs_list(
+        self, dir_path: str, refresh: bool = False, per_page: int = 0
+    ) -> list[AlistPath]:
+        """
+        获取文件列表
+
+        :param dir_path: 目录路径
+        :param refresh: 是否刷新 Alist 服务器缓存
+        :param per_page: 每页数量，为 0 时一次性获取全部
+        :return: AlistPath 对象列表
+        """
+
+        return [
+            path
+            async for path in self.iter_fs_list(dir_path, refresh, per_page=per_page)
         ]
 
     async def async_api_fs_get(self, path: str) -> AlistPath:
@@ -250,7 +667,13 @@ class AlistClient(metaclass=Multiton):
             "refresh": False,
         }
 
-        resp = await self.__post(self.url + "/api/fs/get", json=json)
+        resp = await self.__post(
+            self.url + "/api/fs/get",
+            json=json,
+            provider=self.get_provider(path),
+            idempotent=True,
+            hedge=True,
+        )
         if resp.status_code != 200:
             raise RuntimeError(
                 f"获取路径 {path} 详细信息请求发送失败，状态码：{resp.status_code}"
@@ -264,32 +687,55 @@ class AlistClient(metaclass=Multiton):
 
         logger.debug(f"获取路径 {path} 详细信息成功")
         return AlistPath(
-            server_url=self.url,
-            base_path=self.base_path,
+            server=AlistServerInfo.get(self.url, self.base_path),
             path=path,
             **result["data"],
         )
 
-    async def async_api_admin_storage_list(self) -> list[AlistStorage]:
+    async def async_api_admin_storage_list(
+        self, refresh: bool = False
+    ) -> list[AlistStorage]:
         """
         列出存储列表 需要管理员用户权限
+        结果会被缓存，通过 AutoFilm 创建或更新存储后缓存失效
 
+        :param refresh: 是否忽略缓存重新获取
         :return: AlistStorage 对象列表
         """
 
-        resp = await self.__get(self.url + "/api/admin/storage/list")
-        if resp.status_code != 200:
-            raise RuntimeError(
-                f"获取存储器列表请求发送失败，状态码：{resp.status_code}"
+        return [
+            AlistStorage(**storage) for storage in await self.__storage_list(refresh)
+        ]
+
+    async def __storage_list(self, refresh: bool = False) -> list[dict]:
+        """
+        获取（缓存的）存储列表原始数据
+
+        :param refresh: 是否忽略缓存重新获取
+        :return: 存储信息字典列表
+        """
+
+        async def fetch() -> list[dict]:
+            resp = await self.__get(
+                self.url + "/api/admin/storage/list", idempotent=True
             )
+            if resp.status_code != 200:
+                raise RuntimeError(
+                    f"获取存储器列表请求发送失败，状态码：{resp.status_code}"
+                )
 
-        result = resp.json()
+            result = resp.json()
 
-        if result["code"] != 200:
-            raise RuntimeError(f'获取存储器列表失败，详细信息：{result["message"]}')
+            if result["code"] != 200:
+                raise RuntimeError(
+                    f'获取存储器列表失败，详细信息：{result["message"]}'
+                )
+
+            logger.debug("获取存储器列表成功")
+            return result["data"]["content"] or []
 
-        logger.debug("获取存储器列表成功")
-        return [AlistStorage(**storage) for storage in result["data"]["content"]]
+        # 缓存原始数据，每次返回新的对象，调用方修改对象不会影响缓存
+        return await self.__storage_cache.get_or_load(self.url, fetch, refresh)
 
     async def async_api_admin_storage_create(self, storage: AlistStorage) -> None:
         """
@@ -314,6 +760,7 @@ class AlistClient(metaclass=Multiton):
         }
 
         resp = await self.__post(self.url + "/api/admin/storage/create", json=json)
+        self.__storage_cache.invalidate(self.url)
         if resp.status_code != 200:
             raise RuntimeError(f"创建存储请求发送失败，状态码：{resp.status_code}")
         result = resp.json()
@@ -352,6 +799,7 @@ class AlistClient(metaclass=Multiton):
         }
 
         resp = await self.__post(self.url + "/api/admin/storage/update", json=json)
+        self.__storage_cache.invalidate(self.url)
         if resp.status_code != 200:
             raise RuntimeError(f"更新存储请求发送失败，状态码：{resp.status_code}")
 
@@ -370,29 +818,518 @@ class AlistClient(metaclass=Multiton):
         dir_path: str,
         is_detail: bool = True,
         filter: Callable[[AlistPath], bool] = lambda x: True,
+        max_workers: int = 1,
+        max_queue_size: int = 1024,
+        prune: Callable[[AlistPath, int], bool] = lambda x, count: False,
+        replay: Callable[[str], AsyncIterable[AlistPath]] | None = None,
+        max_detail_workers: int = 10,
+        per_page: int = 0,
+        backend: str = "api",
+        index_max_age: float = SEARCH_INDEX_MAX_AGE,
+        webdav_depth: str = "infinity",
     ) -> AsyncGenerator[AlistPath, None]:
         """
         异步路径列表生成器
         返回目录及其子目录的所有文件和目录的 AlistPath 对象
+        使用多个协程以广度优先的方式并发列出目录，结果按完成顺序返回
+        backend 为 search 时从 Alist 搜索索引中分页获取目录下的所有条目，
+        索引不存在、未完成或过旧时回退为逐个目录列出（search 方式下 prune 不生效）；
+        backend 为 webdav 时通过 WebDAV PROPFIND 列出，需要用户名及密码（详见 iter_webdav）
 
         :param dir_path: 目录路径
         :param is_detail：是否获取详细信息（raw_url）
         :param filter: 匿名函数过滤器（默认不启用）
+        :param max_workers: 同时列出目录（或获取搜索结果分页）的协程数（默认为 1）
+        :param max_queue_size: 待遍历目录队列及结果队列的最大长度
+        :param prune: 匿名函数剪枝器，列出目录后以目录 AlistPath 及其直接条目数调用，
+            返回 True 时不再列出该目录下的子目录（子目录本身仍会返回），起始目录不剪枝
+        :param replay: 返回已剪枝子目录的整个子树的函数（如从本地记录中还原），
+            为 None 时已剪枝子目录下的条目不会返回
+        :param max_detail_workers: 同时获取详细信息的协程数（仅 is_detail 为 True 时有效）
+        :param per_page: 列出目录（或搜索结果）时每页数量，为 0 时一次性获取全部目录列表、
+            搜索结果每页 SEARCH_PER_PAGE 条
+        :param backend: 列出方式，api（逐个目录列出）、search（搜索索引）或 webdav
+        :param index_max_age: 搜索索引的最大有效时间（秒），超过时视为过旧
+        :param webdav_depth: WebDAV 列出深度，infinity（一次请求列出整个目录树）或 1（逐个目录列出）
         :return: AlistPath 对象生成器
         """
 
-        for path in await self.async_api_fs_list(dir_path):
-            if path.is_dir:
-                async for child_path in self.iter_path(
-                    dir_path=path.path, is_detail=is_detail, filter=filter
+        if is_detail:  # 遍历与获取详细信息同时进行
+            async for path in self.iter_fs_get(
+                self.iter_path(
+                    dir_path=dir_path,
+                    is_detail=False,
+                    filter=filter,
+                    max_workers=max_workers,
+                    max_queue_size=max_queue_size,
+                    prune=prune,
+                    replay=replay,
+                    per_page=per_page,
+                    backend=backend,
+                    index_max_age=index_max_age,
+                    webdav_depth=webdav_depth,
+                ),
+                max_workers=max_detail_workers,
+                max_queue_size=max_queue_size,
+            ):
+                yield path
+            return
+
+        if backend == "search":
+            if await self.is_search_index_usable(index_max_age):
+                yielded = False
+                try:
+                    async for path in self.iter_search(
+                        dir_path,
+                        filter=filter,
+                        per_page=per_page or self.SEARCH_PER_PAGE,
+                        max_workers=max_workers,
+                    ):
+                        yielded = True
+                        yield path
+                    return
+                except RuntimeError as e:
+                    if yielded:
+                        raise
+                    logger.warning(f"搜索索引不可用：{e}")
+            logger.info(f"回退为逐个列出 {dir_path} 下的目录")
+        elif backend == "webdav":
+            if self.__username and self.__password:
+                async for path in self.iter_webdav(
+                    dir_path,
+                    depth=webdav_depth,
+                    filter=filter,
+                    max_workers=max_workers,
+                    max_queue_size=max_queue_size,
+                    prune=prune,
+                    replay=replay,
                 ):
-                    yield child_path
+                    yield path
+                return
+            logger.warning("WebDAV 需要用户名及密码，回退为通过 API 列出目录")
+        elif backend != "api":
+            raise ValueError(f"未知的列出方式 {backend}")
+
+        async for path in self.__iter_path_list(
+            dir_path,
+            lambda current: self.iter_fs_list(current, per_page=per_page),
+            filter,
+            max_workers,
+            max_queue_size,
+            prune,
+            replay,
+        ):
+            yield path
+
+    async def __iter_path_list(
+        self,
+        dir_path: str,
+        list_dir: Callable[[str], AsyncIterable[AlistPath]],
+        filter: Callable[[AlistPath], bool],
+        max_workers: int,
+        max_queue_size: int,
+        prune: Callable[[AlistPath, int], bool],
+        replay: Callable[[str], AsyncIterable[AlistPath]] | None = None,
+    ) -> AsyncGenerator[AlistPath, None]:
+        """
+        逐个列出目录的路径列表生成器（参数同 iter_path）
+        目录列出完成后才能得到其直接条目数，因此子目录在列出完成后再加入待遍历队列；
+        目录被剪枝时各子目录的整个子树由 replay 提供，不再列出
 
-            if filter(path):
-                if is_detail:
-                    yield await self.async_api_fs_get(path)
-                else:
+        :param list_dir: 列出单个目录下条目的函数
+        """
+
+        # 待遍历目录队列：(目录路径, 目录 AlistPath（起始目录为 None）, 是否由 replay 提供子树)
+        frontier: Queue[tuple[str, AlistPath | None, bool]] = Queue(
+            maxsize=max_queue_size
+        )
+        results: Queue[AlistPath | BaseException | None] = Queue(
+            maxsize=max_queue_size
+        )
+        pending = 1  # 已发现但尚未列出的目录数
+
+        async def worker() -> None:
+            nonlocal pending
+            while True:
+                stack = [await frontier.get()]
+                try:
+                    while stack:
+                        current, current_dir, replayed = stack.pop()
+                        if replayed:
+                            async for path in replay(current):
+                                if filter(path):
+                                    await results.put(path)
+                        else:
+                            count = 0
+                            sub_dirs: list[AlistPath] = []
+                            async for path in list_dir(current):
+                                count += 1
+                                if path.is_dir:
+                                    sub_dirs.append(path)
+                                if filter(path):
+                                    await results.put(path)
+
+                            pruned = current_dir is not None and prune(current_dir, count)
+                            if pruned and replay is None:
+                                sub_dirs = []
+                            for sub_dir in sub_dirs:
+                                child = (sub_dir.path, sub_dir, pruned)
+                                pending += 1
+                                try:
+                                    frontier.put_nowait(child)
+                                except QueueFull:  # 队列已满时由当前协程继续深度优先遍历
+                                    stack.append(child)
+
+                        pending -= 1
+                        if pending == 0:
+                            await results.put(None)
+                except CancelledError:
+                    raise
+                except BaseException as e:
+                    await results.put(e)
+                    return
+
+        frontier.put_nowait((dir_path, None, False))
+        workers = [create_task(worker()) for _ in range(max(1, max_workers))]
+        try:
+            while True:
+                item = await results.get()
+                if item is None:
+                    break
+                elif isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            for task in workers:
+                task.cancel()
+            await gather(*workers, return_exceptions=True)
+
+    async def async_api_admin_index_progress(self) -> dict:
+        """
+        获取搜索索引的构建进度 需要管理员用户权限
+
+        :return: 进度信息，包含 obj_count、is_done、last_done_time、error 等字段
+        """
+
+        resp = await self.__get(
+            self.url + "/api/admin/index/progress", idempotent=True
+        )
+        if resp.status_code != 200:
+            raise RuntimeError(
+                f"获取搜索索引进度请求发送失败，状态码：{resp.status_code}"
+            )
+
+        result = resp.json()
+
+        if result["code"] != 200:
+            raise RuntimeError(f'获取搜索索引进度失败，详细信息：{result["message"]}')
+
+        return result["data"]
+
+    async def is_search_index_usable(self, max_age: float) -> bool:
+        """
+        判断搜索索引是否可用：索引已构建完成、没有错误、包含条目且最后完成时间在 max_age 秒内
+
+        :param max_age: 索引的最大有效时间（秒），为 0 时不检查
+        :return: 是否可用
+        """
+        try:
+            progress = await self.async_api_admin_index_progress()
+        except RuntimeError as e:
+            logger.warning(f"无法获取搜索索引状态：{e}")
+            return False
+
+        if not progress.get("is_done") or progress.get("error"):
+            logger.warning(
+                f"搜索索引未完成或构建出错：{progress.get('error') or '正在构建'}"
+            )
+            return False
+        if not progress.get("obj_count"):
+            logger.warning("搜索索引为空")
+            return False
+        if max_age > 0:
+            try:
+                last_done = datetime.fromisoformat(progress["last_done_time"])
+            except (KeyError, TypeError, ValueError):
+                logger.warning("无法解析搜索索引的最后完成时间")
+                return False
+            age = time() - last_done.timestamp()
+            if age > max_age:
+                logger.warning(f"搜索索引已 {age / 3600:.1f} 小时未更新")
+                return False
+        return True
+
+    async def async_api_fs_search(
+        self,
+        parent: str,
+        keywords: str = "",
+        scope: int = 0,
+        page: int = 1,
+        per_page: int = SEARCH_PER_PAGE,
+    ) -> dict:
+        """
+        在搜索索引中搜索文件/目录
+
+        :param parent: 搜索的目录
+        :param keywords: 关键字，为空时返回目录下的所有条目
+        :param scope: 搜索范围，0 为全部，1 为仅目录，2 为仅文件
+        :param page: 页码（从 1 开始）
+        :param per_page: 每页数量
+        :return: 响应中的 data 字段，content 中的条目包含 parent、name、is_dir、size、type
+        """
+
+        json = {
+            "parent": parent,
+            "keywords": keywords,
+            "scope": scope,
+            "page": page,
+            "per_page": per_page,
+            "password": "",
+        }
+
+        resp = await self.__post(
+            self.url + "/api/fs/search", json=json, idempotent=True, hedge=True
+        )
+        if resp.status_code != 200:
+            raise RuntimeError(
+                f"搜索目录 {parent} 请求发送失败，状态码：{resp.status_code}"
+            )
+
+        result = resp.json()
+
+        if result["code"] != 200:
+            raise RuntimeError(
+                f'搜索目录 {parent} 失败，错误信息：{result["message"]}'
+            )
+
+        return result["data"]
+
+    async def iter_search(
+        self,
+        dir_path: str,
+        filter: Callable[[AlistPath], bool] = lambda x: True,
+        per_page: int = SEARCH_PER_PAGE,
+        max_workers: int = 4,
+    ) -> AsyncGenerator[AlistPath, None]:
+        """
+        从搜索索引中分页获取目录及其子目录下的所有文件和目录
+        第一页返回后并发获取其余页，结果按完成顺序返回
+        搜索结果没有修改时间、签名及哈希信息
+
+        :param dir_path: 目录路径
+        :param filter: 匿名函数过滤器
+        :param per_page: 每页数量
+        :param max_workers: 同时获取的页数
+        :return: AlistPath 对象生成器
+        """
+
+        server = AlistServerInfo.get(self.url, self.base_path)
+
+        def to_paths(data: dict) -> Generator[AlistPath, None, None]:
+            for item in data["content"] or []:
+                parent = item.pop("parent").rstrip("/")
+                path = AlistPath(
+                    server=server,
+                    path=parent + "/" + item["name"],
+                    provider=self.get_provider(parent or "/"),
+                    **item,
+                )
+                if filter(path):
+                    yield path
+
+        data = await self.async_api_fs_search(dir_path, page=1, per_page=per_page)
+        total = data["total"]
+        logger.debug(f"从搜索索引获取目录 {dir_path} 下的条目，共 {total} 条")
+        for path in to_paths(data):
+            yield path
+
+        if total <= per_page:
+            return
+
+        semaphore = Semaphore(max(1, max_workers))
+
+        async def fetch_page(page: int) -> dict:
+            async with semaphore:
+                return await self.async_api_fs_search(
+                    dir_path, page=page, per_page=per_page
+                )
+
+        pages = [
+            create_task(fetch_page(page))
+            for page in range(2, (total + per_page - 1) // per_page + 1)
+        ]
+        try:
+            for future in as_completed(pages):
+                for path in to_paths(await future):
                     yield path
+        finally:
+            for task in pages:
+                task.cancel()
+            await gather(*pages, return_exceptions=True)
+
+    async def iter_webdav(
+        self,
+        dir_path: str,
+        depth: str = "infinity",
+        filter: Callable[[AlistPath], bool] = lambda x: True,
+        max_workers: int = 1,
+        max_queue_size: int = 1024,
+        prune: Callable[[AlistPath, int], bool] = lambda x, count: False,
+        replay: Callable[[str], AsyncIterable[AlistPath]] | None = None,
+    ) -> AsyncGenerator[AlistPath, None]:
+        """
+        通过 WebDAV PROPFIND 列出目录及其子目录下的所有文件和目录
+        响应边接收边解析，返回的 AlistPath 与 API 列出的字段一致，但没有签名、哈希及缩略图，
+        修改时间精确到秒
+        depth 为 infinity 时一次请求返回整个目录树（prune 不生效），服务器拒绝时回退为 1；
+        depth 为 1 时以 max_workers 个协程逐个目录列出
+
+        :param dir_path: 目录路径
+        :param depth: PROPFIND 深度，infinity 或 1
+        :param filter: 匿名函数过滤器
+        :param max_workers: 同时列出目录的协程数（仅 depth 为 1 时有效）
+        :param max_queue_size: 待遍历目录队列及结果队列的最大长度（仅 depth 为 1 时有效）
+        :param prune: 匿名函数剪枝器（仅 depth 为 1 时有效）
+        :param replay: 返回已剪枝子目录整个子树的函数（仅 depth 为 1 时有效，详见 iter_path）
+        :return: AlistPath 对象生成器
+        """
+
+        dir_path = dir_path.rstrip("/") or "/"
+        if depth == "infinity":
+            yielded = False
+            try:
+                async for path in self.__propfind(dir_path, "infinity"):
+                    yielded = True
+                    if filter(path):
+                        yield path
+                return
+            except HTTPStatusError as e:
+                if yielded or e.response.status_code not in (400, 403, 501):
+                    raise
+                logger.warning(
+                    f"服务器不支持 Depth: infinity（状态码：{e.response.status_code}），"
+                    "改为逐个目录列出"
+                )
+
+        @Retry.async_retry(tries=3, delay=1, backoff=2, logger=logger)
+        async def list_dir(current: str) -> list[AlistPath]:
+            return [path async for path in self.__propfind(current, "1")]
+
+        async def iter_dir(current: str) -> AsyncGenerator[AlistPath, None]:
+            for path in await list_dir(current):
+                yield path
+
+        async for path in self.__iter_path_list(
+            dir_path, iter_dir, filter, max_workers, max_queue_size, prune, replay
+        ):
+            yield path
+
+    async def __propfind(
+        self, dir_path: str, depth: str
+    ) -> AsyncGenerator[AlistPath, None]:
+        """
+        发送 PROPFIND 请求，逐个返回目录下（不含目录本身）的条目
+
+        :param dir_path: 目录路径
+        :param depth: PROPFIND 深度
+        :return: AlistPath 对象生成器
+        """
+
+        logger.debug(f"通过 WebDAV 列出目录 {dir_path}，深度：{depth}")
+        server = AlistServerInfo.get(self.url, self.base_path)
+        dav_root = urlsplit(self.url).path.rstrip("/") + self.WEBDAV_PREFIX
+        parser = PropfindParser(dav_root)
+        url = self.url + self.WEBDAV_PREFIX + quote(dir_path.rstrip("/") + "/")
+
+        def to_paths(items: Iterable[dict]) -> Generator[AlistPath, None, None]:
+            for item in items:
+                if item["path"] == dir_path:
+                    continue
+                parent = item["path"].rsplit("/", 1)[0] or "/"
+                yield AlistPath(
+                    server=server, provider=self.get_provider(parent), **item
+                )
+
+        async with self.__stream(
+            "PROPFIND",
+            url,
+            provider=self.get_provider(dir_path),
+            headers={"Depth": depth, "Content-Type": "application/xml"},
+            content=PROPFIND_BODY,
+            auth=(self.__username, self.__password),
+        ) as resp:
+            if resp.status_code != 207:
+                resp.raise_for_status()
+                raise RuntimeError(
+                    f"WebDAV 列出目录 {dir_path} 失败，状态码：{resp.status_code}"
+                )
+            async for chunk in resp.aiter_bytes():
+                for path in to_paths(parser.feed(chunk)):
+                    yield path
+        for path in to_paths(parser.close()):
+            yield path
+
+    async def iter_fs_get(
+        self,
+        paths: AsyncIterable[AlistPath],
+        max_workers: int = 10,
+        max_queue_size: int = 1024,
+    ) -> AsyncGenerator[AlistPath, None]:
+        """
+        并发获取文件/目录详细信息
+        在输入持续产生的同时以固定数量的协程发送请求（HTTP/2 下复用同一连接），按完成顺序返回结果
+
+        :param paths: AlistPath 对象异步迭代器
+        :param max_workers: 同时获取详细信息的协程数
+        :param max_queue_size: 结果队列的最大长度
+        :return: 包含详细信息的 AlistPath 对象生成器
+        """
+
+        workers_num = max(1, max_workers)
+        inputs: Queue[AlistPath | None] = Queue(maxsize=workers_num)
+        results: Queue[AlistPath | BaseException | None] = Queue(
+            maxsize=max_queue_size
+        )
+
+        async def feed() -> None:
+            try:
+                async for path in paths:
+                    await inputs.put(path)
+            except CancelledError:
+                raise
+            except BaseException as e:
+                await results.put(e)
+                return
+            for _ in range(workers_num):
+                await inputs.put(None)
+
+        async def worker() -> None:
+            try:
+                while (path := await inputs.get()) is not None:
+                    await results.put(await self.async_api_fs_get(path.path))
+            except CancelledError:
+                raise
+            except BaseException as e:
+                await results.put(e)
+                return
+            await results.put(None)
+
+        tasks = [create_task(feed())]
+        tasks.extend(create_task(worker()) for _ in range(workers_num))
+        try:
+            finished = 0
+            while finished < workers_num:
+                item = await results.get()
+                if item is None:
+                    finished += 1
+                elif isinstance(item, BaseException):
+                    raise item
+                else:
+                    yield item
+        finally:
+            for task in tasks:
+                task.cancel()
+            await gather(*tasks, return_exceptions=True)
 
     async def get_storage_by_mount_path(
         self, mount_path: str, create: bool = False, **kwargs
@@ -406,9 +1343,11 @@ class AlistClient(metaclass=Multiton):
         :return: AlistStorage 对象
         """
 
-        for storage in await self.async_api_admin_storage_list():
-            if storage.mount_path == mount_path:
-                return storage
+        # 缓存中未找到时重新获取，存储器可能在缓存后由其他途径创建
+        for refresh in (False, True):
+            for storage in await self.__storage_list(refresh):
+                if storage.get("mount_path") == mount_path:
+                    return AlistStorage(**storage)
         logger.debug(f"在 Alist 服务器上未找到存储器 {mount_path}")
 
         if create:
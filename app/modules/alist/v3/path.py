@@ -1,70 +1,209 @@
-from re import sub
+from json import loads
 from typing import Any
 
-from pydantic import BaseModel
-
 from app.utils import URLUtils
 
 
-class AlistPath(BaseModel):
+class AlistServerInfo:
+    """
+    Alist 服务器信息
+    同一服务器、同一用户下的所有 AlistPath 共享同一个对象，避免逐个复制服务器地址与基础路径
+    """
+
+    __slots__ = ("server_url", "base_path", "base_prefix")
+
+    __instances: dict[tuple[str, str], "AlistServerInfo"] = {}
+
+    def __init__(self, server_url: str, base_path: str) -> None:
+        self.server_url = server_url  # 服务器地址
+        self.base_path = base_path  # 基础路径
+        self.base_prefix = base_path.rstrip("/")  # 计算绝对路径时使用的前缀
+
+    @classmethod
+    def get(cls, server_url: str, base_path: str) -> "AlistServerInfo":
+        """
+        获取共享的服务器信息对象
+
+        :param server_url: 服务器地址
+        :param base_path: 基础路径
+        """
+        key = (server_url, base_path)
+        info = cls.__instances.get(key)
+        if info is None:
+            info = cls.__instances[key] = cls(server_url, base_path)
+        return info
+
+
+class AlistPath:
     """
     Alist 文件/目录对象
+    列出目录时每个条目都会创建一个对象，因此使用 __slots__ 存储，构造时不做校验，
+    派生属性（绝对路径、下载地址、后缀）在首次访问时计算并缓存
     """
 
-    server_url: str  # 服务器地址
-    base_path: str  # 基础路径（用于计算文件/目录在 Alist 服务器上的绝对地址）
-    path: str  # 文件/目录路径
-    name: str  # 文件/目录名称
-    size: int  # 文件大小
-    is_dir: bool  # 是否为目录
-    modified: str = ""  # 修改时间
-    created: str = ""  # 创建时间
-    sign: str = ""  # 签名
-    thumb: str = ""  # 缩略图
-    type: int = ""  # 类型
-    hashinfo: str = "null"  # 哈希信息
-    hash_info: str | dict | None = None  # 哈希信息 str 或者 dict
-    raw_url: str = ""  # 原始地址
-    readme: str = ""  # Readme 地址
-    header: str = ""  # 头部信息
-    provider: str = ""  # 提供者
-    related: Any = None  # 相关信息
+    __slots__ = (
+        "server",  # 服务器信息（共享）
+        "path",  # 文件/目录路径
+        "name",  # 文件/目录名称
+        "size",  # 文件大小
+        "is_dir",  # 是否为目录
+        "modified",  # 修改时间
+        "created",  # 创建时间
+        "_sign",  # 签名
+        "thumb",  # 缩略图
+        "type",  # 类型
+        "hashinfo",  # 哈希信息
+        "hash_info",  # 哈希信息 str 或者 dict
+        "raw_url",  # 原始地址
+        "readme",  # Readme 地址
+        "header",  # 头部信息
+        "provider",  # 提供者
+        "related",  # 相关信息
+        "_abs_path",  # 缓存：绝对路径
+        "_download_url",  # 缓存：下载地址
+        "_suffix",  # 缓存：文件后缀
+    )
+
+    def __init__(
+        self,
+        path: str,
+        name: str,
+        size: int = 0,
+        is_dir: bool = False,
+        modified: str = "",
+        created: str = "",
+        sign: str = "",
+        thumb: str = "",
+        type: int = 0,
+        hashinfo: str = "null",
+        hash_info: str | dict | None = None,
+        raw_url: str = "",
+        readme: str = "",
+        header: str = "",
+        provider: str = "",
+        related: Any = None,
+        server_url: str = "",
+        base_path: str = "",
+        server: AlistServerInfo | None = None,
+        **_,
+    ) -> None:
+        """
+        :param path: 文件/目录路径
+        :param name: 文件/目录名称
+        :param server_url: 服务器地址（未传入 server 时使用）
+        :param base_path: 基础路径（用于计算文件/目录在 Alist 服务器上的绝对地址）
+        :param server: 共享的服务器信息，传入时忽略 server_url 和 base_path
+        :param _: Alist 接口返回的其他字段，直接忽略
+        """
+        self.server = server or AlistServerInfo.get(server_url, base_path)
+        self.path = path
+        self.name = name
+        self.size = size or 0
+        self.is_dir = is_dir
+        self.modified = modified or ""
+        self.created = created or ""
+        self._sign = sign or ""
+        self.thumb = thumb or ""
+        self.type = type
+        self.hashinfo = hashinfo
+        self.hash_info = hash_info
+        self.raw_url = raw_url or ""
+        self.readme = readme or ""
+        self.header = header or ""
+        self.provider = provider or ""
+        self.related = related
+        self._abs_path = None
+        self._download_url = None
+        self._suffix = None
+
+    def __repr__(self) -> str:
+        return f"AlistPath(path={self.path!r}, is_dir={self.is_dir}, size={self.size})"
 
     @property
-    def abs_path(self):
+    def server_url(self) -> str:
+        """
+        服务器地址
+        """
+        return self.server.server_url
+
+    @property
+    def base_path(self) -> str:
+        """
+        基础路径
+        """
+        return self.server.base_path
+
+    @property
+    def sign(self) -> str:
+        """
+        签名
+        """
+        return self._sign
+
+    @sign.setter
+    def sign(self, value: str) -> None:
+        self._sign = value
+        self._download_url = None
+
+    @property
+    def abs_path(self) -> str:
         """
         文件/目录在 Alist 服务器上的绝对路径
         """
-        return self.base_path.rstrip("/") + self.path
+        if self._abs_path is None:
+            self._abs_path = self.server.base_prefix + self.path
+        return self._abs_path
 
     @property
-    def download_url(self):
+    def download_url(self) -> str:
         """
         文件下载地址
         """
-        if self.sign:
-            url = self.server_url + "/d" + self.abs_path + "?sign=" + self.sign
-        else:
-            url = self.server_url + "/d" + self.abs_path
-
-        return URLUtils.encode(url)
+        if self._download_url is None:
+            url = self.server.server_url + "/d" + self.abs_path
+            if self._sign:
+                url += "?sign=" + self._sign
+            self._download_url = URLUtils.encode(url)
+        return self._download_url
 
     @property
-    def proxy_download_url(self):
+    def proxy_download_url(self) -> str:
         """
         Alist代理下载地址
         """
-        return sub(r"/d/", "/p/", self.download_url, 1)
+        return self.download_url.replace("/d/", "/p/", 1)
 
     @property
-    def suffix(self):
+    def suffix(self) -> str:
         """
         文件后缀
         """
-        if self.is_dir:
-            return ""
-        else:
-            return "." + self.name.split(".")[-1]
+        if self._suffix is None:
+            if self.is_dir:
+                self._suffix = ""
+            else:
+                self._suffix = "." + self.name.split(".")[-1]
+        return self._suffix
+
+    @property
+    def hashes(self) -> dict[str, str]:
+        """
+        云盘提供的文件哈希，如 {"sha1": "...", "md5": "..."}
+        算法名及哈希值均为小写，无哈希信息时返回空字典
+        """
+        for hash_info in (self.hash_info, self.hashinfo):
+            if isinstance(hash_info, str):
+                try:
+                    hash_info = loads(hash_info)
+                except ValueError:
+                    continue
+            if isinstance(hash_info, dict) and hash_info:
+                return {
+                    str(name).lower(): value.lower()
+                    for name, value in hash_info.items()
+                    if isinstance(value, str) and value
+                }
+        return {}
 
 
 if __name__ == "__main__":
@@ -0,0 +1,106 @@
+from email.utils import parsedate_to_datetime
+from typing import Any, Generator
+from urllib.parse import unquote, urlsplit
+from xml.etree.ElementTree import Element, XMLPullParser
+
+# PROPFIND 请求体，只请求生成 AlistPath 需要的属性
+PROPFIND_BODY = (
+    '<?xml version="1.0" encoding="utf-8"?>'
+    '<D:propfind xmlns:D="DAV:"><D:prop>'
+    "<D:displayname/><D:getcontentlength/><D:getlastmodified/>"
+    "<D:creationdate/><D:resourcetype/>"
+    "</D:prop></D:propfind>"
+).encode()
+
+_RESPONSE = "{DAV:}response"
+_HREF = "{DAV:}href"
+_PROP = "{DAV:}prop"
+
+
+def _to_iso(value: str) -> str:
+    """
+    将 WebDAV 的 RFC 1123 时间转换为与 Alist API 一致的 ISO 8601 格式
+
+    :param value: RFC 1123 时间，如 Mon, 01 Jan 2024 00:00:00 GMT
+    :return: ISO 8601 时间，无法解析时原样返回
+    """
+    try:
+        return parsedate_to_datetime(value).isoformat().replace("+00:00", "Z")
+    except (TypeError, ValueError):
+        return value
+
+
+class PropfindParser:
+    """
+    PROPFIND 响应（multistatus）增量解析器
+    边接收边解析，每个 response 元素解析完成后立即转换为条目并从文档树中移除，
+    Depth: infinity 返回整个目录树时内存占用不随条目数增长
+    """
+
+    def __init__(self, dav_root: str) -> None:
+        """
+        :param dav_root: WebDAV 根路径（href 中需要去除的前缀），如 /dav
+        """
+        self.dav_root = dav_root.rstrip("/")
+        self.__parser = XMLPullParser(events=("start", "end"))
+        self.__root: Element | None = None
+
+    def feed(self, data: bytes) -> Generator[dict[str, Any], None, None]:
+        """
+        输入一段响应数据，返回其中已完整接收的条目
+
+        :param data: 响应数据
+        :return: 条目字典生成器，字段与 Alist API 的文件列表条目一致，另含 path
+        """
+        self.__parser.feed(data)
+        yield from self.__read_events()
+
+    def close(self) -> Generator[dict[str, Any], None, None]:
+        """
+        结束解析，返回剩余的条目
+        """
+        self.__parser.close()
+        yield from self.__read_events()
+
+    def __read_events(self) -> Generator[dict[str, Any], None, None]:
+        for event, element in self.__parser.read_events():
+            if event == "start":
+                if self.__root is None:
+                    self.__root = element
+            elif element.tag == _RESPONSE:
+                item = self.__to_item(element)
+                if self.__root is not None:
+                    self.__root.remove(element)  # 释放已解析的元素
+                if item is not None:
+                    yield item
+
+    def __to_item(self, response: Element) -> dict[str, Any] | None:
+        """
+        将 response 元素转换为条目字典
+        """
+        href = response.findtext(_HREF)
+        if not href:
+            return None
+        path = unquote(urlsplit(href).path)
+        if not path.startswith(self.dav_root):
+            return None
+        path = path[len(self.dav_root) :].rstrip("/") or "/"
+
+        props: dict[str, Any] = {}
+        is_dir = False
+        for prop in response.iter(_PROP):
+            for element in prop:
+                name = element.tag.rpartition("}")[2]
+                if name == "resourcetype":
+                    is_dir = is_dir or element.find("{DAV:}collection") is not None
+                elif element.text:
+                    props[name] = element.text.strip()
+
+        return {
+            "path": path,
+            "name": props.get("displayname") or path.rsplit("/", 1)[-1],
+            "size": int(props.get("getcontentlength") or 0),
+            "is_dir": is_dir,
+            "modified": _to_iso(props.get("getlastmodified", "")),
+            "created": props.get("creationdate", ""),
+        }
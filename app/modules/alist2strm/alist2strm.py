@@ -1,19 +1,33 @@
-from asyncio import to_thread, Semaphore, TaskGroup
+from asyncio import to_thread, Semaphore, gather, get_running_loop
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import sha1
 from os import PathLike
+from typing import AsyncGenerator
 from pathlib import Path
 
 from aiofile import async_open
 
 from app.core import logger
-from app.utils import RequestUtils, Retry
+from app.core.state import running_pipelines
+from app.utils import RequestUtils, Pipeline, AlistSigner, current_task_id
 from app.extensions import VIDEO_EXTS, SUBTITLE_EXTS, IMAGE_EXTS, NFO_EXTS
-from app.modules.alist import AlistClient, AlistPath
+from app.modules.alist import AlistClient, AlistPath, AlistServerInfo
+from app.modules.alist2strm.catalog import AlistCatalog
+from app.modules.alist2strm.local_index import LocalIndex
 
 
 class Alist2Strm:
 
+    # 批量写入本地目录的 AlistPath 数量
+    CATALOG_BATCH_SIZE: int = 500
+    # 清理本地文件时每批删除的文件数量
+    CLEANUP_BATCH_SIZE: int = 200
+    # 清理本地文件的线程数
+    CLEANUP_WORKERS: int = 8
+
     def __init__(
         self,
+        id: str = "",
         url: str = "http://localhost:5244",
         username: str = "",
         password: str = "",
@@ -26,9 +40,22 @@ class Alist2Strm:
         nfo: bool = False,
         mode: str = "AlistURL",
         overwrite: bool = False,
+        reconcile: bool = False,
         other_ext: str = "",
         max_workers: int = 50,
         max_downloaders: int = 5,
+        max_listers: int = 1,
+        list_per_page: int = 0,
+        list_backend: str = "api",
+        search_index_max_age: float = 24,
+        webdav_depth: str | int = "infinity",
+        sign_secret: str = "",
+        max_filters: int = 4,
+        max_fetchers: int = 10,
+        queue_size: int = 1000,
+        catalog: bool = True,
+        incremental: bool = False,
+        full_scan_interval: float = 7,
         sync_server: bool = False,
         strm_content_prefix: str = "",
         **_,
@@ -36,6 +63,7 @@ class Alist2Strm:
         """
         实例化 Alist2Strm 对象
 
+        :param id: 任务 ID，默认为空
         :param url: Alist 服务器地址，默认为 "http://localhost:5244"
         :param username: Alist 用户名，默认为空
         :param password: Alist 密码，默认为空
@@ -47,11 +75,25 @@ class Alist2Strm:
         :param nfo: 是否下载 .nfo 文件，默认为 False
         :param mode: Strm模式(AlistURL/RawURL/AlistPath)
         :param overwrite: 本地路径存在同名文件时是否重新生成/下载该文件，默认为 False
+        :param reconcile: 仅在 .strm 文件内容发生变化时重写该文件（优先于 overwrite），默认为 False
         :param sync_server: 是否同步服务器，启用后若服务器中删除了文件，也会将本地文件删除，默认为 True
         :param other_ext: 自定义下载后缀，使用西文半角逗号进行分割，默认为空
-        :param max_workers: 最大并发数
+        :param max_workers: 同时生成/下载文件的最大并发数
         :param max_downloaders: 最大同时下载
+        :param max_listers: 同时列出 Alist 目录的最大并发数，默认为 1
+        :param list_per_page: 列出 Alist 目录时每页数量，为 0 时一次性获取全部，默认为 0
+        :param list_backend: 列出 Alist 目录的方式，api（逐个目录列出）、search（搜索索引）或 webdav，默认为 api
+        :param search_index_max_age: 搜索索引超过该小时数未更新时回退为逐个目录列出，为 0 时不检查，默认为 24
+        :param webdav_depth: WebDAV 列出深度，infinity（一次请求列出整个目录树）或 1（逐个目录列出），默认为 infinity
+        :param sign_secret: Alist 签名令牌（设置 - 其他 - 令牌），设置后在本地计算下载地址的签名，不依赖列表中的 sign 字段，默认为空
+        :param max_filters: 同时检查本地文件的最大并发数，默认为 4
+        :param max_fetchers: RawURL 模式下同时获取文件详细信息的最大并发数，默认为 10
+        :param queue_size: 流水线各阶段队列的最大长度，默认为 1000
+        :param catalog: 是否将列出的 Alist 目录树记录至本地数据库，默认为 True
+        :param incremental: 增量模式，跳过修改时间及直接条目数均未变化的目录的子树（需启用 catalog），默认为 False
+        :param full_scan_interval: 增量模式下强制全量扫描的间隔天数，为 0 时不强制，默认为 7
         """
+        self.id = id or source_dir
         self.url = url
         self.__username = username
         self.__password = password
@@ -82,8 +124,32 @@ class Alist2Strm:
         self.process_file_exts = VIDEO_EXTS | download_exts
 
         self.overwrite = overwrite
-        self.__max_workers = Semaphore(max_workers)
+        self.reconcile = reconcile
         self.__max_downloaders = Semaphore(max_downloaders)
+        self.max_workers = max_workers
+        self.max_listers = max_listers
+        self.list_per_page = list_per_page
+        if list_backend not in ("api", "search", "webdav"):
+            logger.warning(f"列出方式 {list_backend} 不存在，已设置为默认方式 api")
+            list_backend = "api"
+        self.list_backend = list_backend
+        self.search_index_max_age = search_index_max_age
+        webdav_depth = str(webdav_depth).lower()
+        if webdav_depth not in ("infinity", "1"):
+            logger.warning(f"WebDAV 列出深度 {webdav_depth} 无效，已设置为 infinity")
+            webdav_depth = "infinity"
+        self.webdav_depth = webdav_depth
+        self.__signer = AlistSigner(sign_secret) if sign_secret else None
+        self.max_filters = max_filters
+        self.max_fetchers = max_fetchers
+        self.queue_size = queue_size
+        self.pipeline = Pipeline(f"Alist2Strm {self.id}")
+        self.catalog = AlistCatalog() if catalog else None
+        if incremental and not catalog:
+            logger.warning("增量模式需要启用 catalog，已关闭增量模式")
+            incremental = False
+        self.incremental = incremental
+        self.full_scan_interval = full_scan_interval
 
         self.sync_server = sync_server
         self.strm_content_prefix = strm_content_prefix
@@ -91,13 +157,12 @@ class Alist2Strm:
     async def run(self) -> None:
         """
         处理主体
+        流水线：列出目录 -> 过滤 -> 获取详细信息（仅 RawURL 模式） -> 生成/下载文件
         """
 
-        def filter(path: AlistPath) -> bool:
+        def is_process_file(path: AlistPath) -> bool:
             """
-            过滤器
-            根据 Alist2Strm 配置判断是否需要处理该文件
-            将云盘上上的文件对应的本地文件路径保存至 self.processed_local_paths
+            判断是否为需要处理的文件类型（在列出目录阶段执行）
 
             :param path: AlistPath 对象
             """
@@ -109,14 +174,93 @@ class Alist2Strm:
                 logger.debug(f"文件 {path.name} 不在处理列表中")
                 return False
 
+            return True
+
+        async def list_paths() -> AsyncGenerator[AlistPath, None]:
+            """
+            列出目录阶段（流水线数据源）
+            将列出的所有 AlistPath 批量记录至本地目录，仅返回需要处理的文件
+
+            :return: AlistPath 对象生成器
+            """
+            buffer: list[AlistPath] = []
+            async for path in client.iter_path(
+                dir_path=self.source_dir,
+                is_detail=False,
+                # 搜索索引一次返回整个目录树，在列出阶段丢弃不需要处理的文件
+                filter=(
+                    (lambda path: path.is_dir or is_process_file(path))
+                    if self.list_backend == "search"
+                    else (lambda path: True)
+                ),
+                max_workers=self.max_listers,
+                max_queue_size=self.queue_size,
+                prune=prune,
+                replay=lambda dir_path: self.__replay_paths(client, dir_path),
+                per_page=self.list_per_page,
+                backend=self.list_backend,
+                index_max_age=self.search_index_max_age * 60 * 60,
+                webdav_depth=self.webdav_depth,
+            ):
+                if self.catalog is not None:
+                    buffer.append(path)
+                    if len(buffer) >= self.CATALOG_BATCH_SIZE:
+                        await self.catalog.async_record(self.id, run_id, buffer)
+                        buffer = []
+
+                if is_process_file(path):
+                    yield path
+
+            if buffer:
+                await self.catalog.async_record(self.id, run_id, buffer)
+
+        def prune(path: AlistPath, child_count: int) -> bool:
+            """
+            剪枝器（增量模式）
+            目录的修改时间及直接条目数与上次运行记录一致时不再列出其子目录，
+            子目录的整个子树从本地目录中还原；存储驱动不更新上级目录修改时间时，
+            孙级及更深层的变化由定期全量扫描发现
+
+            :param path: 目录 AlistPath 对象
+            :param child_count: 本次列出的直接条目数
+            """
+            if path.modified and fingerprints.get(path.path) == (
+                path.modified,
+                child_count,
+            ):
+                pruned_dirs.add(path.path)
+                return True
+            return False
+
+        async def filter(path: AlistPath) -> AlistPath | None:
+            """
+            过滤器
+            根据 Alist2Strm 配置判断是否需要处理该文件
+            将云盘上上的文件对应的本地文件路径及 Alist 路径保存至 self.processed_local_paths
+
+            :param path: AlistPath 对象
+            :return: 需要处理时返回 AlistPath 对象，否则返回 None
+            """
+
             local_path = self.__get_local_path(path)
-            self.processed_local_paths.add(local_path)
+            self.processed_local_paths[str(local_path)] = path.path
 
-            if not self.overwrite and local_path.exists():
-                logger.debug(f"文件 {local_path.name} 已存在，跳过处理 {path.path}")
-                return False
+            if local_path in self.local_index:
+                if self.reconcile and local_path.suffix == ".strm":
+                    return path  # 由处理阶段比较内容后决定是否重写
+                if not self.overwrite:
+                    logger.debug(f"文件 {local_path.name} 已存在，跳过处理 {path.path}")
+                    return None
 
-            return True
+            return path
+
+        async def fetch_detail(path: AlistPath) -> AlistPath:
+            """
+            获取文件详细信息（raw_url）
+
+            :param path: AlistPath 对象
+            """
+            return await client.async_api_fs_get(path.path)
 
         if not self.mode in ["AlistURL", "RawURL", "AlistPath"]:
             logger.warning(
@@ -124,30 +268,143 @@ class Alist2Strm:
             )
             self.mode = "AlistURL"
 
+        # 云盘文件对应的本地文件路径 -> Alist 路径
+        self.processed_local_paths: dict[str, str] = {}
+        self.__local_files: list[
+            tuple[str, str, str | None, int | None, str | None]
+        ] = []  # 待记录的本地文件
+        self.__has_manifest = self.catalog is not None and await to_thread(
+            self.catalog.has_manifest, self.id, str(self.target_dir)
+        )  # 运行前本地数据库中是否已有完整的本地文件清单
+        self.local_index = LocalIndex(self.target_dir, recursive=not self.flatten_mode)
+        # 有清单时按清单清理，同步服务器无需遍历本地目录
+        if (
+            not self.overwrite
+            or self.reconcile
+            or (self.sync_server and not self.__has_manifest)
+        ):
+            await self.local_index.async_build()
+
+        current_task_id.set(self.id)  # 共享同一服务器的任务按任务 ID 轮流发送请求
+        client = await AlistClient.connect(
+            self.url, self.__username, self.__password, self.__tokenen
+        )
+
+        self.pipeline = Pipeline(f"Alist2Strm {self.id}")
+        self.pipeline.add_stage("filter", filter, self.max_filters, self.queue_size)
         if self.mode == "RawURL":
-            is_detail = True
-        else:
-            is_detail = False
+            self.pipeline.add_stage(
+                "detail", fetch_detail, self.max_fetchers, self.queue_size
+            )
+        self.pipeline.add_stage(
+            "process", self.__file_processer, self.max_workers, self.queue_size
+        )
+
+        # 上次运行记录的目录指纹：目录路径 -> (修改时间, 直接条目数)
+        fingerprints: dict[str, tuple[str, int]] = {}
+        pruned_dirs: set[str] = set()  # 本次运行未继续列出子目录的目录
+        if self.catalog is not None:
+            full_scan = not self.incremental or await to_thread(
+                self.catalog.need_full_scan,
+                self.id,
+                self.source_dir,
+                self.full_scan_interval * 24 * 60 * 60,
+            )
+            if not full_scan:
+                fingerprints = await to_thread(
+                    self.catalog.dir_fingerprints, self.id, self.source_dir
+                )
+                logger.info(f"增量模式：已加载 {len(fingerprints)} 个目录指纹")
+            elif self.incremental:
+                logger.info("增量模式：本次运行执行全量扫描")
+            run_id = await self.catalog.async_begin_run(
+                self.id, self.source_dir, full_scan
+            )
 
-        self.processed_local_paths = set()  # 云盘文件对应的本地文件路径
+        logger.info(f"开始处理 {self.source_dir}")
+        running_pipelines[self.id] = self.pipeline
+        try:
+            await self.pipeline.run(list_paths())
+        finally:
+            running_pipelines.pop(self.id, None)
+            await self.__flush_local_files()
+        logger.info("Alist2Strm处理完成")
 
-        async with self.__max_workers:
-            async with TaskGroup() as tg:
-                client = AlistClient(
-                    self.url, self.__username, self.__password, self.__tokenen
+        stale_files: list[str] = []  # Alist 路径已消失的本地文件
+        if self.catalog is not None:
+            if self.sync_server and self.__has_manifest:
+                stale_files = await to_thread(
+                    self.catalog.stale_local_files,
+                    self.id,
+                    run_id,
+                    self.source_dir,
+                    str(self.target_dir),
+                )
+            diff = await self.catalog.async_finish_run(
+                self.id, run_id, self.source_dir
+            )
+            logger.info(
+                f"Alist 目录树变化：新增 {diff['added']}，变更 {diff['changed']}，删除 {diff['removed']}"
+            )
+            if pruned_dirs:
+                logger.info(
+                    f"增量模式：{len(pruned_dirs)} 个目录未变化，已跳过其子目录"
+                )
+            if self.incremental and diff["unstable"]:
+                logger.warning(
+                    f"发现 {diff['unstable']} 个目录的修改时间未随内容更新，下次运行将执行全量扫描"
                 )
-                logger.info(f"开始处理 {self.source_dir}")
-                async for path in client.iter_path(
-                    dir_path=self.source_dir, is_detail=is_detail, filter=filter
-                ):
-                    tg.create_task(self.__file_processer(path))
-        logger.info("Alist2Strm处理完成")
 
         if self.sync_server:
-            await self.__cleanup_local_files()
+            await self.__cleanup_local_files(stale_files)
             logger.info("清理过期的 .strm 文件完成")
 
-    @Retry.async_retry(Exception, tries=3, delay=3, backoff=2, logger=logger)
+    async def resign(self) -> None:
+        """
+        更换签名令牌后重新生成 .strm 文件
+        从本地目录中读取上次运行记录的文件，使用新的签名令牌在本地计算下载地址，
+        只重写内容发生变化的现有 .strm 文件，不列出 Alist 目录（仅请求用户信息获取基础路径）
+        需启用 catalog、设置 sign_secret 且模式为 AlistURL
+        """
+        if self.catalog is None or self.__signer is None or self.mode != "AlistURL":
+            logger.warning(
+                f"任务 {self.id} 重新签名需要启用 catalog、设置 sign_secret 且模式为 AlistURL"
+            )
+            return
+
+        self.reconcile = True  # 比较内容后决定是否重写
+        self.__local_files = []
+        self.local_index = LocalIndex(self.target_dir, recursive=not self.flatten_mode)
+        await self.local_index.async_build()
+
+        current_task_id.set(self.id)
+        client = await AlistClient.connect(
+            self.url, self.__username, self.__password, self.__tokenen
+        )
+
+        async def catalog_paths() -> AsyncGenerator[AlistPath, None]:
+            async for path in self.__replay_paths(client, self.source_dir):
+                if (
+                    not path.is_dir
+                    and path.suffix.lower() in VIDEO_EXTS
+                    and self.__get_local_path(path) in self.local_index
+                ):
+                    yield path
+
+        self.pipeline = Pipeline(f"Alist2Strm {self.id} resign")
+        self.pipeline.add_stage(
+            "process", self.__file_processer, self.max_workers, self.queue_size
+        )
+        logger.info(f"开始重新签名 {self.source_dir}")
+        running_pipelines[self.id] = self.pipeline
+        try:
+            await self.pipeline.run(catalog_paths())
+        finally:
+            running_pipelines.pop(self.id, None)
+            await self.__flush_local_files()
+        checked = self.pipeline.stats["source"]["produced"]
+        logger.info(f"重新签名完成，共检查 {checked} 个文件")
+
     async def __file_processer(self, path: AlistPath) -> None:
         """
         异步保存文件至本地
@@ -155,6 +412,8 @@ class Alist2Strm:
         :param path: AlistPath 对象
         """
         local_path = self.__get_local_path(path)
+        if self.__signer is not None:
+            path.sign = self.__signer.sign(path.abs_path)
 
         if self.mode == "AlistURL":
             content = path.download_url
@@ -172,15 +431,173 @@ class Alist2Strm:
 
             logger.debug(f"开始处理 {local_path}")
             if local_path.suffix == ".strm":
+                content_hash = sha1(content.encode("utf-8")).hexdigest()
+                if self.reconcile and local_path in self.local_index:
+                    if not await self.__is_strm_changed(
+                        local_path, path.path, content, content_hash
+                    ):
+                        logger.debug(f"{local_path.name} 内容未变化，跳过处理")
+                        return
                 async with async_open(local_path, mode="w", encoding="utf-8") as file:
                     await file.write(content)
+                stat = await to_thread(local_path.stat)
                 logger.info(f"{local_path.name} 创建成功")
             else:
+                if await self.__is_download_unchanged(local_path, path):
+                    logger.debug(f"{local_path.name} 远程文件未变化，跳过下载")
+                    return
                 async with self.__max_downloaders:
-                    await RequestUtils.download(path.download_url, local_path)
+                    verified = await RequestUtils.download(
+                        path.download_url, local_path, hashes=path.hashes
+                    )
                     logger.info(f"{local_path.name} 下载成功")
+                content_hash = ":".join(verified) if verified else None
+                await self.__record_local_file(
+                    local_path, path.path, content_hash, path.size, path.modified
+                )
+                return
         except Exception as e:
-            raise RuntimeError(f"{local_path} 处理失败，详细信息：{e}")
+            raise RuntimeError(f"{local_path} 处理失败，详细信息：{e}") from e
+
+        await self.__record_local_file(
+            local_path, path.path, content_hash, stat.st_size, str(stat.st_mtime_ns)
+        )
+
+    async def __is_download_unchanged(self, local_path: Path, path: AlistPath) -> bool:
+        """
+        判断下载文件（字幕、nfo、图片等）自上次下载后远程是否未变化
+        远程哈希与本地记录的校验哈希一致，或远程文件大小及修改时间与上次下载时一致，
+        且本地文件仍存在、大小未变时视为未变化
+
+        :param local_path: 本地文件路径
+        :param path: AlistPath 对象
+        :return: 是否可以跳过下载
+        """
+        if self.catalog is None:
+            return False
+        record = await to_thread(self.catalog.get_local_file, self.id, str(local_path))
+        if record is None or record["size"] != path.size:
+            return False
+
+        algorithm, _, digest = (record["content_hash"] or "").partition(":")
+        remote_digest = path.hashes.get(algorithm)
+        if remote_digest:
+            unchanged = remote_digest == digest
+        else:
+            unchanged = bool(path.modified) and record["modified"] == path.modified
+        if not unchanged:
+            return False
+
+        try:
+            stat = await to_thread(local_path.stat)
+        except OSError:
+            return False
+        return stat.st_size == path.size
+
+    async def __is_strm_changed(
+        self, local_path: Path, remote_path: str, content: str, content_hash: str
+    ) -> bool:
+        """
+        判断本地 .strm 文件内容是否需要更新
+        本地文件大小及修改时间与记录一致时比较本地数据库中记录的内容哈希，
+        否则（没有记录、文件被修改或损坏）读取本地文件进行比较
+
+        :param local_path: 本地文件路径
+        :param remote_path: Alist 路径
+        :param content: 需要写入的内容
+        :param content_hash: 需要写入的内容的哈希
+        :return: 内容是否发生变化
+        """
+        try:
+            stat = await to_thread(local_path.stat)
+        except OSError:
+            return True
+
+        if self.catalog is not None:
+            record = await to_thread(
+                self.catalog.get_local_file, self.id, str(local_path)
+            )
+            if (
+                record is not None
+                and record["content_hash"]
+                and record["size"] == stat.st_size
+                and record["modified"] == str(stat.st_mtime_ns)
+            ):
+                return record["content_hash"] != content_hash
+
+        try:
+            old_content = await to_thread(local_path.read_text, encoding="utf-8")
+        except (OSError, UnicodeDecodeError):
+            return True
+
+        if old_content != content:
+            return True
+
+        # 内容一致，补充记录内容哈希及文件状态，下次无需再读取本地文件
+        await self.__record_local_file(
+            local_path, remote_path, content_hash, stat.st_size, str(stat.st_mtime_ns)
+        )
+        return False
+
+    async def __record_local_file(
+        self,
+        local_path: Path,
+        remote_path: str,
+        content_hash: str | None,
+        size: int | None = None,
+        modified: str | None = None,
+    ) -> None:
+        """
+        记录 AutoFilm 生成的本地文件，达到批量大小时写入本地数据库
+
+        :param local_path: 本地文件路径
+        :param remote_path: Alist 路径
+        :param content_hash: 文件内容哈希（.strm 文件）或校验通过的远程哈希（下载文件）
+        :param size: 本地文件大小（.strm 文件）或远程文件大小（下载文件）
+        :param modified: 本地文件修改时间（.strm 文件，纳秒）或远程文件修改时间（下载文件）
+        """
+        if self.catalog is None:
+            return
+        self.__local_files.append(
+            (str(local_path), remote_path, content_hash, size, modified)
+        )
+        if len(self.__local_files) >= self.CATALOG_BATCH_SIZE:
+            await self.__flush_local_files()
+
+    async def __flush_local_files(self) -> None:
+        """
+        将待记录的本地文件写入本地数据库
+        """
+        if self.catalog is None or not self.__local_files:
+            return
+        files, self.__local_files = self.__local_files, []
+        await to_thread(self.catalog.record_local_files, self.id, files)
+
+    async def __replay_paths(
+        self, client: AlistClient, dir_path: str
+    ) -> AsyncGenerator[AlistPath, None]:
+        """
+        从本地目录中还原某个目录的整个子树（增量模式下未变化的子目录、重新签名）
+        还原的条目经列出阶段重新记录，从而标记为本次运行已出现
+
+        :param client: AlistClient 对象
+        :param dir_path: 目录路径
+        :return: AlistPath 对象生成器
+        """
+        server = AlistServerInfo.get(client.url, client.base_path)
+        batches = self.catalog.replay(self.id, dir_path)
+        while batch := await to_thread(next, batches, None):
+            for row in batch:
+                yield AlistPath(
+                    server=server,
+                    path=row["path"],
+                    name=row["name"],
+                    size=row["size"],
+                    is_dir=bool(row["is_dir"]),
+                    modified=row["modified"],
+                    sign=row["sign"],
+                    hash_info=row["hash_info"],
+                )
 
     def __get_local_path(self, path: AlistPath) -> Path:
         """
@@ -202,23 +619,102 @@ class Alist2Strm:
 
         return local_path
 
-    async def __cleanup_local_files(self) -> None:
+    async def __cleanup_local_files(self, stale_files: list[str]) -> None:
         """
-        删除服务器中已删除的本地的 .strm 文件及其关联文件
+        删除服务器中已删除的本地的 .strm 文件及其关联文件，并自下而上删除清理后为空的目录
+        有本地文件清单时只删除 Alist 路径在本次运行中消失的清单文件，范围限定为本次扫描的本地目录
+        本地数据库中没有完整的清单时（未启用 catalog、首次同步服务器）使用本地目录索引进行清理，
+        并将本地目录中现有的文件纳入清单，之后按清单清理
+
+        :param stale_files: Alist 路径已消失的本地文件（来自本地文件清单）
         """
         logger.info("开始清理本地文件")
 
-        if self.flatten_mode:
-            all_local_files = [f for f in self.target_dir.iterdir() if f.is_file()]
+        if self.__has_manifest:
+            files_to_delete = [
+                file_path
+                for file_path in stale_files
+                if file_path not in self.processed_local_paths
+            ]
         else:
-            all_local_files = [f for f in self.target_dir.rglob("*") if f.is_file()]
+            files_to_delete = [
+                str(file_path)
+                for file_path in self.local_index
+                if str(file_path) not in self.processed_local_paths
+            ]
+            if self.catalog is not None:  # 将现有文件纳入清单，之后按清单清理
+                await to_thread(
+                    self.catalog.record_local_files,
+                    self.id,
+                    (
+                        (local_path, remote_path, None, None, None)
+                        for local_path, remote_path in self.processed_local_paths.items()
+                        if Path(local_path) in self.local_index
+                    ),
+                    True,
+                )
+                await to_thread(
+                    self.catalog.mark_manifest_complete, self.id, str(self.target_dir)
+                )
+
+        if not files_to_delete:
+            return
+
+        loop = get_running_loop()
+        with ThreadPoolExecutor(
+            max_workers=self.CLEANUP_WORKERS, thread_name_prefix="AutoFilm_cleanup"
+        ) as executor:
+            results = await gather(
+                *(
+                    loop.run_in_executor(
+                        executor,
+                        self.__delete_files,
+                        files_to_delete[i : i + self.CLEANUP_BATCH_SIZE],
+                    )
+                    for i in range(0, len(files_to_delete), self.CLEANUP_BATCH_SIZE)
+                )
+            )
+        deleted = [file_path for result in results for file_path in result]
+
+        if self.catalog is not None:
+            await to_thread(self.catalog.delete_local_files, self.id, deleted)
+        await to_thread(self.__prune_empty_dirs, deleted)
 
-        files_to_delete = set(all_local_files) - self.processed_local_paths
+    @staticmethod
+    def __delete_files(file_paths: list[str]) -> list[str]:
+        """
+        删除一批本地文件（在线程池中执行）
 
-        for file_path in files_to_delete:
+        :param file_paths: 本地文件路径列表
+        :return: 已删除（或已不存在）的文件路径列表
+        """
+        deleted = []
+        for file_path in file_paths:
             try:
-                if file_path.exists():
-                    await to_thread(file_path.unlink)
-                    logger.info(f"删除文件：{file_path}")
+                Path(file_path).unlink(missing_ok=True)
+                deleted.append(file_path)
+                logger.info(f"删除文件：{file_path}")
             except Exception as e:
                 logger.error(f"删除文件 {file_path} 失败：{e}")
+        return deleted
+
+    def __prune_empty_dirs(self, file_paths: list[str]) -> None:
+        """
+        自下而上删除清理文件后为空的目录，不会删除本地目录本身
+
+        :param file_paths: 已删除的文件路径列表
+        """
+        root = self.target_dir.resolve()
+        dirs = {Path(file_path).parent.resolve() for file_path in file_paths}
+        checked: set[Path] = set()
+        for dir_path in sorted(dirs, key=lambda p: len(p.parts), reverse=True):
+            while dir_path != root and root in dir_path.parents:
+                if dir_path in checked:
+                    break
+                checked.add(dir_path)
+                try:
+                    dir_path.rmdir()
+                except OSError:  # 目录不为空或无法删除
+                    break
+                logger.info(f"删除空目录：{dir_path}")
+                dir_path = dir_path.parent
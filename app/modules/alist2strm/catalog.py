@@ -0,0 +1,613 @@
+from asyncio import to_thread
+from json import dumps
+from os import sep
+from pathlib import Path
+from sqlite3 import connect, Row
+from threading import Lock
+from time import time
+from typing import Any, Iterable, Iterator
+
+from app.core import settings, logger
+from app.utils import Singleton
+from app.modules.alist import AlistPath
+
+
+class AlistCatalog(metaclass=Singleton):
+    """
+    Alist 远程目录树本地目录（SQLite）
+    以任务 ID 和路径为键记录每次 Alist2Strm 运行时列出的 AlistPath
+    """
+
+    __SCHEMA = """
+    CREATE TABLE IF NOT EXISTS entries (
+        task_id TEXT NOT NULL,
+        path TEXT NOT NULL,
+        parent TEXT NOT NULL,
+        name TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        modified TEXT NOT NULL,
+        is_dir INTEGER NOT NULL,
+        sign TEXT NOT NULL,
+        hash_info TEXT,
+        first_run INTEGER NOT NULL,
+        changed_run INTEGER NOT NULL,
+        seen_run INTEGER NOT NULL,
+        child_count INTEGER NOT NULL DEFAULT -1,
+        PRIMARY KEY (task_id, path)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS idx_entries_parent ON entries (task_id, parent);
+    CREATE INDEX IF NOT EXISTS idx_entries_name ON entries (task_id, name);
+    CREATE TABLE IF NOT EXISTS local_files (
+        task_id TEXT NOT NULL,
+        local_path TEXT NOT NULL,
+        remote_path TEXT NOT NULL,
+        content_hash TEXT,
+        size INTEGER,
+        modified TEXT,
+        updated REAL NOT NULL,
+        PRIMARY KEY (task_id, local_path)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS idx_local_files_remote
+        ON local_files (task_id, remote_path);
+    CREATE TABLE IF NOT EXISTS manifests (
+        task_id TEXT NOT NULL,
+        local_dir TEXT NOT NULL,
+        completed REAL NOT NULL,
+        PRIMARY KEY (task_id, local_dir)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS runs (
+        run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        task_id TEXT NOT NULL,
+        source_dir TEXT NOT NULL,
+        started REAL NOT NULL,
+        finished REAL,
+        added INTEGER,
+        changed INTEGER,
+        removed INTEGER,
+        full_scan INTEGER NOT NULL DEFAULT 1,
+        unstable INTEGER NOT NULL DEFAULT 0
+    );
+    """
+
+    # 旧版本数据库需要补充的列
+    __MIGRATIONS = {
+        "entries": {"child_count": "INTEGER NOT NULL DEFAULT -1"},
+        "local_files": {"size": "INTEGER", "modified": "TEXT"},
+        "runs": {
+            "full_scan": "INTEGER NOT NULL DEFAULT 1",
+            "unstable": "INTEGER NOT NULL DEFAULT 0",
+        },
+    }
+
+    __UPSERT = """
+    INSERT INTO entries (
+        task_id, path, parent, name, size, modified, is_dir, sign, hash_info,
+        first_run, changed_run, seen_run
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (task_id, path) DO UPDATE SET
+        name = excluded.name,
+        size = excluded.size,
+        modified = excluded.modified,
+        is_dir = excluded.is_dir,
+        sign = excluded.sign,
+        hash_info = excluded.hash_info,
+        changed_run = CASE
+            WHEN entries.size != excluded.size
+                OR entries.modified != excluded.modified
+                OR entries.is_dir != excluded.is_dir
+            THEN excluded.seen_run
+            ELSE entries.changed_run
+        END,
+        seen_run = excluded.seen_run
+    """
+
+    __COLUMNS = "path, parent, name, size, modified, is_dir, sign, hash_info"
+
+    def __init__(self, db_path: Path | None = None) -> None:
+        """
+        :param db_path: 数据库文件路径，默认为配置目录下的 catalog.db
+        """
+        self.db_path = db_path or settings.CATALOG
+        self.__lock = Lock()
+        self.__conn = connect(self.db_path, check_same_thread=False)
+        self.__conn.row_factory = Row
+        with self.__lock:
+            self.__conn.execute("PRAGMA journal_mode=WAL")
+            self.__conn.execute("PRAGMA synchronous=NORMAL")
+            self.__conn.executescript(self.__SCHEMA)
+            for table, columns in self.__MIGRATIONS.items():
+                exists = {
+                    row["name"]
+                    for row in self.__conn.execute(f"PRAGMA table_info({table})")
+                }
+                for column, definition in columns.items():
+                    if column not in exists:
+                        self.__conn.execute(
+                            f"ALTER TABLE {table} ADD COLUMN {column} {definition}"
+                        )
+            self.__conn.commit()
+
+    @staticmethod
+    def __scope(source_dir: str, separator: str = "/") -> tuple[str, str]:
+        """
+        返回目录下所有路径的范围查询边界，以便使用主键索引进行前缀查询
+
+        :param source_dir: 目录路径
+        :param separator: 路径分隔符，Alist 路径为 /，本地路径为当前系统的分隔符
+        """
+        prefix = source_dir.rstrip(separator) + separator
+        return prefix, prefix + "\U0010ffff"
+
+    def __execute(
+        self, sql: str, params: tuple[Any, ...] | dict[str, Any] = ()
+    ) -> list[Row]:
+        with self.__lock:
+            rows = self.__conn.execute(sql, params).fetchall()
+            self.__conn.commit()
+        return rows
+
+    def begin_run(self, task_id: str, source_dir: str, full_scan: bool = True) -> int:
+        """
+        登记一次新的运行
+
+        :param task_id: 任务 ID
+        :param source_dir: 本次运行扫描的 Alist 目录
+        :param full_scan: 本次运行是否为全量扫描
+        :return: 运行 ID
+        """
+        with self.__lock:
+            cursor = self.__conn.execute(
+                """
+                INSERT INTO runs (task_id, source_dir, started, full_scan)
+                VALUES (?, ?, ?, ?)
+                """,
+                (task_id, source_dir, time(), int(full_scan)),
+            )
+            self.__conn.commit()
+        return cursor.lastrowid
+
+    def record(self, task_id: str, run_id: int, paths: Iterable[AlistPath]) -> None:
+        """
+        批量记录 AlistPath
+
+        :param task_id: 任务 ID
+        :param run_id: 运行 ID
+        :param paths: AlistPath 对象列表
+        """
+        rows = []
+        for path in paths:
+            hash_info = path.hash_info
+            if hash_info is not None and not isinstance(hash_info, str):
+                hash_info = dumps(hash_info)
+            rows.append(
+                (
+                    task_id,
+                    path.path,
+                    path.path.rsplit("/", 1)[0] or "/",
+                    path.name,
+                    path.size,
+                    path.modified,
+                    int(path.is_dir),
+                    path.sign,
+                    hash_info,
+                    run_id,
+                    run_id,
+                    run_id,
+                )
+            )
+        with self.__lock:
+            self.__conn.executemany(self.__UPSERT, rows)
+            self.__conn.commit()
+
+    def finish_run(self, task_id: str, run_id: int, source_dir: str) -> dict[str, int]:
+        """
+        结束运行，删除本次扫描范围内未再出现的路径，更新目录指纹并返回与上次运行的差异
+
+        目录修改时间未变化但子项数量发生变化时，说明存储器不会更新父目录的修改时间，
+        记为不稳定目录，下次增量运行将回退为全量扫描
+
+        :param task_id: 任务 ID
+        :param run_id: 运行 ID
+        :param source_dir: 本次运行扫描的 Alist 目录
+        :return: 新增、变更、删除的路径数量以及不稳定目录数量
+        """
+        low, high = self.__scope(source_dir)
+        params = {"run": run_id, "task": task_id, "low": low, "high": high}
+        with self.__lock:
+            added, changed = self.__conn.execute(
+                """
+                SELECT
+                    COALESCE(SUM(first_run = :run), 0),
+                    COALESCE(SUM(changed_run = :run AND first_run != :run), 0)
+                FROM entries
+                WHERE task_id = :task AND path >= :low AND path < :high
+                    AND seen_run = :run
+                """,
+                params,
+            ).fetchone()
+            removed = self.__conn.execute(
+                """
+                DELETE FROM entries
+                WHERE task_id = ? AND path >= ? AND path < ? AND seen_run != ?
+                """,
+                (task_id, low, high, run_id),
+            ).rowcount
+            self.__conn.execute(
+                """
+                CREATE TEMP TABLE IF NOT EXISTS child_counts (
+                    path TEXT PRIMARY KEY, count INTEGER NOT NULL
+                )
+                """
+            )
+            self.__conn.execute("DELETE FROM child_counts")
+            self.__conn.execute(
+                """
+                INSERT INTO child_counts (path, count)
+                SELECT parent, COUNT(*) FROM entries
+                WHERE task_id = :task AND parent >= :low AND parent < :high
+                GROUP BY parent
+                """,
+                params,
+            )
+            unstable = self.__conn.execute(
+                """
+                SELECT COUNT(*) FROM entries AS e
+                LEFT JOIN child_counts AS c ON c.path = e.path
+                WHERE e.task_id = :task AND e.path >= :low AND e.path < :high
+                    AND e.is_dir = 1 AND e.child_count != -1
+                    AND e.first_run != :run AND e.changed_run != :run
+                    AND e.child_count != COALESCE(c.count, 0)
+                """,
+                params,
+            ).fetchone()[0]
+            self.__conn.execute(
+                """
+                UPDATE entries SET child_count = COALESCE(
+                    (SELECT count FROM child_counts WHERE path = entries.path), 0
+                )
+                WHERE task_id = :task AND path >= :low AND path < :high
+                    AND is_dir = 1
+                """,
+                params,
+            )
+            self.__conn.execute(
+                """
+                UPDATE runs
+                SET finished = ?, added = ?, changed = ?, removed = ?, unstable = ?
+                WHERE run_id = ?
+                """,
+                (time(), added, changed, removed, unstable, run_id),
+            )
+            self.__conn.commit()
+
+        diff = {
+            "added": added,
+            "changed": changed,
+            "removed": removed,
+            "unstable": unstable,
+        }
+        logger.debug(f"目录 {task_id} 运行 {run_id} 完成：{diff}")
+        return diff
+
+    def need_full_scan(self, task_id: str, source_dir: str, interval: float) -> bool:
+        """
+        判断本次运行是否需要全量扫描
+        从未完成过全量扫描、距上次全量扫描超过间隔时间或上次运行发现不稳定目录时需要全量扫描
+
+        :param task_id: 任务 ID
+        :param source_dir: 本次运行扫描的 Alist 目录
+        :param interval: 全量扫描间隔（秒），为 0 时不强制全量扫描
+        """
+        rows = self.__execute(
+            """
+            SELECT
+                MAX(CASE WHEN full_scan = 1 THEN finished END) AS last_full_scan,
+                (
+                    SELECT unstable FROM runs
+                    WHERE task_id = :task AND source_dir = :source
+                        AND finished IS NOT NULL
+                    ORDER BY run_id DESC LIMIT 1
+                ) AS unstable
+            FROM runs
+            WHERE task_id = :task AND source_dir = :source AND finished IS NOT NULL
+            """,
+            {"task": task_id, "source": source_dir},
+        )
+        last_full_scan, unstable = rows[0]
+        if last_full_scan is None or unstable:
+            return True
+        return interval > 0 and time() - last_full_scan > interval
+
+    def dir_fingerprints(
+        self, task_id: str, source_dir: str
+    ) -> dict[str, tuple[str, int]]:
+        """
+        获取目录下所有子目录的指纹（修改时间及直接条目数）
+
+        :param task_id: 任务 ID
+        :param source_dir: Alist 目录
+        :return: 目录路径 -> (修改时间, 直接条目数)
+        """
+        low, high = self.__scope(source_dir)
+        rows = self.__execute(
+            """
+            SELECT path, modified, child_count FROM entries
+            WHERE task_id = ? AND path >= ? AND path < ? AND is_dir = 1
+                AND modified != '' AND child_count != -1
+            """,
+            (task_id, low, high),
+        )
+        return {row["path"]: (row["modified"], row["child_count"]) for row in rows}
+
+    def replay(
+        self, task_id: str, dir_path: str, batch_size: int = 1000
+    ) -> Iterator[list[dict[str, Any]]]:
+        """
+        按批次返回目录下已记录的所有条目（整个子树，不含目录本身）
+        用于跳过未变化的子树时从本地目录中还原其列表
+
+        :param task_id: 任务 ID
+        :param dir_path: 目录路径
+        :param batch_size: 每批返回数量
+        """
+        last, high = self.__scope(dir_path)
+        while True:
+            rows = self.__execute(
+                f"""
+                SELECT {self.__COLUMNS} FROM entries
+                WHERE task_id = ? AND path > ? AND path < ?
+                ORDER BY path LIMIT ?
+                """,
+                (task_id, last, high, batch_size),
+            )
+            if not rows:
+                return
+            yield [dict(row) for row in rows]
+            last = rows[-1]["path"]
+
+    def get(self, task_id: str, path: str) -> dict[str, Any] | None:
+        """
+        查询单个路径
+
+        :param task_id: 任务 ID
+        :param path: Alist 路径
+        :return: 路径信息，不存在时返回 None
+        """
+        rows = self.__execute(
+            f"SELECT {self.__COLUMNS} FROM entries WHERE task_id = ? AND path = ?",
+            (task_id, path),
+        )
+        return dict(rows[0]) if rows else None
+
+    def list_prefix(
+        self, task_id: str, prefix: str, limit: int = 100, offset: int = 0
+    ) -> list[dict[str, Any]]:
+        """
+        按前缀列出路径
+
+        :param task_id: 任务 ID
+        :param prefix: 路径前缀
+        :param limit: 返回数量
+        :param offset: 偏移量
+        """
+        rows = self.__execute(
+            f"""
+            SELECT {self.__COLUMNS} FROM entries
+            WHERE task_id = ? AND path >= ? AND path < ?
+            ORDER BY path LIMIT ? OFFSET ?
+            """,
+            (task_id, prefix, prefix + "\U0010ffff", limit, offset),
+        )
+        return [dict(row) for row in rows]
+
+    def count_prefix(self, task_id: str, prefix: str) -> int:
+        """
+        统计前缀下的路径数量
+
+        :param task_id: 任务 ID
+        :param prefix: 路径前缀
+        """
+        rows = self.__execute(
+            "SELECT COUNT(*) FROM entries WHERE task_id = ? AND path >= ? AND path < ?",
+            (task_id, prefix, prefix + "\U0010ffff"),
+        )
+        return rows[0][0]
+
+    @staticmethod
+    def __like(name: str) -> str:
+        """
+        将名称关键字转换为包含匹配的 LIKE 模式
+        """
+        keyword = name.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        return f"%{keyword}%"
+
+    def search(
+        self, task_id: str, name: str, limit: int = 100, offset: int = 0
+    ) -> list[dict[str, Any]]:
+        """
+        按名称搜索路径（包含匹配）
+
+        :param task_id: 任务 ID
+        :param name: 名称关键字
+        :param limit: 返回数量
+        :param offset: 偏移量
+        """
+        rows = self.__execute(
+            f"""
+            SELECT {self.__COLUMNS} FROM entries
+            WHERE task_id = ? AND name LIKE ? ESCAPE '\\'
+            ORDER BY path LIMIT ? OFFSET ?
+            """,
+            (task_id, self.__like(name), limit, offset),
+        )
+        return [dict(row) for row in rows]
+
+    def count_search(self, task_id: str, name: str) -> int:
+        """
+        统计名称包含关键字的路径数量
+
+        :param task_id: 任务 ID
+        :param name: 名称关键字
+        """
+        rows = self.__execute(
+            "SELECT COUNT(*) FROM entries WHERE task_id = ? AND name LIKE ? ESCAPE '\\'",
+            (task_id, self.__like(name)),
+        )
+        return rows[0][0]
+
+    def runs(self, task_id: str, limit: int = 10) -> list[dict[str, Any]]:
+        """
+        获取最近的运行记录
+
+        :param task_id: 任务 ID
+        :param limit: 返回数量
+        """
+        rows = self.__execute(
+            "SELECT * FROM runs WHERE task_id = ? ORDER BY run_id DESC LIMIT ?",
+            (task_id, limit),
+        )
+        return [dict(row) for row in rows]
+
+    def get_local_file(self, task_id: str, local_path: str) -> dict[str, Any] | None:
+        """
+        查询 AutoFilm 生成的本地文件记录
+
+        :param task_id: 任务 ID
+        :param local_path: 本地文件路径
+        :return: 本地文件记录，不存在时返回 None
+        """
+        rows = self.__execute(
+            """
+            SELECT local_path, remote_path, content_hash, size, modified, updated
+            FROM local_files
+            WHERE task_id = ? AND local_path = ?
+            """,
+            (task_id, local_path),
+        )
+        return dict(rows[0]) if rows else None
+
+    def record_local_files(
+        self,
+        task_id: str,
+        files: Iterable[tuple[str, str, str | None, int | None, str | None]],
+        keep_existing: bool = False,
+    ) -> None:
+        """
+        批量记录 AutoFilm 生成的本地文件
+        .strm 文件的内容哈希为文件内容的 SHA1，并记录写入后本地文件的大小及修改时间（纳秒），
+        用于发现被修改的文件；下载文件的内容哈希为校验通过的远程哈希，
+        格式为 "算法:哈希值"，并记录下载时远程文件的大小及修改时间
+
+        :param task_id: 任务 ID
+        :param files: (本地文件路径, Alist 路径, 内容哈希, 文件大小, 修改时间) 列表
+        :param keep_existing: 已有记录时是否保留原记录
+        """
+        now = time()
+        if keep_existing:
+            conflict = "NOTHING"
+        else:
+            conflict = """UPDATE SET
+                    remote_path = excluded.remote_path,
+                    content_hash = excluded.content_hash,
+                    size = excluded.size,
+                    modified = excluded.modified,
+                    updated = excluded.updated"""
+        with self.__lock:
+            self.__conn.executemany(
+                f"""
+                INSERT INTO local_files (
+                    task_id, local_path, remote_path, content_hash, size, modified,
+                    updated
+                ) VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (task_id, local_path) DO {conflict}
+                """,
+                [(task_id, *file, now) for file in files],
+            )
+            self.__conn.commit()
+
+    def has_manifest(self, task_id: str, local_dir: str) -> bool:
+        """
+        判断本地目录的文件清单是否完整
+        未同步服务器时记录的清单只包含期间生成的文件，需要经过一次遍历本地目录的清理
+        （mark_manifest_complete）后才能代替遍历本地目录；清单完整的目录的子目录同样完整
+
+        :param task_id: 任务 ID
+        :param local_dir: 本地目录
+        """
+        rows = self.__execute(
+            "SELECT local_dir FROM manifests WHERE task_id = ?", (task_id,)
+        )
+        local_dir = local_dir.rstrip(sep) + sep
+        return any(
+            local_dir.startswith(row["local_dir"].rstrip(sep) + sep) for row in rows
+        )
+
+    def mark_manifest_complete(self, task_id: str, local_dir: str) -> None:
+        """
+        标记本地目录的文件清单已完整（本地目录中现有的文件均已纳入清单）
+
+        :param task_id: 任务 ID
+        :param local_dir: 本地目录
+        """
+        self.__execute(
+            """
+            INSERT INTO manifests (task_id, local_dir, completed) VALUES (?, ?, ?)
+            ON CONFLICT (task_id, local_dir) DO UPDATE SET completed = excluded.completed
+            """,
+            (task_id, local_dir.rstrip(sep), time()),
+        )
+
+    def stale_local_files(
+        self, task_id: str, run_id: int, source_dir: str, local_dir: str
+    ) -> list[str]:
+        """
+        返回 Alist 路径在本次运行中未再出现的本地文件，需在 finish_run 删除这些路径之前调用
+        在数据库中按本次运行消失的路径连接本地文件清单，无需逐个遍历清单中的文件
+
+        :param task_id: 任务 ID
+        :param run_id: 运行 ID
+        :param source_dir: 本次运行扫描的 Alist 目录
+        :param local_dir: 本次运行的本地目录
+        :return: 本地文件路径列表
+        """
+        low, high = self.__scope(source_dir)
+        local_low, local_high = self.__scope(local_dir, sep)
+        rows = self.__execute(
+            """
+            SELECT l.local_path FROM entries AS e
+            JOIN local_files AS l ON l.task_id = e.task_id AND l.remote_path = e.path
+            WHERE e.task_id = ? AND e.path >= ? AND e.path < ? AND e.seen_run != ?
+                AND e.is_dir = 0 AND l.local_path >= ? AND l.local_path < ?
+            """,
+            (task_id, low, high, run_id, local_low, local_high),
+        )
+        return [row["local_path"] for row in rows]
+
+    def delete_local_files(self, task_id: str, local_paths: Iterable[str]) -> None:
+        """
+        批量删除本地文件记录
+
+        :param task_id: 任务 ID
+        :param local_paths: 本地文件路径列表
+        """
+        with self.__lock:
+            self.__conn.executemany(
+                "DELETE FROM local_files WHERE task_id = ? AND local_path = ?",
+                [(task_id, local_path) for local_path in local_paths],
+            )
+            self.__conn.commit()
+
+    async def async_begin_run(
+        self, task_id: str, source_dir: str, full_scan: bool = True
+    ) -> int:
+        return await to_thread(self.begin_run, task_id, source_dir, full_scan)
+
+    async def async_record(
+        self, task_id: str, run_id: int, paths: list[AlistPath]
+    ) -> None:
+        await to_thread(self.record, task_id, run_id, paths)
+
+    async def async_finish_run(
+        self, task_id: str, run_id: int, source_dir: str
+    ) -> dict[str, int]:
+        return await to_thread(self.finish_run, task_id, run_id, source_dir)
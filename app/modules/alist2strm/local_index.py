@@ -0,0 +1,97 @@
+from asyncio import to_thread
+from os import scandir
+from pathlib import Path
+from typing import Iterator
+
+from app.core import logger
+
+
+class LocalIndex:
+    """
+    本地目录文件索引
+    使用 os.scandir 一次性遍历目标目录，代替逐个文件调用 exists() / rglob()
+    按目录分组存储文件名，目录路径只保存一次
+    """
+
+    def __init__(self, root: Path, recursive: bool = True) -> None:
+        """
+        :param root: 需要建立索引的目录
+        :param recursive: 是否递归遍历子目录
+        """
+        self.root = root
+        self.recursive = recursive
+        self.__files: dict[str, set[str]] = {}  # 目录路径 -> 文件名集合
+        self.__count = 0
+
+    def build(self) -> None:
+        """
+        遍历目录建立索引（同步，会阻塞当前线程）
+        """
+        self.__files.clear()
+        self.__count = 0
+        stack = [str(self.root)]
+        while stack:
+            dir_path = stack.pop()
+            names: set[str] = set()
+            try:
+                with scandir(dir_path) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                if self.recursive:
+                                    stack.append(entry.path)
+                            elif entry.is_file():
+                                names.add(entry.name)
+                        except OSError as e:
+                            logger.warning(f"读取本地文件 {entry.path} 失败：{e}")
+            except FileNotFoundError:
+                continue
+            except OSError as e:
+                logger.warning(f"读取本地目录 {dir_path} 失败：{e}")
+                continue
+            if names:
+                self.__files[str(Path(dir_path))] = names
+                self.__count += len(names)
+
+        logger.debug(f"本地目录 {self.root} 索引完成，共 {self.__count} 个文件")
+
+    async def async_build(self) -> None:
+        """
+        在工作线程中遍历目录建立索引
+        """
+        await to_thread(self.build)
+
+    def __contains__(self, path: Path) -> bool:
+        names = self.__files.get(str(path.parent))
+        return names is not None and path.name in names
+
+    def __len__(self) -> int:
+        return self.__count
+
+    def __iter__(self) -> Iterator[Path]:
+        for dir_path, names in self.__files.items():
+            parent = Path(dir_path)
+            for name in names:
+                yield parent / name
+
+    def add(self, path: Path) -> None:
+        """
+        将文件加入索引
+
+        :param path: 文件路径
+        """
+        names = self.__files.setdefault(str(path.parent), set())
+        if path.name not in names:
+            names.add(path.name)
+            self.__count += 1
+
+    def discard(self, path: Path) -> None:
+        """
+        从索引中移除文件
+
+        :param path: 文件路径
+        """
+        names = self.__files.get(str(path.parent))
+        if names is not None and path.name in names:
+            names.remove(path.name)
+            self.__count -= 1
@@ -116,7 +116,9 @@ class Ani2Alist:
         else:
             anime_dict = await self.get_season_anime_list
 
-        client = AlistClient(self.__url, self.__username, self.__password, self.__token)
+        client = await AlistClient.connect(
+            self.__url, self.__username, self.__password, self.__token
+        )
         storage = await client.get_storage_by_mount_path(
             mount_path=self.__target_dir,
             create=True,
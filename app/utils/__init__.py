@@ -4,6 +4,16 @@ from app.utils.retry import Retry
 from app.utils.url import URLUtils
 from app.utils.singleton import Singleton
 from app.utils.multiton import Multiton
+from app.utils.pipeline import Pipeline
+from app.utils.singleflight import SingleFlight
+from app.utils.cache import TTLCache
+from app.utils.alist_sign import AlistSigner
+from app.utils.limiter import (
+    RateLimiter,
+    AIMDController,
+    RequestHedger,
+    current_task_id,
+)
 
 __all__ = [
     RequestUtils,
@@ -13,4 +23,12 @@ __all__ = [
     URLUtils,
     Singleton,
     Multiton,
+    Pipeline,
+    SingleFlight,
+    TTLCache,
+    AlistSigner,
+    RateLimiter,
+    AIMDController,
+    RequestHedger,
+    current_task_id,
 ]
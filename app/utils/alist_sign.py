@@ -3,6 +3,33 @@ from hmac import new as hmac_new
 from hashlib import sha256 as hashlib_sha256
 from base64 import urlsafe_b64encode
 
+
+class AlistSigner:
+    """
+    Alist 签名计算器
+    密钥只在初始化时处理一次，之后每个路径复制已初始化的 HMAC 对象计算签名
+    """
+
+    def __init__(self, secret_key: str, expire: int = 0) -> None:
+        """
+        :param secret_key: Alist 签名 Token（设置 - 其他 - 令牌）
+        :param expire: 签名过期时间戳，为 0 时永不过期
+        """
+        self.__hmac = hmac_new(secret_key.encode(), digestmod=hashlib_sha256)
+        self.__suffix = f":{expire}"
+
+    def sign(self, data: str) -> str:
+        """
+        计算签名
+
+        :param data: Alist 文件绝对路径（未编码）
+        :return: 签名（不含 ?sign= 前缀），可直接赋值给 AlistPath.sign
+        """
+        h = self.__hmac.copy()
+        h.update((data + self.__suffix).encode())
+        return urlsafe_b64encode(h.digest()).decode() + self.__suffix
+
+
 def sign(secret_key: Optional[str], data: str) -> str:
     """
     Alist 签名 Token 处理
@@ -10,12 +37,10 @@ def sign(secret_key: Optional[str], data: str) -> str:
 
     :param secret_key: Alist 签名 Token
     :param data: Alist 文件绝对路径（未编码）
+    :return: 带 ?sign= 前缀的签名参数，密钥为空时返回空字符串
     """
 
     if not secret_key:
         return ""
     else:
-        h = hmac_new(secret_key.encode(), digestmod=hashlib_sha256)
-        expire_time_stamp = str(0)
-        h.update((data + ":" + expire_time_stamp).encode())
-        return f"?sign={urlsafe_b64encode(h.digest()).decode()}:0"
\ No newline at end of file
+        return f"?sign={AlistSigner(secret_key).sign(data)}"
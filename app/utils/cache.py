@@ -0,0 +1,156 @@
+from collections.abc import Awaitable, Callable, Hashable
+from threading import Lock
+from time import monotonic
+from typing import Any
+
+from app.utils.singleflight import SingleFlight
+
+
+class TTLCache:
+    """
+    带过期时间的内存缓存
+    同一个 key 的并发加载只发送一次请求；加载期间缓存被清除时不写入加载结果，避免写回旧数据
+    设置最大条目数时按最近最少使用（LRU）淘汰
+    缓存为类属性时由定时任务与 API 线程的事件循环共享，读写由线程锁保护
+    """
+
+    __instances: dict[str, "TTLCache"] = {}
+
+    def __init__(self, name: str, ttl: float, max_entries: int = 0) -> None:
+        """
+        :param name: 缓存名称，用于状态展示
+        :param ttl: 过期时间（秒），为 0 时不缓存
+        :param max_entries: 最大条目数，为 0 时不限制
+        """
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # key -> (过期时间, 值)，按最近使用顺序排列（最久未使用的在最前）
+        self.__data: dict[Hashable, tuple[float, Any]] = {}
+        self.evictions = 0
+        self.__flights = SingleFlight()
+        self.__generation = 0  # 每次清除缓存时加一
+        self.__lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.__instances[name] = self
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        获取未过期的缓存值
+
+        :param key: 缓存键
+        :param default: 未命中时返回的值
+        :return: 缓存值
+        """
+        with self.__lock:
+            item = self.__data.pop(key, None)
+            if item is not None:
+                if item[0] > monotonic():
+                    self.__data[key] = item  # 移至末尾，标记为最近使用
+                    self.hits += 1
+                    return item[1]
+            self.misses += 1
+            return default
+
+    def __contains__(self, key: Hashable) -> bool:
+        """
+        是否存在未过期的缓存值（不计入命中统计，不改变使用顺序）
+
+        :param key: 缓存键
+        """
+        with self.__lock:
+            item = self.__data.get(key)
+            return item is not None and item[0] > monotonic()
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """
+        写入缓存
+
+        :param key: 缓存键
+        :param value: 缓存值
+        """
+        if self.ttl <= 0:
+            return
+        with self.__lock:
+            self.__set(key, value)
+
+    def __set(self, key: Hashable, value: Any) -> None:
+        """
+        写入缓存并按 LRU 淘汰（需持有锁）
+        """
+        self.__data.pop(key, None)
+        self.__data[key] = (monotonic() + self.ttl, value)
+        if self.max_entries > 0:
+            while len(self.__data) > self.max_entries:
+                del self.__data[next(iter(self.__data))]
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable | None = None) -> None:
+        """
+        清除缓存
+
+        :param key: 缓存键，为 None 时清除全部
+        """
+        with self.__lock:
+            self.__generation += 1
+            if key is None:
+                self.__data.clear()
+            else:
+                self.__data.pop(key, None)
+
+    async def get_or_load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+        refresh: bool = False,
+    ) -> Any:
+        """
+        获取缓存值，未命中时调用 loader 加载并写入缓存
+
+        :param key: 缓存键
+        :param loader: 返回可等待对象的加载函数
+        :param refresh: 是否忽略缓存重新加载
+        :return: 缓存值
+        """
+        _missing = object()
+        if not refresh:
+            value = self.get(key, _missing)
+            if value is not _missing:
+                return value
+
+        async def load() -> Any:
+            generation = self.__generation
+            value = await loader()
+            if self.ttl > 0:
+                with self.__lock:
+                    if generation == self.__generation:
+                        self.__set(key, value)
+            return value
+
+        return await self.__flights.do(key, load)
+
+    @property
+    def stats(self) -> dict[str, Any]:
+        """
+        缓存状态：条目数、命中次数及命中率
+        coalesced 为未命中但与其他调用共享同一次加载的次数
+        """
+        total = self.hits + self.misses
+        return {
+            "ttl": self.ttl,
+            "entries": len(self.__data),
+            "max_entries": self.max_entries,
+            "evictions": self.evictions,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.__flights.shared,
+            "hit_rate": round(self.hits / total, 4) if total else 0,
+        }
+
+    @classmethod
+    def all_stats(cls) -> dict[str, dict[str, Any]]:
+        """
+        所有缓存的状态
+        """
+        return {name: cache.stats for name, cache in cls.__instances.items()}
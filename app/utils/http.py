@@ -1,20 +1,69 @@
-from typing import Any, Literal, overload
+from typing import Any, BinaryIO, Literal, overload
 from pathlib import Path
-from os import makedirs
-from asyncio import TaskGroup, to_thread, get_event_loop
-from collections.abc import Coroutine
-from tempfile import TemporaryDirectory
-from shutil import copy
+from os import makedirs, replace
+from json import dumps, loads
+from hashlib import new as new_hash
+from asyncio import (
+    CancelledError,
+    Future,
+    Lock,
+    TaskGroup,
+    get_event_loop,
+    get_running_loop,
+    sleep as async_sleep,
+    timeout,
+)
+from collections.abc import Awaitable, Callable, Coroutine
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from atexit import register
-
-from httpx import AsyncClient, Client, Response, TimeoutException
-from aiofile import async_open
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Iterator
+from urllib.parse import urlsplit
+from weakref import WeakSet
+from time import monotonic, sleep
+
+from httpx import (
+    AsyncClient,
+    Client,
+    ConnectError,
+    ConnectTimeout,
+    Limits,
+    PoolTimeout,
+    Response,
+    Timeout,
+    TransportError,
+)
 
 from app.core import settings, logger
 from app.utils.url import URLUtils
-from app.utils.retry import Retry
+from app.utils.retry import (
+    Retry,
+    CircuitBreaker,
+    CircuitOpenError,
+    DeadlineExceededError,
+    RETRYABLE_STATUS,
+    is_retryable,
+)
+from app.utils.limiter import AIMDController, RequestHedger
 
 loop = get_event_loop()
+# 下载文件的硬盘读写专用线程池，避免大文件写入占用默认线程池或阻塞事件循环
+io_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="AutoFilm_IO")
+
+
+async def run_io(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    在硬盘读写线程池中执行函数
+
+    :param func: 函数
+    :param args: 位置参数
+    :param kwargs: 关键字参数
+    :return: 函数返回值
+    """
+    return await get_running_loop().run_in_executor(
+        io_executor, partial(func, *args, **kwargs)
+    )
 
 
 class HTTPClient:
@@ -22,36 +71,211 @@ class HTTPClient:
     HTTP 客户端类
     """
 
-    # 最小流式下载文件大小，128MB
-    MINI_STREAM_SIZE: int = 128 * 1024 * 1024
+    # 单个下载分片的最小大小，32MB
+    SEGMENT_SIZE: int = 32 * 1024 * 1024
+    # 下载时每次读取的块大小，64KB
+    ITER_CHUNK_SIZE: int = 64 * 1024
+    # 下载数据累积到该大小后写入硬盘，1MB
+    WRITE_BUFFER_SIZE: int = 1024 * 1024
+    # 下载进度保存间隔，8MB
+    PROGRESS_SAVE_INTERVAL: int = 8 * 1024 * 1024
+    # 分片下载中断时的重试次数
+    SEGMENT_RETRIES: int = 3
+    # 请求最大尝试次数
+    RETRY_TRIES: int = 3
+    # 重试初始间隔（秒），之后按 RETRY_BACKOFF 倍数增长
+    RETRY_DELAY: float = 1
+    RETRY_BACKOFF: float = 2
+    # 服务器通过 Retry-After 要求的最长等待时间（秒）
+    RETRY_MAX_DELAY: float = 30
+    # 单个请求（含重试）的默认截止时间（秒）
+    DEADLINE: float = 60
+    # 幂等的请求方法，请求已发出后失败仍可重试
+    IDEMPOTENT_METHODS: frozenset[str] = frozenset(
+        {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+    )
+    # 请求未发出的异常，非幂等请求也可以重试
+    UNSENT_ERRORS: tuple[type[Exception], ...] = (
+        ConnectError,
+        ConnectTimeout,
+        PoolTimeout,
+    )
+    # 下载校验支持的哈希算法，按优先级排列
+    HASH_ALGORITHMS: tuple[str, ...] = ("sha1", "md5", "sha256")
     # 默认请求头
     HEADERS: dict[str, str] = {
         "User-Agent": f"AutoFilm/{settings.APP_VERSION}",
         "Accept": "application/json",
     }
 
-    def __init__(self):
+    # 所有存活的客户端，用于汇总连接池状态及退出时关闭
+    __instances: "WeakSet[HTTPClient]" = WeakSet()
+
+    def __init__(
+        self,
+        controller: "AIMDController | None" = None,
+        hedger: "RequestHedger | None" = None,
+        name: str = "",
+    ):
         """
         初始化 HTTP 客户端
+        连接池大小、保持连接时间、HTTP/2 及超时时间读取配置文件 Settings 中的 HTTP_* 项
+
+        :param controller: 自适应并发控制器，设置后异步请求的延迟及结果会反馈给控制器
+        :param hedger: 对冲请求，设置后 hedge=True 的异步请求在延迟过高时发送对冲请求
+        :param name: 客户端名称，用于连接池状态展示
         """
 
+        self.controller = controller
+        self.hedger = hedger
+        self.name = name or f"HTTPClient-{id(self):x}"
+        self.last_used = monotonic()  # 最后一次使用的时间
+        self.inflight = 0  # 进行中的请求及下载数
+        self.__sync_client: Client | None = None  # 同步客户端在首次同步请求时创建
+        self.__pool_waiting = 0  # 正在等待连接池分配连接的请求数
+        self.__pool_waits = 0  # 已分配连接的请求数
+        self.__pool_wait_total = 0.0  # 等待连接的总时间
+        self.__pool_wait_max = 0.0  # 等待连接的最长时间
         self.__new_async_client()
-        self.__new_sync_client()
-        register(loop.run_until_complete, self.async_close())
-        # register(print, "HTTP 客户端已关闭")
-        # self.request()
+        self.__instances.add(self)
+
+    @staticmethod
+    def __client_options() -> dict[str, Any]:
+        """
+        根据配置生成 httpx 客户端参数
+        """
+        return {
+            "http2": settings.HTTP2,
+            "follow_redirects": True,
+            "timeout": Timeout(
+                settings.HTTP_TIMEOUT, connect=settings.HTTP_CONNECT_TIMEOUT
+            ),
+            "limits": Limits(
+                max_connections=settings.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+            ),
+        }
 
     def __new_sync_client(self):
         """
         创建新的同步 HTTP 客户端
         """
-        self.__sync_client = Client(http2=True, follow_redirects=True, timeout=10)
+        self.__sync_client = Client(**self.__client_options())
 
     def __new_async_client(self):
         """
         创建新的异步 HTTP 客户端
         """
-        self.__async_client = AsyncClient(http2=True, follow_redirects=True, timeout=10)
+        self.__async_client = AsyncClient(**self.__client_options())
+
+    @contextmanager
+    def __in_use(self) -> Iterator[None]:
+        """
+        记录客户端正在使用，空闲客户端回收时跳过正在使用的客户端
+        """
+        self.inflight += 1
+        self.last_used = monotonic()
+        try:
+            yield
+        finally:
+            self.inflight -= 1
+            self.last_used = monotonic()
+
+    def __with_timeout(self, url: str, kwargs: dict[str, Any]) -> dict[str, Any]:
+        """
+        未指定 timeout 时使用配置文件 HTTP_TIMEOUTS 中与请求路径前缀匹配最长的超时时间
+        """
+        if "timeout" not in kwargs and settings.HTTP_TIMEOUTS:
+            path = urlsplit(url).path
+            prefix = max(
+                (p for p in settings.HTTP_TIMEOUTS if path.startswith(p)),
+                key=len,
+                default=None,
+            )
+            if prefix is not None:
+                kwargs["timeout"] = Timeout(
+                    settings.HTTP_TIMEOUTS[prefix],
+                    connect=settings.HTTP_CONNECT_TIMEOUT,
+                )
+        return kwargs
+
+    def __pool_trace(self, kwargs: dict[str, Any]) -> Callable[[], None]:
+        """
+        为异步请求添加 httpcore trace 回调，统计等待连接池分配连接的时间
+        （从发起请求到开始建立新连接或在已有连接上发送请求）
+
+        :param kwargs: 请求参数，会被添加 extensions["trace"]
+        :return: 请求结束时调用的函数，请求未获得连接就失败时结束等待计数
+        """
+        started = monotonic()
+        waiting = True
+        self.__pool_waiting += 1
+
+        def acquired() -> None:
+            nonlocal waiting
+            if waiting:
+                waiting = False
+                self.__pool_waiting -= 1
+                wait = monotonic() - started
+                self.__pool_waits += 1
+                self.__pool_wait_total += wait
+                self.__pool_wait_max = max(self.__pool_wait_max, wait)
+
+        async def trace(event_name: str, info: dict[str, Any]) -> None:
+            if event_name.endswith(
+                ("connect_tcp.started", "send_request_headers.started")
+            ):
+                acquired()
+
+        def finish() -> None:
+            nonlocal waiting
+            if waiting:
+                waiting = False
+                self.__pool_waiting -= 1
+
+        kwargs["extensions"] = {**kwargs.get("extensions", {}), "trace": trace}
+        return finish
+
+    @property
+    def pool_stats(self) -> dict[str, Any]:
+        """
+        连接池状态：活动及空闲连接数、等待连接的请求数及等待时间
+        """
+        connections = getattr(
+            getattr(self.__async_client._transport, "_pool", None), "connections", []
+        )
+        idle = sum(1 for connection in connections if connection.is_idle())
+        return {
+            "active_connections": len(connections) - idle,
+            "idle_connections": idle,
+            "max_connections": settings.HTTP_MAX_CONNECTIONS,
+            "waiting_requests": self.__pool_waiting,
+            "wait_avg": round(self.__pool_wait_total / self.__pool_waits, 4)
+            if self.__pool_waits
+            else 0,
+            "wait_max": round(self.__pool_wait_max, 4),
+            "inflight": self.inflight,
+            "idle_seconds": round(monotonic() - self.last_used, 1),
+        }
+
+    @classmethod
+    def all_pool_stats(cls) -> dict[str, dict[str, Any]]:
+        """
+        所有存活客户端的连接池状态
+        """
+        return {client.name: client.pool_stats for client in list(cls.__instances)}
+
+    @classmethod
+    def close_all(cls) -> None:
+        """
+        关闭所有存活的客户端（程序退出时调用）
+        """
+        for client in list(cls.__instances):
+            try:
+                client.sync_close()
+            except RuntimeError:  # 事件循环已关闭
+                pass
 
     def close_sync_client(self):
         """
@@ -59,6 +283,7 @@ class HTTPClient:
         """
         if self.__sync_client:
             self.__sync_client.close()
+            self.__sync_client = None
 
     async def close_async_client(self):
         """
@@ -71,6 +296,7 @@ class HTTPClient:
         """
         同步关闭所有客户端
         """
+        self.__instances.discard(self)
         self.close_sync_client()
         loop.run_until_complete(self.close_async_client())
 
@@ -78,34 +304,171 @@ class HTTPClient:
         """
         异步关闭所有客户端
         """
+        self.__instances.discard(self)
         self.close_sync_client()
         await self.close_async_client()
 
-    @Retry.sync_retry(TimeoutException, tries=3, delay=1, backoff=2, logger=logger)
-    def _sync_request(self, method: str, url: str, **kwargs) -> Response:
+    def __prepare_retry(
+        self, method: str, url: str, idempotent: bool | None, deadline: float | None
+    ) -> tuple[CircuitBreaker, bool, float]:
         """
-        发起同步 HTTP 请求
+        获取请求对应的熔断器、是否幂等及截止时间
         """
-        try:
-            return self.__sync_client.request(method, url, **kwargs)
-        except TimeoutException:
-            self.close_sync_client()
-            self.__new_sync_client()
-            raise TimeoutException
+        _, domain, port = URLUtils.get_resolve_url(url)
+        breaker = CircuitBreaker.get(f"{domain}:{port}")
+        if idempotent is None:
+            idempotent = method.upper() in self.IDEMPOTENT_METHODS
+        return breaker, idempotent, monotonic() + (deadline or self.DEADLINE)
+
+    def __retry_wait(
+        self,
+        attempt: int,
+        deadline_at: float,
+        error: BaseException | None,
+        resp: Response | None,
+        idempotent: bool,
+    ) -> float | None:
+        """
+        判断请求失败后是否重试，返回重试前的等待时间，不重试时返回 None
+
+        :param attempt: 已尝试次数
+        :param deadline_at: 截止时间
+        :param error: 请求异常
+        :param resp: 响应对象（请求未抛出异常时）
+        :param idempotent: 请求是否幂等
+        """
+        if attempt >= self.RETRY_TRIES:
+            return None
+        if error is not None:
+            # 非幂等请求仅在确认请求未发出（连接失败）时重试
+            if not is_retryable(error) or (
+                not idempotent and not isinstance(error, self.UNSENT_ERRORS)
+            ):
+                return None
+        elif resp.status_code not in RETRYABLE_STATUS or not idempotent:
+            return None
+
+        wait = Retry.backoff_delay(attempt, self.RETRY_DELAY, self.RETRY_BACKOFF)
+        retry_after = resp.headers.get("Retry-After", "") if resp is not None else ""
+        if retry_after.isdigit():
+            wait = max(wait, min(float(retry_after), self.RETRY_MAX_DELAY))
+        if monotonic() + wait >= deadline_at:
+            return None
+        return wait
+
+    def _sync_request(
+        self,
+        method: str,
+        url: str,
+        *,
+        idempotent: bool | None = None,
+        deadline: float | None = None,
+        **kwargs,
+    ) -> Response:
+        """
+        发起同步 HTTP 请求
+        临时错误（超时、网络错误、429/5xx）按指数退避重试，主机连续失败时熔断
 
-    @Retry.async_retry(TimeoutException, tries=3, delay=1, backoff=2, logger=logger)
-    def _async_request(
-        self, method: str, url: str, **kwargs
-    ) -> Coroutine[Any, Any, Response]:
+        :param idempotent: 请求是否幂等，默认按请求方法判断
+        :param deadline: 请求（含重试）的截止时间（秒），默认为 DEADLINE
+        """
+        breaker, idempotent, deadline_at = self.__prepare_retry(
+            method, url, idempotent, deadline
+        )
+        attempt = 0
+        while True:
+            attempt += 1
+            probe = breaker.check()
+            error, resp = None, None
+            try:
+                if self.__sync_client is None:
+                    self.__new_sync_client()
+                resp = self.__sync_client.request(method, url, **kwargs)
+            except TransportError as e:
+                breaker.record_failure()
+                error = e
+            else:
+                if resp.status_code >= 500:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+            finally:
+                if probe:
+                    breaker.end_probe()
+
+            wait = self.__retry_wait(attempt, deadline_at, error, resp, idempotent)
+            if wait is None:
+                if error is not None:
+                    raise error
+                return resp
+            logger.warning(
+                f"{method.upper()} {url} 请求失败：{error or resp.status_code}，"
+                f"{wait:.1f} 秒后重试"
+            )
+            sleep(wait)
+
+    async def _async_request(
+        self,
+        method: str,
+        url: str,
+        *,
+        idempotent: bool | None = None,
+        deadline: float | None = None,
+        hedge: bool = False,
+        **kwargs,
+    ) -> Response:
         """
         发起异步 HTTP 请求
+        临时错误（超时、网络错误、429/5xx）按指数退避重试，主机连续失败时熔断
+
+        :param idempotent: 请求是否幂等，默认按请求方法判断
+        :param deadline: 请求（含重试）的截止时间（秒），默认为 DEADLINE
+        :param hedge: 是否允许对冲请求（仅用于只读请求，需设置 hedger）
         """
-        try:
-            return self.__async_client.request(method, url, **kwargs)
-        except TimeoutException:
-            self.close_async_client()
-            self.__new_async_client()
-            raise TimeoutException
+        breaker, idempotent, deadline_at = self.__prepare_retry(
+            method, url, idempotent, deadline
+        )
+        attempt = 0
+        while True:
+            attempt += 1
+            probe = breaker.check()
+            error, resp = None, None
+            finish = self.__pool_trace(kwargs)
+            try:
+                async with timeout(deadline_at - monotonic()):
+                    if hedge and idempotent and self.hedger is not None:
+                        resp = await self.hedger.request(
+                            url.split("?")[0],  # 按接口统计延迟
+                            lambda: self.__async_client.request(method, url, **kwargs),
+                        )
+                    else:
+                        resp = await self.__async_client.request(method, url, **kwargs)
+            except TimeoutError:
+                breaker.record_failure()
+                raise DeadlineExceededError(f"{method.upper()} {url} 请求超出截止时间")
+            except TransportError as e:
+                breaker.record_failure()
+                error = e
+            else:
+                if resp.status_code >= 500:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+            finally:
+                if probe:
+                    breaker.end_probe()
+                finish()
+
+            wait = self.__retry_wait(attempt, deadline_at, error, resp, idempotent)
+            if wait is None:
+                if error is not None:
+                    raise error
+                return resp
+            logger.warning(
+                f"{method.upper()} {url} 请求失败：{error or resp.status_code}，"
+                f"{wait:.1f} 秒后重试"
+            )
+            await async_sleep(wait)
 
     @overload
     def request(
@@ -136,10 +499,71 @@ class HTTPClient:
         """
         headers = kwargs.get("headers", self.HEADERS)
         kwargs["headers"] = headers
+        kwargs = self.__with_timeout(url, kwargs)
         if sync:
-            return self._sync_request(method, url, **kwargs)
+            with self.__in_use():
+                return self._sync_request(method, url, **kwargs)
         else:
-            return self._async_request(method, url, **kwargs)
+            return self.__tracked_request(method, url, **kwargs)
+
+    async def __tracked_request(self, method: str, url: str, **kwargs) -> Response:
+        """
+        发起异步 HTTP 请求，并记录客户端使用状态
+        """
+        with self.__in_use():
+            if self.controller is not None:
+                return await self.__observed_request(method, url, **kwargs)
+            return await self._async_request(method, url, **kwargs)
+
+    async def __observed_request(self, method: str, url: str, **kwargs) -> Response:
+        """
+        发起异步 HTTP 请求，并将延迟及结果（429/5xx、超时等过载信号）反馈给自适应并发控制器
+        """
+        self.controller.started()
+        start = monotonic()
+        overloaded = True
+        try:
+            resp = await self._async_request(method, url, **kwargs)
+            overloaded = resp.status_code == 429 or resp.status_code >= 500
+            return resp
+        except (CancelledError, CircuitOpenError):
+            overloaded = None  # 请求被取消或被熔断器拒绝，不计入统计
+            raise
+        finally:
+            self.controller.finished(monotonic() - start, overloaded)
+
+    @asynccontextmanager
+    async def stream(self, method: str, url: str, **kwargs) -> AsyncIterator[Response]:
+        """
+        发起流式异步请求，在上下文中逐块读取响应体
+        响应体读取过程中无法透明重试，因此不自动重试，失败时由调用方决定是否重试
+
+        :param method: 请求方法
+        :param url: 请求 URL
+        :param kwargs: 其他请求参数，如 headers, content 等
+        :return: HTTP 响应对象
+        """
+        kwargs["headers"] = kwargs.get("headers", self.HEADERS)
+        kwargs = self.__with_timeout(url, kwargs)
+        breaker, _, _ = self.__prepare_retry(method, url, None, None)
+        probe = breaker.check()
+        with self.__in_use():
+            finish = self.__pool_trace(kwargs)
+            try:
+                async with self.__async_client.stream(method, url, **kwargs) as resp:
+                    if resp.status_code >= 500:
+                        breaker.record_failure()
+                    else:
+                        breaker.record_success()
+                    probe = False  # 已得出结果，读取响应体期间不再占用探测名额
+                    yield resp
+            except TransportError:
+                breaker.record_failure()
+                raise
+            finally:
+                if probe:
+                    breaker.end_probe()
+                finish()
 
     @overload
     def head(self, url: str, *, sync: Literal[True], **kwargs) -> Response: ...
@@ -263,83 +687,409 @@ class HTTPClient:
         file_path: Path,
         params: dict | None = None,
         chunk_num: int = 5,
+        hashes: dict[str, str] | None = None,
         **kwargs,
-    ) -> None:
+    ) -> tuple[str, str] | None:
+        """
+        下载文件，详见 __download
+        哈希校验失败时可能是传输过程中数据损坏，丢弃临时文件及下载进度后重新下载一次
+
+        :param url: 文件的 URL
+        :param file_path: 文件保存路径
+        :param params: 请求参数
+        :param chunk_num: 最大分片数
+        :param hashes: 文件的预期哈希，如 {"sha1": "..."}
+        :param kwargs: 其他请求参数，如 headers, cookies 等
+        :return: 校验通过的 (算法, 哈希值)，未校验时返回 None
+        """
+        with self.__in_use():
+            try:
+                return await self.__download(
+                    url, file_path, params, chunk_num, hashes, **kwargs
+                )
+            except HashMismatchError as e:
+                logger.warning(f"{e}，重新下载")
+                return await self.__download(
+                    url, file_path, params, chunk_num, hashes, **kwargs
+                )
+
+    async def __download(
+        self,
+        url: str,
+        file_path: Path,
+        params: dict | None = None,
+        chunk_num: int = 5,
+        hashes: dict[str, str] | None = None,
+        **kwargs,
+    ) -> tuple[str, str] | None:
         """
         下载文件！！！仅支持异步下载！！！
+        服务器支持 Range 时按文件大小分片并发下载，各分片直接写入预分配文件的对应位置
+        数据先写入目标目录下的隐藏临时文件，下载完成后原子替换为目标文件
+        下载进度保存在临时文件旁的 .json 文件中，中断后再次下载会跳过已完成的部分
+        空文件无法满足探测请求的 Range（返回 416），直接写入空文件
+        服务器返回的文件大小未知（Content-Range 为 bytes 0-0/*）时不带 Range 重新请求，不分片下载
+        传入 hashes 时校验哈希，与之不一致时丢弃临时文件并抛出 HashMismatchError；
+        不分片或只有一个从头下载的分片时边下载边计算哈希，
+        多个分片或继续下载时各分片乱序到达，下载完成后重新读取临时文件计算
 
         :param url: 文件的 URL
         :param file_path: 文件保存路径
         :param params: 请求参数
+        :param chunk_num: 最大分片数
+        :param hashes: 文件的预期哈希，如 {"sha1": "..."}，使用 HASH_ALGORITHMS 中第一个可用的算法校验
         :param kwargs: 其他请求参数，如 headers, cookies 等
+        :return: 校验通过的 (算法, 哈希值)，未校验时返回 None
         """
         if params is None:
             params = {}
+        algorithm = next(
+            (name for name in self.HASH_ALGORITHMS if name in (hashes or {})), None
+        )
+
+        part_file = file_path.with_name(f".{file_path.name}.part")
+        progress_file = file_path.with_name(f".{file_path.name}.part.json")
+        await run_io(makedirs, file_path.parent, exist_ok=True)
+
+        headers = kwargs.pop("headers", self.HEADERS)
+        probe_headers = {**headers, "Range": "bytes=0-0"}
+        async with self.__async_client.stream(
+            "GET", url, params=params, headers=probe_headers, **kwargs
+        ) as resp:
+            content_range = resp.headers.get("Content-Range", "")
+            total = content_range.rpartition("/")[2]
+            if resp.status_code == 416 and total in ("", "0"):
+                logger.debug(f"{file_path.name} 为空文件")
+                await run_io(part_file.write_bytes, b"")
+                hasher = new_hash(algorithm) if algorithm else None
+                return await self.__finish_download(
+                    part_file, progress_file, file_path, algorithm, hashes, hasher
+                )
+            resp.raise_for_status()
+            if resp.status_code == 200:
+                # 服务器不支持 Range，返回完整文件，直接使用当前响应流式下载
+                logger.debug(f"{file_path.name} 服务器不支持分片下载，直接下载")
+                hasher = new_hash(algorithm) if algorithm else None
+                await self.__download_stream(resp, part_file, hasher)
+                return await self.__finish_download(
+                    part_file, progress_file, file_path, algorithm, hashes, hasher
+                )
+            file_size = None
+            if resp.status_code == 206 and total.isdigit():
+                file_size = int(total)
+            range_url = str(resp.url)  # 跟随重定向后的地址，避免每个分片重复跳转
+            validator = resp.headers.get("ETag") or resp.headers.get(
+                "Last-Modified", ""
+            )
+
+        if file_size is None:
+            # 文件大小未知（如 Content-Range: bytes 0-0/*），探测响应只有 1 字节，
+            # 不带 Range 重新请求完整文件
+            logger.debug(f"{file_path.name} 文件大小未知，不分片直接下载")
+            hasher = new_hash(algorithm) if algorithm else None
+            async with self.__async_client.stream(
+                "GET", url, params=params, headers=headers, **kwargs
+            ) as resp:
+                resp.raise_for_status()
+                await self.__download_stream(resp, part_file, hasher)
+            return await self.__finish_download(
+                part_file, progress_file, file_path, algorithm, hashes, hasher
+            )
+
+        segments = await run_io(
+            self.__load_progress, part_file, progress_file, file_size, validator
+        )
+        if segments is None:
+            segments = [
+                [start, end, start]
+                for start, end in self.caculate_divisional_range(file_size, chunk_num)
+            ]
+            await run_io(self.__preallocate, part_file, file_size)
+            logger.debug(f"开始分片下载文件：{file_path.name}，分片数：{len(segments)}")
+        else:
+            done = sum(pos - start for start, _, pos in segments)
+            logger.info(
+                f"继续下载文件：{file_path.name}，已完成 {done}/{file_size} 字节"
+            )
+
+        # 仅有一个从头下载的分片时数据按顺序到达，可以边下载边计算哈希，否则下载完成后读取文件计算
+        hasher = None
+        if algorithm and len(segments) == 1 and segments[0][2] == 0:
+            hasher = new_hash(algorithm)
+
+        progress = {
+            "size": file_size,
+            "validator": validator,
+            "segments": segments,
+            "unsaved": 0,
+            "lock": Lock(),
+        }
+        try:
+            async with TaskGroup() as tg:
+                for segment in segments:
+                    if segment[2] <= segment[1]:
+                        tg.create_task(
+                            self.__download_segment(
+                                range_url,
+                                part_file,
+                                segment,
+                                progress,
+                                progress_file,
+                                hasher,
+                                headers=headers,
+                                **kwargs,
+                            )
+                        )
+        except BaseException:
+            await self.__save_progress(progress, progress_file)
+            raise
 
-        # 合并所有参数到一个字典中
-        request_kwargs = {'params': params}
-        request_kwargs.update(kwargs)
-        resp = await self.head(url, sync=False, **request_kwargs)
-        print(resp.headers)
-
-        file_size = int(resp.headers.get("Content-Length", -1))
-
-        with TemporaryDirectory(prefix="AutoFilm_") as temp_dir:  # 创建临时目录
-            temp_file = Path(temp_dir) / file_path.name
-            if not temp_file.exists():
-                temp_file.touch()
-            if file_size == -1:
-                logger.debug(f"{file_path.name} 文件大小未知，直接下载")
-                await self.__download_chunk(url, temp_file, 0, 0, **kwargs)
+        return await self.__finish_download(
+            part_file, progress_file, file_path, algorithm, hashes, hasher
+        )
+
+    async def __finish_download(
+        self,
+        part_file: Path,
+        progress_file: Path,
+        file_path: Path,
+        algorithm: str | None,
+        hashes: dict[str, str] | None,
+        hasher: Any = None,
+    ) -> tuple[str, str] | None:
+        """
+        校验下载完成的临时文件，并替换为目标文件
+
+        :param part_file: 临时文件路径
+        :param progress_file: 下载进度文件路径
+        :param file_path: 文件保存路径
+        :param algorithm: 校验使用的哈希算法，为 None 时不校验
+        :param hashes: 文件的预期哈希
+        :param hasher: 下载过程中计算的哈希对象，为 None 时读取临时文件计算
+        :return: 校验通过的 (算法, 哈希值)，未校验时返回 None
+        """
+        verified = None
+        if algorithm:
+            if hasher is not None:
+                digest = hasher.hexdigest()
             else:
-                async with TaskGroup() as tg:
-                    try:
-                        logger.debug(
-                            f"开始分片下载文件：{file_path.name}，分片数:{chunk_num}"
-                        )
-                        for start, end in self.caculate_divisional_range(
-                            file_size, chunk_num=chunk_num
-                        ):
-                            tg.create_task(
-                                self.__download_chunk(url, temp_file, start, end, **kwargs)
-                            )
-                    except Exception as e:
-                        logger.error(f"分片下载处理失败 {str(e)}")
-                        raise
-            copy(temp_file, file_path)
+                digest = await run_io(self.hash_file, part_file, algorithm)
+            if digest != hashes[algorithm].lower():
+                await run_io(part_file.unlink, missing_ok=True)
+                await run_io(progress_file.unlink, missing_ok=True)
+                raise HashMismatchError(
+                    f"{file_path.name} {algorithm} 校验失败：预期 {hashes[algorithm]}，实际 {digest}"
+                )
+            verified = (algorithm, digest)
+
+        await run_io(replace, part_file, file_path)
+        await run_io(progress_file.unlink, missing_ok=True)
+        return verified
+
+    @classmethod
+    def hash_file(cls, file_path: Path, algorithm: str) -> str:
+        """
+        分块读取文件计算哈希（同步，会阻塞当前线程）
+
+        :param file_path: 文件路径
+        :param algorithm: 哈希算法
+        :return: 小写十六进制哈希值
+        """
+        hasher = new_hash(algorithm)
+        buffer = bytearray(cls.WRITE_BUFFER_SIZE)
+        view = memoryview(buffer)
+        with open(file_path, "rb") as file:
+            while size := file.readinto(buffer):
+                hasher.update(view[:size])
+        return hasher.hexdigest()
+
+    async def __download_stream(
+        self, resp: Response, file_path: Path, hasher: Any = None
+    ) -> None:
+        """
+        将响应内容顺序写入文件
 
-    async def __download_chunk(
+        :param resp: 流式 HTTP 响应对象
+        :param file_path: 文件保存路径
+        :param hasher: 哈希对象，不为 None 时边下载边计算哈希
+        """
+        file = await run_io(open, file_path, "wb")
+        try:
+            writer = BufferedFileWriter(file, 0, self.WRITE_BUFFER_SIZE)
+            async for chunk in resp.aiter_bytes(self.ITER_CHUNK_SIZE):
+                if hasher is not None:
+                    hasher.update(chunk)
+                await writer.write(chunk)
+            await writer.flush()
+        finally:
+            await run_io(file.close)
+
+    async def __download_segment(
         self,
         url: str,
         file_path: Path,
-        start: int,
-        end: int,
-        iter_chunked_size: int = 64 * 1024,
+        segment: list[int],
+        progress: dict[str, Any],
+        progress_file: Path,
+        hasher: Any,
+        headers: dict[str, str],
         **kwargs,
-    ):
+    ) -> None:
         """
-        下载文件的分片
+        下载文件的分片，写入文件的对应位置
+        分片中途断开时从已写入的位置继续请求
 
         :param url: 文件的 URL
         :param file_path: 文件保存路径
-        :param start: 分片的开始位置
-        :param end: 分片的结束位置
-        :param iter_chunked_size: 下载的块大小（下载完成后再写入硬盘），默认为 64KB
-        :param kwargs: 其他请求参数，如 headers, cookies, proxies 等
+        :param segment: 分片信息 [开始位置, 结束位置, 已写入位置]
+        :param progress: 下载进度
+        :param progress_file: 下载进度文件路径
+        :param hasher: 哈希对象，不为 None 时边下载边计算哈希
+        :param headers: 请求头
+        :param kwargs: 其他请求参数，如 cookies, proxies 等
+        """
+        _, end, _ = segment
+        file = await run_io(open, file_path, "r+b")
+        try:
+            for attempt in range(1, self.SEGMENT_RETRIES + 1):
+                try:
+                    await self.__fetch_range(
+                        url,
+                        file,
+                        segment,
+                        progress,
+                        progress_file,
+                        hasher,
+                        headers=headers,
+                        **kwargs,
+                    )
+                    break
+                except (TransportError, IncompleteSegmentError) as e:
+                    if attempt == self.SEGMENT_RETRIES:
+                        raise
+                    logger.warning(
+                        f"{file_path.name} 分片 {segment[2]}-{end} 下载中断：{e}，"
+                        f"第 {attempt} 次重试"
+                    )
+        finally:
+            await run_io(file.close)
+
+    async def __fetch_range(
+        self,
+        url: str,
+        file: BinaryIO,
+        segment: list[int],
+        progress: dict[str, Any],
+        progress_file: Path,
+        hasher: Any,
+        headers: dict[str, str],
+        **kwargs,
+    ) -> None:
+        """
+        请求分片剩余部分并写入文件
+
+        :param url: 文件的 URL
+        :param file: 已打开的文件对象
+        :param segment: 分片信息 [开始位置, 结束位置, 已写入位置]
+        :param progress: 下载进度
+        :param progress_file: 下载进度文件路径
+        :param hasher: 哈希对象，不为 None 时边下载边计算哈希
+        :param headers: 请求头
+        :param kwargs: 其他请求参数，如 cookies, proxies 等
+        """
+        _, end, pos = segment
+
+        async def on_written(size: int) -> None:
+            # 数据写入硬盘后再更新进度，保证进度不超前
+            segment[2] += size
+            progress["unsaved"] += size
+            if progress["unsaved"] >= self.PROGRESS_SAVE_INTERVAL:
+                await self.__save_progress(progress, progress_file)
+
+        range_headers = {**headers, "Range": f"bytes={pos}-{end}"}
+        async with self.__async_client.stream(
+            "GET", url, headers=range_headers, **kwargs
+        ) as resp:
+            resp.raise_for_status()
+            if resp.status_code != 206:
+                raise IncompleteSegmentError(f"服务器未返回分片内容：{resp.status_code}")
+
+            writer = BufferedFileWriter(file, pos, self.WRITE_BUFFER_SIZE, on_written)
+            remaining = end + 1 - pos
+            try:
+                async for chunk in resp.aiter_bytes(self.ITER_CHUNK_SIZE):
+                    if len(chunk) > remaining:  # 丢弃超出分片范围的数据
+                        chunk = chunk[:remaining]
+                    if hasher is not None:
+                        hasher.update(chunk)
+                    await writer.write(chunk)
+                    remaining -= len(chunk)
+                    if remaining == 0:
+                        break
+            finally:
+                await writer.flush()
+
+        if segment[2] <= end:
+            raise IncompleteSegmentError(f"分片数据不完整：{segment[2]}-{end}")
+
+    @staticmethod
+    async def __save_progress(progress: dict[str, Any], progress_file: Path) -> None:
+        """
+        保存下载进度
+
+        :param progress: 下载进度
+        :param progress_file: 下载进度文件路径
         """
+        async with progress["lock"]:
+            progress["unsaved"] = 0
+            content = dumps(
+                {
+                    "size": progress["size"],
+                    "validator": progress["validator"],
+                    "segments": progress["segments"],
+                }
+            )
+
+            def save() -> None:
+                temp_file = progress_file.with_name(progress_file.name + ".tmp")
+                temp_file.write_text(content)
+                replace(temp_file, progress_file)
+
+            await run_io(save)
 
-        await to_thread(makedirs, file_path.parent, exist_ok=True)
+    @staticmethod
+    def __load_progress(
+        part_file: Path, progress_file: Path, file_size: int, validator: str
+    ) -> list[list[int]] | None:
+        """
+        读取下载进度，文件已变化或进度无效时返回 None
 
-        if start != 0 and end != 0:
-            headers = kwargs.get("headers", {})
-            headers["Range"] = f"bytes={start}-{end}"
-            kwargs["headers"] = headers
+        :param part_file: 未完成的下载文件路径
+        :param progress_file: 下载进度文件路径
+        :param file_size: 远程文件大小
+        :param validator: 远程文件的 ETag 或 Last-Modified
+        :return: 分片信息列表
+        """
+        try:
+            data = loads(progress_file.read_text())
+            if part_file.stat().st_size != file_size:
+                return None
+        except (OSError, ValueError):
+            return None
+        if data.get("size") != file_size or data.get("validator") != validator:
+            return None
+        return data.get("segments") or None
 
-        resp = await self.get(url, sync=False, **kwargs)
-        async with async_open(file_path, "ab") as file:
-            file.seek(start)
-            async for chunk in resp.aiter_bytes(iter_chunked_size):
-                await file.write(chunk)
+    @staticmethod
+    def __preallocate(file_path: Path, file_size: int) -> None:
+        """
+        创建指定大小的文件，供各分片按位置写入
+
+        :param file_path: 文件路径
+        :param file_size: 文件大小
+        """
+        with open(file_path, "wb") as file:
+            file.truncate(file_size)
 
     @staticmethod
     def caculate_divisional_range(
@@ -348,13 +1098,13 @@ class HTTPClient:
     ) -> list[tuple[int, int]]:
         """
         计算文件的分片范围
+        分片数随文件大小增加，每个分片不小于 SEGMENT_SIZE，且不超过 chunk_num
 
         :param file_size: 文件大小
-        :param chunk_num: 分片数
+        :param chunk_num: 最大分片数
         :return: 分片范围
         """
-        if file_size < HTTPClient.MINI_STREAM_SIZE or chunk_num <= 1:
-            return [(0, file_size - 1)]
+        chunk_num = max(1, min(chunk_num, file_size // HTTPClient.SEGMENT_SIZE))
 
         step = file_size // chunk_num  # 计算每个分片的基本大小
         remainder = file_size % chunk_num  # 计算剩余的字节数
@@ -371,6 +1121,102 @@ class HTTPClient:
         return chunks
 
 
+class BufferedFileWriter:
+    """
+    复用缓冲区的文件写入器
+    两块缓冲区交替使用：一块在 I/O 线程池中写入硬盘时，另一块继续接收网络数据
+    """
+
+    def __init__(
+        self,
+        file: BinaryIO,
+        offset: int,
+        buffer_size: int,
+        on_written: Callable[[int], Awaitable[None]] | None = None,
+    ) -> None:
+        """
+        :param file: 已打开的文件对象
+        :param offset: 开始写入的位置
+        :param buffer_size: 缓冲区大小
+        :param on_written: 每块数据写入硬盘后的回调，参数为写入的字节数
+        """
+        self.__file = file
+        self.__offset = offset
+        self.__on_written = on_written
+        self.__buffer = bytearray(buffer_size)
+        self.__spare = bytearray(buffer_size)
+        self.__used = 0
+        self.__pending: tuple[Future, int] | None = None
+
+    async def write(self, data: bytes) -> None:
+        """
+        写入数据，缓冲区写满时提交到 I/O 线程池
+
+        :param data: 数据
+        """
+        view = memoryview(data)
+        while view:
+            size = min(len(view), len(self.__buffer) - self.__used)
+            self.__buffer[self.__used : self.__used + size] = view[:size]
+            self.__used += size
+            view = view[size:]
+            if self.__used == len(self.__buffer):
+                await self.__submit()
+
+    async def flush(self) -> None:
+        """
+        将缓冲区中剩余的数据写入硬盘，并等待写入完成
+        """
+        if self.__used:
+            await self.__submit()
+        await self.__wait()
+
+    async def __submit(self) -> None:
+        """
+        提交当前缓冲区，之后使用另一块缓冲区接收数据
+        """
+        await self.__wait()  # 另一块缓冲区写入完成后才能复用
+        buffer, size = self.__buffer, self.__used
+        self.__buffer, self.__spare = self.__spare, buffer
+        self.__used = 0
+        offset = self.__offset
+        self.__offset += size
+        future = get_running_loop().run_in_executor(
+            io_executor, self.__write_at, offset, memoryview(buffer)[:size]
+        )
+        self.__pending = (future, size)
+
+    async def __wait(self) -> None:
+        """
+        等待已提交的写入完成
+        """
+        if self.__pending is None:
+            return
+        future, size = self.__pending
+        self.__pending = None
+        await future
+        if self.__on_written is not None:
+            await self.__on_written(size)
+
+    def __write_at(self, offset: int, data: memoryview) -> None:
+        self.__file.seek(offset)
+        self.__file.write(data)
+
+
+class IncompleteSegmentError(Exception):
+    """
+    分片下载不完整
+    """
+
+    retryable = True
+
+
+class HashMismatchError(Exception):
+    """
+    下载文件的哈希与预期不一致（已重新下载一次）
+    """
+
+
 class RequestUtils:
     """
     HTTP 请求工具类
@@ -378,6 +1224,7 @@ class RequestUtils:
     """
 
     __clients: dict[str, HTTPClient] = {}
+    __closing: set[Future] = set()  # 正在关闭的空闲客户端任务
 
     @classmethod
     def close(cls):
@@ -386,6 +1233,27 @@ class RequestUtils:
         """
         for client in cls.__clients.values():
             client.sync_close()
+        cls.__clients.clear()
+
+    @classmethod
+    def __evict_idle(cls) -> None:
+        """
+        回收空闲时间超过 HTTP_CLIENT_IDLE_TTL 且没有进行中请求的客户端
+        """
+        now = monotonic()
+        for key, client in list(cls.__clients.items()):
+            idle = now - client.last_used
+            if client.inflight or idle < settings.HTTP_CLIENT_IDLE_TTL:
+                continue
+            del cls.__clients[key]
+            logger.debug(f"回收空闲 HTTP 客户端：{key}")
+            try:
+                task = get_running_loop().create_task(client.async_close())
+            except RuntimeError:  # 不在事件循环中
+                client.sync_close()
+            else:
+                cls.__closing.add(task)
+                task.add_done_callback(cls.__closing.discard)
 
     @classmethod
     def __get_client(cls, url: str) -> HTTPClient:
@@ -398,8 +1266,9 @@ class RequestUtils:
 
         _, domain, port = URLUtils.get_resolve_url(url)
         key = f"{domain}:{port}"
+        cls.__evict_idle()
         if key not in cls.__clients:
-            cls.__clients[key] = HTTPClient()
+            cls.__clients[key] = HTTPClient(name=key)
         return cls.__clients[key]
 
     @overload
@@ -556,25 +1425,30 @@ class RequestUtils:
         url: str,
         file_path: Path,
         params: dict | None = None,
+        hashes: dict[str, str] | None = None,
         **kwargs,
-    ) -> None:
+    ) -> tuple[str, str] | None:
         """
         下载文件！！！仅支持异步下载！！！
 
         :param url: 文件的 URL
         :param file_path: 文件保存路径
         :param params: 请求参数
+        :param hashes: 文件的预期哈希，如 {"sha1": "..."}
         :param kwargs: 其他请求参数，如 headers, cookies 等
+        :return: 校验通过的 (算法, 哈希值)，未校验时返回 None
         """
         if params is None:
             params = {}
         try:
             client = cls.__get_client(url)
-            await client.download(url, file_path, params=params, **kwargs)
+            return await client.download(
+                url, file_path, params=params, hashes=hashes, **kwargs
+            )
         except Exception as e:
             logger.error(f"下载失败 {str(e)}")
             raise
 
 
 # 退出时关闭所有客户端
-register(RequestUtils.close)
+register(HTTPClient.close_all)
@@ -0,0 +1,555 @@
+from asyncio import (
+    FIRST_COMPLETED,
+    CancelledError,
+    Future,
+    create_task,
+    gather,
+    get_running_loop,
+    wait,
+)
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from threading import Lock
+from time import monotonic
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+from app.core import settings, logger
+
+# 当前请求所属的任务 ID，限流器按任务轮流放行等待中的请求
+current_task_id: ContextVar[str] = ContextVar("current_task_id", default="")
+
+
+class RateLimiter:
+    """
+    请求限流器
+    令牌桶限制每秒请求数，并发上限限制同时进行的请求数
+    等待中的请求按任务分组，各任务轮流放行，避免单个任务占满服务器配额
+    同一服务器的限流器由定时任务与 API 线程的事件循环共享，状态由线程锁保护，
+    放行时通过等待方所在的事件循环唤醒
+    """
+
+    __instances: dict[str, "RateLimiter"] = {}
+    __provider_instances: dict[tuple[str, str], "RateLimiter | None"] = {}
+
+    # 未在配置文件中设置的服务器使用的默认限额
+    DEFAULT_RATE: float = 0
+    DEFAULT_CONCURRENCY: int = 32
+
+    def __init__(
+        self,
+        name: str,
+        rate: float = 0,
+        burst: int = 0,
+        concurrency: int = 0,
+    ) -> None:
+        """
+        :param name: 限流器名称，用于日志输出
+        :param rate: 每秒最大请求数，为 0 时不限制
+        :param burst: 令牌桶容量（允许的瞬时请求数），为 0 时与 rate 相同
+        :param concurrency: 最大同时请求数，为 0 时不限制
+        """
+        self.name = name
+        self.rate = float(rate or 0)
+        self.burst = max(1.0, float(burst or self.rate or 1))
+        self.concurrency = int(concurrency or 0)
+        self.__tokens = self.burst
+        self.__updated = monotonic()
+        self.__active = 0
+        self.__waiters: OrderedDict[str, deque[Future]] = OrderedDict()
+        self.__lock = Lock()
+        self.__timer = False  # 是否已设置令牌补充后重试的定时器
+        self.__granted = 0  # 已放行请求数
+        self.__delayed = 0  # 需要排队的请求数
+        self.controller: AIMDController | None = None  # 自适应并发控制器
+        self.hedger: RequestHedger | None = None  # 对冲请求
+
+    @classmethod
+    def get(cls, url: str) -> "RateLimiter":
+        """
+        获取 Alist 服务器对应的限流器，同一服务器的所有任务共享同一个限流器
+        限额读取配置文件 AlistLimitList 中 url 相同的项
+
+        :param url: Alist 服务器地址
+        :return: 限流器
+        """
+        key = url.rstrip("/")
+        if key not in cls.__instances:
+            config = next(
+                (
+                    item
+                    for item in settings.AlistLimitList
+                    if str(item.get("url", "")).rstrip("/") == key
+                ),
+                {},
+            )
+            limiter = cls(
+                key,
+                rate=config.get("rate", cls.DEFAULT_RATE),
+                burst=config.get("burst", 0),
+                concurrency=config.get("concurrency", cls.DEFAULT_CONCURRENCY),
+            )
+            if config.get("adaptive", True) and limiter.concurrency:
+                limiter.controller = AIMDController(
+                    limiter,
+                    min_limit=config.get("min_concurrency", 2),
+                    max_limit=limiter.concurrency,
+                )
+            if config.get("hedge", False):
+                limiter.hedger = RequestHedger(
+                    limiter, budget=config.get("hedge_budget", 0.05)
+                )
+            logger.debug(
+                f"{key} 限流器：每秒 {limiter.rate or '不限'} 次请求，"
+                f"最大并发 {limiter.concurrency or '不限'}，"
+                f"自适应并发：{'开启' if limiter.controller else '关闭'}"
+            )
+            cls.__instances[key] = limiter
+        return cls.__instances[key]
+
+    @classmethod
+    def get_provider(cls, url: str, provider: str) -> "RateLimiter | None":
+        """
+        获取 Alist 服务器上某一存储驱动对应的限流器
+        限额读取配置文件 ProviderProfiles 中与驱动同名的项，未配置时返回 None
+
+        :param url: Alist 服务器地址
+        :param provider: 存储驱动名称，如 115 Cloud、Local
+        :return: 限流器
+        """
+        key = (url.rstrip("/"), provider)
+        if key not in cls.__provider_instances:
+            profile = settings.ProviderProfiles.get(provider) if provider else None
+            if profile:
+                limiter = cls(
+                    f"{key[0]} [{provider}]",
+                    rate=profile.get("rate", 0),
+                    burst=profile.get("burst", 0),
+                    concurrency=profile.get("concurrency", 0),
+                )
+                logger.debug(
+                    f"{limiter.name} 限流器：每秒 {limiter.rate or '不限'} 次请求，"
+                    f"最大并发 {limiter.concurrency or '不限'}"
+                )
+            else:
+                limiter = None
+            cls.__provider_instances[key] = limiter
+        return cls.__provider_instances[key]
+
+    @classmethod
+    def all_stats(cls) -> dict[str, dict[str, float]]:
+        """
+        所有限流器的状态
+        """
+        stats = {key: limiter.stats for key, limiter in cls.__instances.items()}
+        for limiter in cls.__provider_instances.values():
+            if limiter is not None:
+                stats[limiter.name] = limiter.stats
+        return stats
+
+    @property
+    def stats(self) -> dict[str, float]:
+        """
+        限流器状态：限额、进行中及等待中的请求数
+        """
+        stats = {
+            "rate": self.rate,
+            "concurrency": self.concurrency,
+            "active": self.__active,
+            "waiting": sum(len(waiters) for waiters in self.__waiters.values()),
+            "tasks_waiting": len(self.__waiters),
+            "granted": self.__granted,
+            "delayed": self.__delayed,
+        }
+        if self.controller is not None:
+            stats["adaptive"] = self.controller.stats
+        if self.hedger is not None:
+            stats["hedge"] = self.hedger.stats
+        return stats
+
+    def set_concurrency(self, concurrency: int) -> None:
+        """
+        调整并发上限，调大时立即放行等待中的请求
+
+        :param concurrency: 最大同时请求数
+        """
+        with self.__lock:
+            self.concurrency = concurrency
+            self.__dispatch()
+
+    @asynccontextmanager
+    async def limit(self, task_id: str | None = None) -> AsyncIterator[None]:
+        """
+        在限额内执行请求
+
+        :param task_id: 任务 ID，默认使用 current_task_id
+        """
+        await self.acquire(task_id)
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def acquire(self, task_id: str | None = None) -> None:
+        """
+        获取一次请求配额，超出限额时排队等待
+
+        :param task_id: 任务 ID，默认使用 current_task_id
+        """
+        if task_id is None:
+            task_id = current_task_id.get()
+        future = get_running_loop().create_future()
+        with self.__lock:
+            if not self.__waiters and self.__has_capacity() and self.__take_token():
+                self.__grant()
+                return
+            self.__delayed += 1
+            self.__waiters.setdefault(task_id, deque()).append(future)
+            self.__dispatch()
+        try:
+            await future
+        except CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()  # 已获得配额但调用方被取消，归还配额
+            raise
+
+    def release(self) -> None:
+        """
+        归还并发配额
+        """
+        with self.__lock:
+            self.__active -= 1
+            self.__dispatch()
+
+    def __has_capacity(self) -> bool:
+        return not self.concurrency or self.__active < self.concurrency
+
+    def __take_token(self) -> bool:
+        """
+        补充令牌后尝试取出一个令牌
+        """
+        if not self.rate:
+            return True
+        now = monotonic()
+        self.__tokens = min(
+            self.burst, self.__tokens + (now - self.__updated) * self.rate
+        )
+        self.__updated = now
+        if self.__tokens < 1:
+            return False
+        self.__tokens -= 1
+        return True
+
+    def __grant(self) -> None:
+        self.__active += 1
+        self.__granted += 1
+
+    def __dispatch(self) -> None:
+        """
+        按任务轮流放行等待中的请求，令牌不足时定时重试（需持有锁）
+        """
+        while self.__waiters and self.__has_capacity():
+            task_id, waiters = next(iter(self.__waiters.items()))
+            while waiters and waiters[0].done():  # 丢弃已取消的请求
+                waiters.popleft()
+            if not waiters:
+                del self.__waiters[task_id]
+                continue
+            loop = waiters[0].get_loop()
+            if not self.__take_token():
+                if not self.__timer:
+                    delay = (1 - self.__tokens) / self.rate
+                    self.__set_timer(loop, delay)
+                return
+            try:
+                loop.call_soon_threadsafe(self.__wake, waiters.popleft())
+                self.__grant()
+            except RuntimeError:  # 等待方所在的事件循环已关闭
+                self.__tokens += 1
+            # 放行一个请求后轮到下一个任务
+            if waiters:
+                self.__waiters.move_to_end(task_id)
+            else:
+                del self.__waiters[task_id]
+
+    def __wake(self, future: Future) -> None:
+        """
+        在等待方所在的事件循环中唤醒等待方
+        """
+        if future.done():  # 放行前已被取消，归还配额
+            self.release()
+        else:
+            future.set_result(None)
+
+    def __set_timer(self, loop: Any, delay: float) -> None:
+        """
+        在等待方所在的事件循环中设置定时器（需持有锁）
+        """
+        try:
+            loop.call_soon_threadsafe(loop.call_later, delay, self.__on_timer)
+            self.__timer = True
+        except RuntimeError:  # 事件循环已关闭，由下一次归还或请求触发放行
+            pass
+
+    def __on_timer(self) -> None:
+        with self.__lock:
+            self.__timer = False
+            self.__dispatch()
+
+
+class AIMDController:
+    """
+    AIMD（加性增、乘性减）自适应并发控制器
+    根据请求结果调整限流器的并发上限：从配置的并发上限开始，每个窗口（约一轮并发请求）结束时，
+    出现 429/5xx、超时等过载信号或 p95 延迟明显高于基线时将上限乘以 DECREASE_FACTOR，
+    否则在并发已用满的情况下将上限加 1，直到恢复配置的并发上限
+    """
+
+    # 过载时并发上限的缩减比例
+    DECREASE_FACTOR: float = 0.7
+    # 窗口 p95 延迟超过基线的倍数时视为延迟升高
+    LATENCY_TOLERANCE: float = 2.0
+    # 延迟升高的最小绝对值（秒），避免延迟很低时的抖动触发缩减
+    LATENCY_SLACK: float = 0.05
+    # 每个窗口的最少请求数
+    MIN_WINDOW: int = 5
+
+    def __init__(
+        self,
+        limiter: RateLimiter,
+        min_limit: int = 2,
+        max_limit: int = 32,
+        initial: int | None = None,
+    ) -> None:
+        """
+        :param limiter: 需要调整并发上限的限流器
+        :param min_limit: 并发上限的最小值
+        :param max_limit: 并发上限的最大值
+        :param initial: 初始并发上限，默认为 max_limit（只在出现过载信号后缩减）
+        """
+        self.limiter = limiter
+        self.min_limit = max(1, min(min_limit, max_limit))
+        self.max_limit = max_limit
+        self.limit = float(initial or max_limit)
+        self.limit = min(max(self.limit, self.min_limit), self.max_limit)
+        self.limiter.set_concurrency(int(self.limit))
+        self.__inflight = 0
+        self.__peak = 0  # 窗口内的最大同时请求数
+        self.__latencies: list[float] = []  # 窗口内的请求延迟
+        self.__overloaded = 0  # 窗口内的过载信号数
+        self.__p95 = 0.0  # 上一窗口的 p95 延迟
+        self.__baseline: float | None = None  # 基线 p95 延迟
+        self.__increases = 0
+        self.__decreases = 0
+        self.__lock = Lock()  # 请求可能来自不同线程的事件循环
+
+    @property
+    def stats(self) -> dict[str, float]:
+        """
+        控制器状态：当前并发上限、延迟及调整次数
+        """
+        return {
+            "limit": int(self.limit),
+            "min_limit": self.min_limit,
+            "max_limit": self.max_limit,
+            "p95": round(self.__p95, 4),
+            "baseline_p95": round(self.__baseline or 0, 4),
+            "increases": self.__increases,
+            "decreases": self.__decreases,
+        }
+
+    def started(self) -> None:
+        """
+        请求开始
+        """
+        with self.__lock:
+            self.__inflight += 1
+            self.__peak = max(self.__peak, self.__inflight)
+
+    def finished(self, latency: float, overloaded: bool | None) -> None:
+        """
+        请求结束，窗口请求数足够时调整并发上限
+
+        :param latency: 请求耗时（秒）
+        :param overloaded: 是否出现过载信号（429/5xx、超时、连接失败），为 None 时（请求被取消）不计入统计
+        """
+        with self.__lock:
+            self.__inflight -= 1
+            if overloaded is None:
+                return
+            self.__latencies.append(latency)
+            self.__overloaded += overloaded
+            if len(self.__latencies) < max(self.MIN_WINDOW, int(self.limit)):
+                return
+            old_limit = int(self.limit)
+            self.__adjust()
+            limit = int(self.limit)
+        if limit != old_limit:  # 在锁外调整限流器，避免与限流器的锁嵌套
+            self.limiter.set_concurrency(limit)
+
+    def __adjust(self) -> None:
+        """
+        根据窗口内的请求结果调整并发上限（需持有锁）
+        """
+        latencies = sorted(self.__latencies)
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        baseline = self.__baseline
+        latency_rising = (
+            baseline is not None
+            and p95 > baseline * self.LATENCY_TOLERANCE
+            and p95 - baseline > self.LATENCY_SLACK
+        )
+        saturated = self.__peak >= int(self.limit)
+
+        old_limit = int(self.limit)
+        if self.__overloaded or latency_rising:
+            self.limit = max(self.min_limit, self.limit * self.DECREASE_FACTOR)
+            self.__decreases += 1
+        elif saturated:
+            self.limit = min(self.max_limit, self.limit + 1)
+            self.__increases += 1
+
+        # 基线取较低的 p95，并缓慢跟随持续升高的延迟（如网络环境变化）
+        if baseline is None or p95 < baseline:
+            self.__baseline = p95
+        elif not self.__overloaded:
+            self.__baseline = baseline + (p95 - baseline) * 0.05
+
+        if int(self.limit) < old_limit:
+            logger.debug(
+                f"{self.limiter.name} 并发上限 {old_limit} -> {int(self.limit)}，"
+                f"过载信号 {self.__overloaded}，p95 延迟 {p95:.3f}s"
+            )
+
+        self.__p95 = p95
+        self.__latencies = []
+        self.__overloaded = 0
+        self.__peak = self.__inflight
+
+
+class RequestHedger:
+    """
+    对冲请求
+    只读请求的耗时超过同类请求近期的 p95 延迟时，再发送一个相同的请求，使用先返回的结果
+    每个普通请求积累 budget 个令牌，每次对冲消耗一个令牌，额外负载不超过请求数的 budget 比例
+    对冲请求与普通请求一样占用限流器的配额，不会突破并发上限及请求速率
+    """
+
+    # 每类请求保留的延迟样本数
+    SAMPLE_SIZE: int = 200
+    # 样本数不足时不对冲
+    MIN_SAMPLES: int = 20
+    # 对冲等待时间的下限（秒）
+    MIN_DELAY: float = 0.05
+    # 令牌上限，限制短时间内集中对冲
+    MAX_TOKENS: float = 10
+
+    def __init__(
+        self, limiter: RateLimiter | None = None, budget: float = 0.05
+    ) -> None:
+        """
+        :param limiter: 对冲请求需要占用配额的限流器，为 None 时不限制
+        :param budget: 对冲请求数占请求总数的最大比例
+        """
+        self.budget = budget
+        self.__limiter = limiter
+        self.__tokens = 1.0
+        self.__latencies: dict[str, deque[float]] = {}
+        self.__p95: dict[str, float] = {}
+        self.__requests = 0  # 请求数
+        self.__hedged = 0  # 发出的对冲请求数
+        self.__hedge_wins = 0  # 对冲请求先返回的次数
+        self.__lock = Lock()  # 请求可能来自不同线程的事件循环
+
+    @property
+    def stats(self) -> dict[str, Any]:
+        """
+        对冲状态：各类请求的 p95 延迟及对冲次数
+        """
+        return {
+            "budget": self.budget,
+            "requests": self.__requests,
+            "hedged": self.__hedged,
+            "hedge_wins": self.__hedge_wins,
+            "p95": {key: round(p95, 4) for key, p95 in self.__p95.items()},
+        }
+
+    def __record(self, key: str, latency: float) -> None:
+        """
+        记录请求延迟，每 10 个样本重新计算一次 p95
+
+        :param key: 请求类别
+        :param latency: 延迟（秒）
+        """
+        with self.__lock:
+            samples = self.__latencies.setdefault(
+                key, deque(maxlen=self.SAMPLE_SIZE)
+            )
+            samples.append(latency)
+            if len(samples) >= self.MIN_SAMPLES and len(samples) % 10 == 0:
+                ordered = sorted(samples)
+                self.__p95[key] = ordered[int(len(ordered) * 0.95) - 1]
+
+    def __take_token(self) -> bool:
+        """
+        尝试消耗一个对冲令牌
+        """
+        with self.__lock:
+            if self.__tokens < 1:
+                return False
+            self.__tokens -= 1
+            self.__hedged += 1
+            return True
+
+    async def __send_hedge(self, send: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        在限流器的配额内发送对冲请求，配额不足时排队等待
+
+        :param send: 发送请求的函数
+        """
+        if self.__limiter is None:
+            return await send()
+        async with self.__limiter.limit():
+            return await send()
+
+    async def request(
+        self, key: str, send: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """
+        发送请求，超过 p95 延迟仍未返回且有剩余令牌时发送对冲请求
+
+        :param key: 请求类别（如接口路径），按类别统计延迟
+        :param send: 发送请求的函数，每次调用发送一个新请求
+        :return: 先成功返回的结果
+        """
+        with self.__lock:
+            self.__requests += 1
+            self.__tokens = min(self.MAX_TOKENS, self.__tokens + self.budget)
+        started = monotonic()
+        primary = create_task(send())
+        delay = self.__p95.get(key)
+        if delay is None:
+            result = await primary
+            self.__record(key, monotonic() - started)
+            return result
+
+        tasks = {primary}
+        try:
+            done, _ = await wait(tasks, timeout=max(delay, self.MIN_DELAY))
+            if not done and self.__take_token():
+                tasks.add(create_task(self.__send_hedge(send)))
+            while True:
+                done, _ = await wait(tasks, return_when=FIRST_COMPLETED)
+                for task in done:
+                    tasks.discard(task)
+                    if task.exception() is None or not tasks:
+                        if task is not primary:
+                            with self.__lock:
+                                self.__hedge_wins += 1
+                        self.__record(key, monotonic() - started)
+                        return task.result()
+                # 先返回的请求失败时继续等待另一个请求
+        finally:
+            for task in tasks:
+                task.cancel()
+            await gather(*tasks, return_exceptions=True)
@@ -14,6 +14,22 @@ class Multiton(abc.ABCMeta, type):
             cls._instances[key] = super().__call__(*args, **kwargs)
         return cls._instances[key]
 
+    def instances(cls) -> list:
+        """
+        获取该类的所有实例
+        """
+        return [
+            instance for key, instance in cls._instances.items() if key[0] is cls
+        ]
+
+    def release(cls, instance) -> None:
+        """
+        从注册表中移除实例，之后以相同参数创建时重新实例化
+        """
+        for key, value in list(cls._instances.items()):
+            if key[0] is cls and value is instance:
+                del cls._instances[key]
+
 
 if __name__ == "__main__":
     # 示例多例类
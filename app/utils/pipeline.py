@@ -0,0 +1,134 @@
+from asyncio import Queue, TaskGroup
+from typing import Any, AsyncIterable, Awaitable, Callable
+
+from app.core import logger
+
+
+class _Stage:
+    """
+    流水线阶段
+    """
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[Any], Awaitable[Any]],
+        workers: int,
+        queue_size: int,
+    ) -> None:
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.queue: Queue = Queue(maxsize=max(1, queue_size))
+        self.processed = 0  # 已处理数量
+        self.failed = 0  # 处理失败数量
+
+
+class Pipeline:
+    """
+    有界队列异步流水线
+
+    数据源产生的对象依次流经各个阶段，每个阶段拥有独立的协程数及有界输入队列
+    下游处理不过来时上游会在队列上等待（背压），内存占用与数据总量无关
+    阶段函数返回 None 时丢弃该对象，否则将返回值传递给下一阶段
+    """
+
+    __STOP = object()  # 阶段结束标志
+
+    def __init__(self, name: str = "") -> None:
+        """
+        :param name: 流水线名称，用于日志输出
+        """
+        self.name = name
+        self.__stages: list[_Stage] = []
+        self.__source_count = 0
+
+    def add_stage(
+        self,
+        name: str,
+        func: Callable[[Any], Awaitable[Any]],
+        workers: int = 1,
+        queue_size: int = 1000,
+    ) -> "Pipeline":
+        """
+        添加流水线阶段
+
+        :param name: 阶段名称
+        :param func: 阶段处理函数
+        :param workers: 阶段并发协程数
+        :param queue_size: 阶段输入队列最大长度
+        :return: 流水线对象本身，便于链式调用
+        """
+        self.__stages.append(_Stage(name, func, workers, queue_size))
+        return self
+
+    @property
+    def stats(self) -> dict[str, dict[str, int]]:
+        """
+        各阶段队列深度及处理计数，用于调优各阶段并发数
+        """
+        stats = {"source": {"produced": self.__source_count}}
+        for stage in self.__stages:
+            stats[stage.name] = {
+                "queue": stage.queue.qsize(),
+                "queue_size": stage.queue.maxsize,
+                "workers": stage.workers,
+                "processed": stage.processed,
+                "failed": stage.failed,
+            }
+        return stats
+
+    async def run(self, source: AsyncIterable[Any]) -> None:
+        """
+        运行流水线，直至数据源耗尽且所有阶段处理完毕
+
+        :param source: 数据源（异步可迭代对象）
+        """
+        if not self.__stages:
+            async for _ in source:
+                self.__source_count += 1
+            return
+
+        async def feed() -> None:
+            first = self.__stages[0]
+            async for item in source:
+                self.__source_count += 1
+                await first.queue.put(item)
+            for _ in range(first.workers):
+                await first.queue.put(self.__STOP)
+
+        async def work(index: int) -> None:
+            stage = self.__stages[index]
+            next_stage = (
+                self.__stages[index + 1] if index + 1 < len(self.__stages) else None
+            )
+            while True:
+                item = await stage.queue.get()
+                if item is self.__STOP:
+                    return
+                try:
+                    result = await stage.func(item)
+                except Exception as e:
+                    stage.failed += 1
+                    logger.error(f"{self.name} 流水线阶段 {stage.name} 处理失败：{e}")
+                    continue
+                stage.processed += 1
+                if result is not None and next_stage is not None:
+                    await next_stage.queue.put(result)
+
+        async def run_stage(index: int) -> None:
+            stage = self.__stages[index]
+            async with TaskGroup() as tg:
+                for _ in range(stage.workers):
+                    tg.create_task(work(index))
+            if index + 1 < len(self.__stages):  # 本阶段结束后通知下一阶段
+                next_stage = self.__stages[index + 1]
+                for _ in range(next_stage.workers):
+                    await next_stage.queue.put(self.__STOP)
+
+        async with TaskGroup() as tg:
+            tg.create_task(feed())
+            for index in range(len(self.__stages)):
+                tg.create_task(run_stage(index))
+
+        logger.debug(f"{self.name} 流水线运行完毕：{self.stats}")
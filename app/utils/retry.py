@@ -1,61 +1,256 @@
 from asyncio import sleep as async_sleep
 from typing import Any, TypeVar, Callable
-from time import sleep
+from time import sleep, monotonic
+from random import uniform
+from threading import Lock
 from logging import Logger
 
+from httpx import HTTPStatusError, TimeoutException, TransportError
+
+from app.core import logger as default_logger
 from app.core.log import LoggerManager
 from app.utils.singleton import Singleton
 
 TRIES = 3
-DELAY = 3
-BACKOFF = 1
+DELAY = 1
+BACKOFF = 2
+MAX_DELAY = 30
 T = TypeVar("T")
 
+# 可以重试的 HTTP 状态码
+RETRYABLE_STATUS = frozenset({408, 429, 500, 502, 503, 504})
+
+
+class CircuitOpenError(Exception):
+    """
+    熔断器处于断开状态，请求被直接拒绝
+    """
+
+    retryable = False
+
+
+class DeadlineExceededError(TimeoutError):
+    """
+    请求（含重试）超出截止时间
+    """
+
+    retryable = False
+
+
+def is_retryable(e: BaseException) -> bool:
+    """
+    判断异常是否为可重试的临时错误
+    异常类可通过 retryable 属性声明自身是否可重试；未声明时超时、网络错误及
+    RETRYABLE_STATUS 中的状态码可重试，其他异常（如 4xx、参数错误）直接失败
+    通过 raise ... from ... 包装的异常按其原始异常判断
+
+    :param e: 异常
+    :return: 是否可重试
+    """
+    if isinstance(e, BaseExceptionGroup):
+        return all(is_retryable(inner) for inner in e.exceptions)
+
+    retryable = getattr(e, "retryable", None)
+    if retryable is not None:
+        return bool(retryable)
+    if isinstance(e, (TimeoutException, TransportError)):
+        return True
+    if isinstance(e, HTTPStatusError):
+        return e.response.status_code in RETRYABLE_STATUS
+    if e.__cause__ is not None:
+        return is_retryable(e.__cause__)
+    return False
+
+
+class CircuitBreaker:
+    """
+    熔断器
+    同一主机连续失败达到阈值后断开，断开期间的请求直接失败；
+    冷却时间过后放行一个探测请求，成功则恢复，失败则继续断开；
+    探测请求被取消或出现未分类的异常时释放探测名额，由下一个请求重新探测
+    """
+
+    __instances: dict[str, "CircuitBreaker"] = {}
+
+    # 连续失败次数阈值
+    FAILURE_THRESHOLD: int = 5
+    # 断开后的冷却时间（秒）
+    RESET_TIMEOUT: float = 30
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = FAILURE_THRESHOLD,
+        reset_timeout: float = RESET_TIMEOUT,
+    ) -> None:
+        """
+        :param name: 熔断器名称（主机）
+        :param failure_threshold: 连续失败次数阈值
+        :param reset_timeout: 断开后的冷却时间（秒）
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.__failures = 0
+        self.__opened_at: float | None = None
+        self.__probing = False  # 是否有探测请求正在进行
+        self.__lock = Lock()  # 定时任务与 API 线程的事件循环共享熔断器
+
+    @classmethod
+    def get(cls, host: str) -> "CircuitBreaker":
+        """
+        获取主机对应的熔断器，同一主机的所有客户端共享
+
+        :param host: 主机（域名:端口）
+        :return: 熔断器
+        """
+        if host not in cls.__instances:
+            cls.__instances[host] = cls(host)
+        return cls.__instances[host]
+
+    @property
+    def state(self) -> str:
+        """
+        熔断器状态：closed（正常）、open（断开）、half_open（等待探测）
+        """
+        if self.__opened_at is None:
+            return "closed"
+        if monotonic() - self.__opened_at < self.reset_timeout:
+            return "open"
+        return "half_open"
+
+    def check(self) -> bool:
+        """
+        请求前检查熔断器，断开期间抛出 CircuitOpenError
+
+        :return: 本次请求是否为探测请求，为 True 时调用方需在请求结束后调用 end_probe
+        """
+        with self.__lock:
+            state = self.state
+            if state == "closed":
+                return False
+            if state == "half_open" and not self.__probing:
+                self.__probing = True  # 放行一个探测请求
+                return True
+        raise CircuitOpenError(f"{self.name} 连续请求失败，已暂停请求")
+
+    def end_probe(self) -> None:
+        """
+        探测请求结束，释放探测名额
+        已调用 record_success/record_failure 时无影响；请求被取消或出现未分类的异常时
+        熔断器保持断开，由下一个请求重新探测
+        """
+        with self.__lock:
+            self.__probing = False
+
+    def record_success(self) -> None:
+        """
+        记录请求成功
+        """
+        with self.__lock:
+            if self.__opened_at is not None:
+                default_logger.info(f"{self.name} 已恢复，熔断器关闭")
+            self.__failures = 0
+            self.__opened_at = None
+            self.__probing = False
+
+    def record_failure(self) -> None:
+        """
+        记录请求失败，连续失败达到阈值时断开
+        """
+        with self.__lock:
+            self.__failures += 1
+            self.__probing = False
+            if (
+                self.__opened_at is not None
+                or self.__failures >= self.failure_threshold
+            ):
+                if self.__opened_at is None:
+                    default_logger.warning(
+                        f"{self.name} 连续 {self.__failures} 次请求失败，"
+                        f"{self.reset_timeout} 秒内暂停请求"
+                    )
+                self.__opened_at = monotonic()
+
 
 class Retry(metaclass=Singleton):
     """
     重试装饰器
+    仅重试 is_retryable 判断为临时错误的异常，重试间隔按指数增长并加入随机抖动
     """
 
+    @staticmethod
+    def backoff_delay(
+        attempt: int,
+        delay: float = DELAY,
+        backoff: float = BACKOFF,
+        max_delay: float = MAX_DELAY,
+        jitter: bool = True,
+    ) -> float:
+        """
+        计算第 attempt 次重试前的等待时间
+        加入随机抖动后取值范围为 [间隔/2, 间隔]，避免大量请求同时重试
+
+        :param attempt: 已失败次数（从 1 开始）
+        :param delay: 初始间隔
+        :param backoff: 间隔倍数
+        :param max_delay: 最大间隔
+        :param jitter: 是否加入随机抖动
+        :return: 等待时间（秒）
+        """
+        wait = min(max_delay, delay * backoff ** (attempt - 1))
+        if jitter:
+            wait = uniform(wait / 2, wait)
+        return wait
+
     @staticmethod
     def sync_retry(
-        ExceptionToCheck: Any,
+        ExceptionToCheck: Any = Exception,
         tries: int = TRIES,
-        delay: int = DELAY,
-        backoff: int = BACKOFF,
+        delay: float = DELAY,
+        backoff: float = BACKOFF,
+        max_delay: float = MAX_DELAY,
+        jitter: bool = True,
+        deadline: float | None = None,
+        retryable: Callable[[BaseException], bool] = is_retryable,
         logger: LoggerManager | Logger | None = None,
-        ret: T = None,
     ) -> Callable[..., T]:
         """
         同步重试装饰器
+        超出重试次数、截止时间或遇到不可重试的异常时抛出最后一次的异常
 
         :param ExceptionToCheck: 需要捕获的异常
-        :param tries: 重试次数
-        :param delay: 延迟时间
+        :param tries: 最大尝试次数
+        :param delay: 初始延迟时间
         :param backoff: 延迟倍数
+        :param max_delay: 最大延迟时间
+        :param jitter: 是否加入随机抖动
+        :param deadline: 截止时间（秒，从首次调用开始计算），为 None 时不限制
+        :param retryable: 判断异常是否可重试的函数
         :param logger: 日志对象（Logger）
-        :param ret: 默认返回
         """
 
         def deco_retry(f: Callable[..., T]) -> Callable[..., T]:
             def f_retry(*args, **kwargs) -> T:
-                mtries, mdelay = tries, delay
-                while mtries > 1:
+                started = monotonic()
+                attempt = 1
+                while True:
                     try:
                         return f(*args, **kwargs)
-                    except ExceptionToCheck as _e:
-                        msg = f"{_e}，{mdelay}秒后重试 ..."
+                    except ExceptionToCheck as e:
+                        if attempt >= tries or not retryable(e):
+                            raise
+                        wait = Retry.backoff_delay(
+                            attempt, delay, backoff, max_delay, jitter
+                        )
+                        if deadline is not None and (
+                            monotonic() - started + wait > deadline
+                        ):
+                            raise
                         if logger:
-                            logger.warning(msg)
-                        else:
-                            print(msg)
-                        sleep(mdelay)
-                        mtries -= 1
-                        mdelay *= backoff
-                        e = _e
-                if logger:
-                    logger.warning(f"{e}，超出最大重试次数！")
-                return ret
+                            logger.warning(f"{e}，{wait:.1f}秒后重试 ...")
+                        sleep(wait)
+                        attempt += 1
 
             return f_retry
 
@@ -63,43 +258,52 @@ class Retry(metaclass=Singleton):
 
     @staticmethod
     def async_retry(
-        ExceptionToCheck: Any,
+        ExceptionToCheck: Any = Exception,
         tries: int = TRIES,
-        delay: int = DELAY,
-        backoff: int = BACKOFF,
+        delay: float = DELAY,
+        backoff: float = BACKOFF,
+        max_delay: float = MAX_DELAY,
+        jitter: bool = True,
+        deadline: float | None = None,
+        retryable: Callable[[BaseException], bool] = is_retryable,
         logger: LoggerManager | Logger | None = None,
-        ret: T = None,
     ) -> Callable[..., T]:
         """
         异步重试装饰器
+        超出重试次数、截止时间或遇到不可重试的异常时抛出最后一次的异常
 
         :param ExceptionToCheck: 需要捕获的异常
-        :param tries: 重试次数
-        :param delay: 延迟时间
+        :param tries: 最大尝试次数
+        :param delay: 初始延迟时间
         :param backoff: 延迟倍数
+        :param max_delay: 最大延迟时间
+        :param jitter: 是否加入随机抖动
+        :param deadline: 截止时间（秒，从首次调用开始计算），为 None 时不限制
+        :param retryable: 判断异常是否可重试的函数
         :param logger: 日志对象（Logger）
-        :param ret: 默认返回
         """
 
         def deco_retry(f: Callable[..., T]) -> Callable[..., T]:
             async def f_retry(*args, **kwargs) -> T:
-                mtries, mdelay = tries, delay
-                while mtries > 1:
+                started = monotonic()
+                attempt = 1
+                while True:
                     try:
                         return await f(*args, **kwargs)
-                    except ExceptionToCheck as _e:
-                        msg = f"{_e}，{mdelay}秒后重试 ..."
+                    except ExceptionToCheck as e:
+                        if attempt >= tries or not retryable(e):
+                            raise
+                        wait = Retry.backoff_delay(
+                            attempt, delay, backoff, max_delay, jitter
+                        )
+                        if deadline is not None and (
+                            monotonic() - started + wait > deadline
+                        ):
+                            raise
                         if logger:
-                            logger.warning(msg)
-                        else:
-                            print(msg)
-                        await async_sleep(mdelay)
-                        mtries -= 1
-                        mdelay *= backoff
-                        e = _e
-                if logger:
-                    logger.warning(f"{e}，超出最大重试次数！")
-                return ret
+                            logger.warning(f"{e}，{wait:.1f}秒后重试 ...")
+                        await async_sleep(wait)
+                        attempt += 1
 
             return f_retry
 
@@ -0,0 +1,51 @@
+from asyncio import Task, get_running_loop, shield
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any
+
+
+class SingleFlight:
+    """
+    合并重复的异步调用
+    同一个 key 同时只执行一次，执行期间的其他调用等待并共享同一个结果（或异常）
+    等待方被取消不会取消正在执行的调用
+    """
+
+    def __init__(self) -> None:
+        self.__flights: dict[Hashable, Task] = {}
+        self.calls = 0  # 调用次数
+        self.shared = 0  # 共享结果的调用次数
+
+    def __contains__(self, key: Hashable) -> bool:
+        task = self.__flights.get(key)
+        return task is not None and not task.done()
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        执行调用，已有相同 key 的调用在执行时等待其结果
+
+        :param key: 调用标识
+        :param func: 返回可等待对象的函数，仅在需要执行时调用
+        :return: 调用结果
+        """
+        self.calls += 1
+        loop = get_running_loop()
+        task = self.__flights.get(key)
+        # 不同事件循环（如 API 线程）中的调用无法共享结果
+        if task is not None and not task.done() and task.get_loop() is loop:
+            self.shared += 1
+            return await shield(task)
+
+        async def call() -> Any:
+            return await func()
+
+        task = loop.create_task(call())
+        self.__flights[key] = task
+
+        def done(_: Task) -> None:
+            if self.__flights.get(key) is task:
+                del self.__flights[key]
+            if not task.cancelled():
+                task.exception()  # 等待方均已取消时避免“异常未被获取”警告
+
+        task.add_done_callback(done)
+        return await shield(task)
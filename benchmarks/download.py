@@ -0,0 +1,117 @@
+"""
+下载吞吐量基准测试
+
+在本地启动一个支持 Range 的 HTTP 服务器（可限制单连接速度，模拟网盘的单线程限速），
+分别以不同分片数下载同一文件，输出耗时与吞吐量
+
+用法：python -m benchmarks.download [--size 256] [--limit 20] [--chunks 1 2 4 8]
+"""
+
+from argparse import ArgumentParser
+from asyncio import run
+from hashlib import sha1
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from threading import Thread
+from time import perf_counter, sleep
+
+from app.utils.http import HTTPClient
+
+BLOCK_SIZE = 64 * 1024
+
+
+def make_handler(data: bytes, limit: int, ranges: bool):
+    """
+    :param data: 文件内容
+    :param limit: 单连接限速（字节/秒），0 表示不限速
+    :param ranges: 是否支持 Range 请求
+    """
+
+    class RangeHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args) -> None:
+            pass
+
+        def do_GET(self) -> None:
+            start, end = 0, len(data) - 1
+            range_header = self.headers.get("Range")
+            if ranges and range_header and range_header.startswith("bytes="):
+                first, _, last = range_header[6:].partition("-")
+                start = int(first)
+                end = min(int(last), end) if last else end
+                self.send_response(206)
+                self.send_header("Content-Range", f"bytes {start}-{end}/{len(data)}")
+            else:
+                self.send_response(200)
+            self.send_header("Content-Length", str(end - start + 1))
+            self.send_header("ETag", '"benchmark"')
+            if ranges:
+                self.send_header("Accept-Ranges", "bytes")
+            self.end_headers()
+
+            pos = start
+            began = perf_counter()
+            try:
+                while pos <= end:
+                    block = data[pos : min(pos + BLOCK_SIZE, end + 1)]
+                    self.wfile.write(block)
+                    pos += len(block)
+                    if limit:
+                        ahead = (pos - start) / limit - (perf_counter() - began)
+                        if ahead > 0:
+                            sleep(ahead)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+    return RangeHandler
+
+
+def start_server(data: bytes, limit: int, ranges: bool) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(data, limit, ranges))
+    server.daemon_threads = True
+    Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def bench(url: str, chunk_num: int, file_path: Path, digest: str) -> float:
+    client = HTTPClient()
+    try:
+        began = perf_counter()
+        await client.download(url, file_path, chunk_num=chunk_num)
+        elapsed = perf_counter() - began
+    finally:
+        await client.async_close()
+    if sha1(file_path.read_bytes()).hexdigest() != digest:
+        raise RuntimeError(f"分片数 {chunk_num} 下载的文件内容不一致")
+    file_path.unlink()
+    return elapsed
+
+
+def main() -> None:
+    parser = ArgumentParser(description="下载吞吐量基准测试")
+    parser.add_argument("--size", type=int, default=256, help="文件大小（MB）")
+    parser.add_argument("--limit", type=int, default=20, help="单连接限速（MB/s），0 不限速")
+    parser.add_argument("--chunks", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--no-range", action="store_true", help="服务器不支持 Range")
+    args = parser.parse_args()
+
+    data = bytes(range(256)) * (args.size * 1024 * 1024 // 256)
+    digest = sha1(data).hexdigest()
+    server = start_server(data, args.limit * 1024 * 1024, not args.no_range)
+    url = f"http://127.0.0.1:{server.server_address[1]}/file.bin"
+
+    print(f"文件大小 {args.size}MB，单连接限速 {args.limit or '不限'} MB/s")
+    with TemporaryDirectory(prefix="AutoFilm_bench_") as temp_dir:
+        for chunk_num in args.chunks:
+            elapsed = run(bench(url, chunk_num, Path(temp_dir) / "file.bin", digest))
+            print(
+                f"分片数 {chunk_num:>2}：{elapsed:6.2f}s，"
+                f"{args.size / elapsed:8.1f} MB/s"
+            )
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
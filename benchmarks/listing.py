@@ -0,0 +1,74 @@
+"""
+目录列出基准测试
+
+对同一个 Alist 目录分别使用不同的列出方式（api / webdav / search）遍历整个目录树，
+输出耗时、请求数及条目数，用于比较深层目录树下各方式的请求次数与速度
+
+用法：python -m benchmarks.listing --url http://127.0.0.1:5244 --username admin
+      --password admin --dir /media [--backends api webdav] [--workers 4] [--depth infinity]
+"""
+
+from argparse import ArgumentParser
+from asyncio import run
+from time import perf_counter
+
+from app.modules.alist import AlistClient
+from app.utils import RateLimiter
+
+
+async def bench(
+    client: AlistClient, dir_path: str, backend: str, workers: int, depth: str
+) -> tuple[float, int, int]:
+    """
+    :return: 耗时（秒）、请求数、条目数
+    """
+    limiter = RateLimiter.get(client.url)
+    granted = limiter.stats["granted"]
+    start = perf_counter()
+    count = 0
+    async for _ in client.iter_path(
+        dir_path,
+        is_detail=False,
+        max_workers=workers,
+        backend=backend,
+        index_max_age=0,
+        webdav_depth=depth,
+    ):
+        count += 1
+    return perf_counter() - start, limiter.stats["granted"] - granted, count
+
+
+async def main_async(args) -> None:
+    client = await AlistClient.connect(
+        args.url, args.username, args.password, args.token
+    )
+    print(f"目录 {args.dir}，并发数 {args.workers}，WebDAV 深度 {args.depth}")
+    # 每种方式只运行一次，避免文件列表缓存影响 api 方式的结果
+    for backend in args.backends:
+        elapsed, requests, count = await bench(
+            client, args.dir, backend, args.workers, args.depth
+        )
+        print(
+            f"{backend:>6}：{elapsed:7.2f}s，请求 {requests:>6} 次，条目 {count:>7} 个"
+        )
+
+
+def main() -> None:
+    parser = ArgumentParser(description="目录列出基准测试")
+    parser.add_argument("--url", required=True, help="Alist 服务器地址")
+    parser.add_argument("--username", default="", help="Alist 用户名")
+    parser.add_argument("--password", default="", help="Alist 密码")
+    parser.add_argument("--token", default="", help="Alist 永久令牌")
+    parser.add_argument("--dir", default="/", help="遍历的目录")
+    parser.add_argument(
+        "--backends", nargs="+", default=["api", "webdav"], help="列出方式"
+    )
+    parser.add_argument("--workers", type=int, default=4, help="同时列出目录的协程数")
+    parser.add_argument(
+        "--depth", default="infinity", choices=["infinity", "1"], help="WebDAV 深度"
+    )
+    run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+from asyncio import run, sleep
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from json import dumps, loads
+from os import environ
+from os.path import dirname
+from pathlib import Path
+from shutil import copyfile, rmtree
+from sys import path
+from tempfile import mkdtemp
+from threading import Thread
+from time import sleep as time_sleep
+from urllib.parse import quote, unquote
+
+import pytest
+
+ROOT = Path(dirname(dirname(__file__)))
+path.append(str(ROOT))
+
+
+def pytest_configure(config) -> None:
+    """
+    app.core 导入时读取配置文件并创建日志文件，测试使用临时目录中的示例配置，不写入仓库
+    （测试模块在收集阶段即导入 app，早于 fixture，因此在此处设置）
+    """
+    base_dir = Path(mkdtemp(prefix="autofilm-test-"))
+    config.autofilm_dir = base_dir
+    (base_dir / "config").mkdir()
+    copyfile(
+        ROOT / "config" / "config.yaml.example", base_dir / "config" / "config.yaml"
+    )
+    environ["AUTOFILM_CONFIG_DIR"] = str(base_dir / "config")
+    environ["AUTOFILM_LOG_DIR"] = str(base_dir / "logs")
+
+
+def pytest_unconfigure(config) -> None:
+    rmtree(config.autofilm_dir, ignore_errors=True)
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    """
+    使用临时数据库的 AlistCatalog
+    """
+    from app.modules.alist2strm.catalog import AlistCatalog
+    from app.utils import Singleton
+
+    Singleton._instances.pop(AlistCatalog, None)
+    yield AlistCatalog(tmp_path / "catalog.db")
+    Singleton._instances.pop(AlistCatalog, None)
+
+
+@pytest.fixture
+def fake_client():
+    """
+    返回创建 AlistClient 的函数，目录列表来自内存中的目录树，不发送请求
+    目录树为 目录路径 -> 条目 (名称, 修改时间) 列表，条目为 None 时列出该目录抛出异常
+    """
+    from app.modules.alist import AlistClient, AlistPath
+
+    def make(tree: dict, listed: list[str]) -> AlistClient:
+        client = AlistClient("http://alist.test", "", "", token="token")
+
+        async def iter_fs_list(dir_path: str, per_page: int = 0):
+            listed.append(dir_path)
+            await sleep(0)
+            if tree[dir_path] is None:
+                raise RuntimeError(f"列出目录 {dir_path} 失败")
+            for name, modified in tree[dir_path]:
+                path = dir_path + "/" + name
+                yield AlistPath(
+                    path=path,
+                    name=name,
+                    is_dir=path in tree,
+                    modified=modified,
+                    server_url=client.url,
+                )
+
+        client.iter_fs_list = iter_fs_list
+        return client
+
+    return make
+
+
+@pytest.fixture
+def run_alist2strm(monkeypatch):
+    """
+    返回运行 Alist2Strm 任务的函数，AlistClient.connect 返回传入的客户端
+    action 为调用的方法名（run 或 resign）
+    """
+    from app.modules import Alist2Strm
+    from app.modules.alist import AlistClient
+
+    def run_task(client, target_dir, action: str = "run", **options) -> None:
+        async def connect(*args, **kwargs):
+            return client
+
+        monkeypatch.setattr(AlistClient, "connect", connect)
+        options = {"mode": "AlistPath", "source_dir": "/media", **options}
+        alist2strm = Alist2Strm(
+            id="task", url=client.url, token="token", target_dir=target_dir, **options
+        )
+        run(getattr(alist2strm, action)())
+
+    return run_task
+
+
+class AlistHandler(BaseHTTPRequestHandler):
+    """
+    模拟 Alist 服务器，状态保存在 server 上（见 alist_server）
+    目录树与 fake_client 相同：目录路径 -> 条目 (名称, 修改时间) 列表，文件大小为名称长度
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def reply(self, body: bytes, status: int = 200, content_type: str = "") -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type or "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def reply_json(self, data, code: int = 200, message: str = "success") -> None:
+        # alist 令牌失效时返回 {"code":401,...}，客户端只比较开头，保持字段顺序及紧凑格式
+        result = {"code": code, "message": message, "data": data}
+        self.reply(dumps(result, separators=(",", ":")).encode())
+
+    def entries(self, dir_path: str) -> list[dict]:
+        tree = self.server.tree
+        return [
+            {
+                "parent": dir_path,
+                "name": name,
+                "size": 0 if f"{dir_path}/{name}" in tree else len(name),
+                "is_dir": f"{dir_path}/{name}" in tree,
+                "modified": modified,
+            }
+            for name, modified in tree[dir_path]
+        ]
+
+    def do_GET(self) -> None:
+        self.handle_api({})
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        self.handle_api(loads(self.rfile.read(length)) if length else {})
+
+    def handle_api(self, body: dict) -> None:
+        server = self.server
+        server.calls.append((self.path, body))
+        if self.path == "/api/auth/login":
+            time_sleep(server.login_delay)  # 让并发请求在登录期间到达
+            server.token = server.tokens.pop(0)
+            return self.reply_json({"token": server.token})
+        if self.headers.get("Authorization") != server.token:
+            return self.reply_json(None, code=401, message="token is invalidated")
+
+        if self.path == "/api/me":
+            data = {"base_path": "/", "id": 1}
+        elif self.path == "/api/admin/storage/list":
+            data = {"content": server.storages, "total": len(server.storages)}
+        elif self.path == "/api/admin/index/progress":
+            if server.index_progress is None:
+                return self.reply_json(None, code=500, message="search not available")
+            data = server.index_progress
+        elif self.path == "/api/fs/list":
+            content = self.entries(body["path"])
+            data = {"total": len(content), "provider": "Local"}
+            data["content"] = self.page(content, body["page"], body["per_page"])
+        elif self.path == "/api/fs/search":
+            parent = body["parent"].rstrip("/")
+            content = [
+                entry
+                for dir_path in server.tree
+                if dir_path == parent or dir_path.startswith(parent + "/")
+                for entry in self.entries(dir_path)
+            ]
+            data = {"total": len(content)}
+            data["content"] = self.page(content, body["page"], body["per_page"])
+        else:
+            return self.reply_json(None, code=404, message="not found")
+        self.reply_json(data)
+
+    @staticmethod
+    def page(content: list, page: int, per_page: int) -> list:
+        if per_page <= 0:
+            return content
+        return content[(page - 1) * per_page : page * per_page]
+
+    def do_PROPFIND(self) -> None:
+        server = self.server
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        dir_path = unquote(self.path).removeprefix("/dav").rstrip("/") or "/"
+        depth = self.headers.get("Depth")
+        server.calls.append((self.path, {"depth": depth}))
+        if depth == "infinity" and not server.dav_infinity:
+            return self.reply(b"", status=403)
+
+        def response(path: str, modified: str = "", size: int = 0) -> str:
+            is_dir = path in server.tree
+            props = "<D:resourcetype><D:collection/></D:resourcetype>"
+            if not is_dir:
+                props = "<D:resourcetype/>"
+                props += f"<D:getcontentlength>{size}</D:getcontentlength>"
+            if modified:
+                date = datetime.fromisoformat(modified).astimezone(timezone.utc)
+                date = format_datetime(date, usegmt=True)
+                props += f"<D:getlastmodified>{date}</D:getlastmodified>"
+            href = quote("/dav" + path + ("/" if is_dir else ""))
+            return (
+                f"<D:response><D:href>{href}</D:href><D:propstat><D:prop>{props}"
+                "</D:prop><D:status>HTTP/1.1 200 OK</D:status></D:propstat>"
+                "</D:response>"
+            )
+
+        parts = [response(dir_path)]
+        for current in server.tree:
+            if current == dir_path or (
+                depth == "infinity" and current.startswith(dir_path.rstrip("/") + "/")
+            ):
+                for entry in self.entries(current):
+                    path = f"{current}/{entry['name']}"
+                    parts.append(response(path, entry["modified"], entry["size"]))
+        body = (
+            '<?xml version="1.0" encoding="utf-8"?><D:multistatus xmlns:D="DAV:">'
+            + "".join(parts)
+            + "</D:multistatus>"
+        )
+        self.reply(body.encode(), status=207, content_type="application/xml")
+
+
+@pytest.fixture
+def alist_server():
+    """
+    本地模拟 Alist 服务器，可修改的状态：
+    tree 目录树、tokens 依次登录返回的令牌、token 当前有效的令牌、login_delay 登录耗时、
+    storages 存储列表、index_progress 搜索索引进度（None 时返回错误）、dav_infinity 是否支持 Depth: infinity，
+    calls 记录每个请求的 (路径, 请求体)
+    """
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), AlistHandler)
+    httpd.url = f"http://127.0.0.1:{httpd.server_port}"
+    httpd.tree = {}
+    httpd.tokens = []
+    httpd.token = "token"
+    httpd.login_delay = 0
+    httpd.storages = []
+    httpd.index_progress = {
+        "obj_count": 1,
+        "is_done": True,
+        "last_done_time": datetime.now(timezone.utc).isoformat(),
+        "error": "",
+    }
+    httpd.dav_infinity = True
+    httpd.calls = []
+    Thread(target=httpd.serve_forever, daemon=True).start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
@@ -0,0 +1,30 @@
+from base64 import urlsafe_b64encode
+from hashlib import sha256
+from hmac import new as hmac_new
+
+from app.utils import AlistSigner
+from app.utils.alist_sign import sign
+
+
+def reference_sign(secret_key: str, data: str, expire: int = 0) -> str:
+    h = hmac_new(secret_key.encode(), digestmod=sha256)
+    h.update(f"{data}:{expire}".encode())
+    return f"{urlsafe_b64encode(h.digest()).decode()}:{expire}"
+
+
+def test_signer_matches_alist_signature():
+    assert sign("k", "/x") == "?sign=RjNFb6M447I1x9HdSpRrzpw0Zh-NzEKpKN76mZxtxOY=:0"
+    signer = AlistSigner("secret")
+    for path in ("/media/电影/a.mkv", "/media/b c.mp4", "/media/a.mkv"):
+        assert signer.sign(path) == reference_sign("secret", path)
+
+
+def test_signer_with_expire():
+    assert AlistSigner("secret", 1700000000).sign("/a") == reference_sign(
+        "secret", "/a", 1700000000
+    )
+
+
+def test_empty_secret_key_returns_no_signature():
+    assert sign("", "/x") == ""
+    assert sign(None, "/x") == ""
@@ -0,0 +1,89 @@
+from asyncio import TimeoutError, run, wait_for
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Event, Thread
+from time import sleep
+
+import pytest
+
+from app.utils import HTTPClient
+from app.utils.retry import CircuitBreaker, CircuitOpenError
+
+
+def open_breaker(name: str) -> CircuitBreaker:
+    breaker = CircuitBreaker(name, failure_threshold=2, reset_timeout=0.05)
+    breaker.record_failure()
+    breaker.record_failure()
+    return breaker
+
+
+def test_half_open_allows_one_probe_and_recovers():
+    breaker = open_breaker("recover")
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+    sleep(0.06)
+    assert breaker.state == "half_open"
+    assert breaker.check() is True
+    with pytest.raises(CircuitOpenError):  # 同一时间只放行一个探测请求
+        breaker.check()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.check() is False
+
+
+def test_failed_probe_reopens():
+    breaker = open_breaker("reopen")
+    sleep(0.06)
+    assert breaker.check() is True
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+
+def test_unfinished_probe_releases_slot():
+    breaker = open_breaker("abandon")
+    sleep(0.06)
+    assert breaker.check() is True
+    breaker.end_probe()  # 探测请求被取消，没有记录结果
+    assert breaker.state == "half_open"
+    assert breaker.check() is True
+
+
+class SlowHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        self.server.release.wait(2)
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+def test_cancelled_probe_request_releases_slot():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), SlowHandler)
+    httpd.release = Event()
+    Thread(target=httpd.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{httpd.server_port}/slow"
+
+    async def main() -> None:
+        client = HTTPClient()
+        try:
+            with pytest.raises(TimeoutError):
+                await wait_for(client.request("get", url), 0.2)
+        finally:
+            httpd.release.set()
+            await client.async_close()
+
+    breaker = CircuitBreaker.get(f"127.0.0.1:{httpd.server_port}")
+    breaker.reset_timeout = 0
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    try:
+        run(main())
+        assert breaker.check() is True  # 被取消的探测请求没有一直占用探测名额
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
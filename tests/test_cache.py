@@ -0,0 +1,62 @@
+from asyncio import Event, create_task, gather, run, sleep
+from time import sleep as time_sleep
+
+from app.utils import TTLCache
+
+
+def test_entries_expire_after_ttl():
+    cache = TTLCache("test-expire", ttl=0.05)
+    cache.set("user", 1)
+    assert cache.get("user") == 1
+    time_sleep(0.06)
+    assert cache.get("user") is None
+
+
+def test_concurrent_loads_are_coalesced():
+    cache = TTLCache("test-coalesce", ttl=60)
+    calls = []
+
+    async def loader() -> str:
+        calls.append(1)
+        await sleep(0.01)
+        return "storages"
+
+    async def main() -> list[str]:
+        return await gather(*(cache.get_or_load("list", loader) for _ in range(3)))
+
+    assert run(main()) == ["storages"] * 3
+    assert len(calls) == 1
+    assert cache.get("list") == "storages"
+
+
+def test_invalidate_during_load_discards_stale_result():
+    cache = TTLCache("test-invalidate", ttl=60)
+    started, release = Event(), Event()
+
+    async def loader() -> str:
+        started.set()
+        await release.wait()
+        return "stale"
+
+    async def main() -> str:
+        load = create_task(cache.get_or_load("list", loader))
+        await started.wait()
+        cache.invalidate()  # 加载期间存储被修改
+        release.set()
+        return await load
+
+    assert run(main()) == "stale"  # 调用方仍拿到结果
+    assert cache.get("list") is None  # 但不写回缓存
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache("test-lru", ttl=60, max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # a 变为最近使用
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats["evictions"] == 1
+    assert "a" in cache and "b" not in cache
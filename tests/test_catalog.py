@@ -0,0 +1,62 @@
+from app.modules.alist import AlistPath
+from app.modules.alist2strm.catalog import AlistCatalog
+
+
+def make_path(path: str, is_dir: bool = False, modified: str = "m1") -> AlistPath:
+    return AlistPath(
+        path=path, name=path.rsplit("/", 1)[-1], is_dir=is_dir, modified=modified
+    )
+
+
+def record_run(catalog: AlistCatalog, paths: list[AlistPath]) -> dict[str, int]:
+    run_id = catalog.begin_run("task", "/media")
+    catalog.record("task", run_id, paths)
+    return catalog.finish_run("task", run_id, "/media")
+
+
+def test_counts_are_not_limited_by_page(catalog):
+    record_run(
+        catalog,
+        [make_path("/media/show", True)]
+        + [make_path(f"/media/show/ep{i}.mkv") for i in range(5)],
+    )
+    assert len(catalog.list_prefix("task", "/media/show/", limit=2)) == 2
+    assert catalog.count_prefix("task", "/media/show/") == 5
+    assert len(catalog.search("task", "ep", limit=2, offset=4)) == 1
+    assert catalog.count_search("task", "ep") == 5
+    assert catalog.count_search("task", "%") == 0
+
+
+def test_replay_returns_whole_subtree(catalog):
+    record_run(
+        catalog,
+        [
+            make_path("/media/show", True),
+            make_path("/media/show/s1", True),
+            make_path("/media/show/s1/ep1.mkv"),
+            make_path("/media/show/poster.jpg"),
+            make_path("/media/show2", True),
+        ],
+    )
+    rows = [row for batch in catalog.replay("task", "/media/show", 1) for row in batch]
+    assert [row["path"] for row in rows] == [
+        "/media/show/poster.jpg",
+        "/media/show/s1",
+        "/media/show/s1/ep1.mkv",
+    ]
+
+
+def test_fingerprints_include_child_count(catalog):
+    record_run(
+        catalog,
+        [
+            make_path("/media/show", True, "m1"),
+            make_path("/media/show/s1", True, "m2"),
+            make_path("/media/show/s1/ep1.mkv"),
+            make_path("/media/show/s1/ep2.mkv"),
+        ],
+    )
+    assert catalog.dir_fingerprints("task", "/media") == {
+        "/media/show": ("m1", 1),
+        "/media/show/s1": ("m2", 2),
+    }
@@ -0,0 +1,59 @@
+from app.modules.alist import AlistPath
+from app.modules.alist2strm import catalog as catalog_module
+
+
+def test_removed_remote_file_is_deleted(
+    tmp_path, catalog, fake_client, run_alist2strm
+):
+    tree = {"/media": [("e1.mkv", "m1"), ("e2.mkv", "m1")]}
+    run_alist2strm(fake_client(tree, []), tmp_path, sync_server=True)
+    own = tmp_path / "notes.txt"  # 不是 AutoFilm 生成的文件
+    own.write_text("keep")
+
+    tree["/media"] = [("e1.mkv", "m1")]
+    run_alist2strm(fake_client(tree, []), tmp_path, sync_server=True)
+
+    assert (tmp_path / "e1.strm").exists()
+    assert not (tmp_path / "e2.strm").exists()
+    assert own.exists()
+    assert catalog.get_local_file("task", str(tmp_path / "e2.strm")) is None
+
+
+def test_manifest_is_seeded_when_sync_server_is_enabled(
+    tmp_path, catalog, fake_client, run_alist2strm
+):
+    old = tmp_path / "old.strm"  # 之前生成、Alist 中已删除的文件
+    old.write_text("/media/old.mkv")
+    tree = {"/media": [("e1.mkv", "m1"), ("e2.mkv", "m1")]}
+    run_alist2strm(fake_client(tree, []), tmp_path)  # 未同步服务器时也会记录清单
+    assert old.exists()
+    assert not catalog.has_manifest("task", str(tmp_path))
+
+    # 首次同步服务器时遍历本地目录清理，并将现有文件纳入清单
+    run_alist2strm(fake_client(tree, []), tmp_path, sync_server=True)
+    assert not old.exists()
+    assert catalog.has_manifest("task", str(tmp_path))
+
+    tree["/media"] = [("e1.mkv", "m1")]
+    run_alist2strm(fake_client(tree, []), tmp_path, sync_server=True)
+    assert (tmp_path / "e1.strm").exists()
+    assert not (tmp_path / "e2.strm").exists()
+
+
+def test_windows_local_paths_are_scoped(monkeypatch, catalog):
+    monkeypatch.setattr(catalog_module, "sep", "\\")
+    run_id = catalog.begin_run("task", "/media")
+    catalog.record("task", run_id, [AlistPath(path="/media/e1.mkv", name="e1.mkv")])
+    catalog.finish_run("task", run_id, "/media")
+    catalog.record_local_files(
+        "task", [("D:\\media\\e1.strm", "/media/e1.mkv", None, None, None)]
+    )
+
+    catalog.mark_manifest_complete("task", "D:\\media\\")
+    assert catalog.has_manifest("task", "D:\\media")
+    assert catalog.has_manifest("task", "D:\\media\\show")
+    assert not catalog.has_manifest("task", "D:\\med")
+    run_id = catalog.begin_run("task", "/media")
+    assert catalog.stale_local_files("task", run_id, "/media", "D:\\media") == [
+        "D:\\media\\e1.strm"
+    ]
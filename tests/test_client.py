@@ -0,0 +1,112 @@
+from asyncio import gather, run, sleep
+from base64 import urlsafe_b64encode
+from json import dumps
+from time import monotonic, time
+
+from app.core import settings
+from app.modules.alist import AlistClient
+from app.modules.alist.v3 import client as client_module
+
+TREE = {f"/media/{i}": [("a.mkv", "m1")] for i in range(5)}
+
+
+def jwt(exp: float) -> str:
+    payload = urlsafe_b64encode(dumps({"exp": int(exp)}).encode()).rstrip(b"=")
+    return f"header.{payload.decode()}.signature"
+
+
+def logins(server) -> int:
+    return sum(path == "/api/auth/login" for path, _ in server.calls)
+
+
+def test_unauthorized_requests_share_one_login(alist_server):
+    alist_server.tree = TREE
+    alist_server.tokens = ["t1", "t2"]
+    alist_server.login_delay = 0.2
+
+    async def main() -> list:
+        client = AlistClient(alist_server.url, "admin", "password")
+        await client.async_api_me(refresh=True)
+        alist_server.token = "revoked"  # 令牌在服务器上失效
+        return await gather(*(client.async_api_fs_list(d) for d in TREE))
+
+    results = run(main())
+    assert [[path.name for path in paths] for paths in results] == [["a.mkv"]] * 5
+    assert logins(alist_server) == 2  # 首次登录及失效后的一次重新登录
+    assert alist_server.token == "t2"
+
+
+def test_token_is_refreshed_before_exp(alist_server):
+    alist_server.tree = TREE
+    alist_server.tokens = [jwt(time() + 60), jwt(time() + 3600)]
+
+    async def main() -> None:
+        client = AlistClient(alist_server.url, "admin", "password")
+        await client.async_api_me(refresh=True)
+        assert logins(alist_server) == 1
+
+        # 剩余有效期小于 TOKEN_REFRESH_AHEAD，请求继续使用旧令牌，后台刷新
+        await client.async_api_fs_list("/media/0")
+        await sleep(0.1)
+        assert logins(alist_server) == 2
+
+        await client.async_api_fs_list("/media/1")
+        await sleep(0.1)
+        assert logins(alist_server) == 2
+
+    run(main())
+
+
+def configure(monkeypatch, *servers: dict) -> None:
+    """
+    替换配置文件中的 Alist 服务器列表
+    """
+    monkeypatch.setattr(
+        type(settings), "AlistServerList", property(lambda self: list(servers))
+    )
+
+
+def test_connect_reuses_client(alist_server, monkeypatch):
+    configure(monkeypatch, {"url": alist_server.url, "token": "token"})
+
+    async def connect(token: str) -> AlistClient:
+        return await AlistClient.connect(alist_server.url, "", "", token)
+
+    first, again = run(connect("token")), run(connect("token"))
+    assert first is again
+    assert first.base_path == "/"
+    assert [path for path, _ in alist_server.calls] == ["/api/me"]  # 用户信息已缓存
+
+    # 配置变化后旧客户端被释放
+    alist_server.token = "new"
+    configure(monkeypatch, {"url": alist_server.url, "token": "new"})
+    new = run(connect("new"))
+    assert new is not first
+    assert first not in AlistClient.instances()
+
+
+def test_release_stale_closes_idle_clients(alist_server, monkeypatch):
+    configure(monkeypatch, {"url": alist_server.url, "token": "token"})
+    closed = []
+    close = AlistClient.close
+
+    async def record_close(self) -> None:
+        closed.append(self)
+        await close(self)
+
+    monkeypatch.setattr(AlistClient, "close", record_close)
+    # 客户端已空闲超过等待时间
+    monkeypatch.setattr(client_module, "monotonic", lambda: monotonic() + 120)
+
+    async def main() -> tuple:
+        configured = AlistClient(alist_server.url, "", "", "token")
+        stale = AlistClient(alist_server.url, "", "", "old-token")
+        await AlistClient.release_stale()
+        for _ in range(5):
+            await sleep(0)
+        return configured, stale
+
+    configured, stale = run(main())
+    assert configured in AlistClient.instances()
+    assert stale not in AlistClient.instances()
+    assert stale in closed and configured not in closed
@@ -0,0 +1,93 @@
+from asyncio import run
+
+from app.modules.alist import AlistClient
+from app.utils import TTLCache
+
+
+def requests(server, path: str) -> int:
+    return sum(call == path for call, _ in server.calls)
+
+
+def test_storage_miss_refreshes_cached_list(alist_server):
+    alist_server.storages = [{"id": 1, "mount_path": "/a"}]
+
+    async def main() -> None:
+        client = AlistClient(alist_server.url, "", "", token="token")
+        assert (await client.get_storage_by_mount_path("/a")).id == 1
+        assert (await client.get_storage_by_mount_path("/a")).id == 1
+        assert requests(alist_server, "/api/admin/storage/list") == 1  # 命中缓存
+
+        # 存储在缓存后由其他途径创建，缓存中未找到时重新获取一次
+        alist_server.storages.append({"id": 2, "mount_path": "/b"})
+        assert (await client.get_storage_by_mount_path("/b")).id == 2
+        assert requests(alist_server, "/api/admin/storage/list") == 2
+
+        assert await client.get_storage_by_mount_path("/c") is None
+        assert requests(alist_server, "/api/admin/storage/list") == 3
+        assert (await client.get_storage_by_mount_path("/b")).id == 2
+        assert requests(alist_server, "/api/admin/storage/list") == 3
+
+    run(main())
+
+
+def list_pages(server) -> list[tuple]:
+    return [
+        (body["path"], body["page"], body["refresh"])
+        for path, body in server.calls
+        if path == "/api/fs/list"
+    ]
+
+
+def names(paths) -> list[str]:
+    return sorted(path.name for path in paths)
+
+
+def test_refresh_bypasses_and_repopulates_page_cache(alist_server):
+    alist_server.tree = {"/media": [(f"{i}.mkv", "m1") for i in range(5)]}
+
+    async def main() -> None:
+        client = AlistClient(alist_server.url, "", "", token="token")
+        await client.async_api_fs_list("/media", per_page=2)
+        await client.async_api_fs_list("/media", per_page=2)
+        assert len(list_pages(alist_server)) == 3  # 第二次全部命中缓存
+
+        alist_server.tree["/media"] = [(f"{i}.mp4", "m2") for i in range(5)]
+        alist_server.calls.clear()
+        paths = await client.async_api_fs_list("/media", refresh=True, per_page=2)
+        assert names(paths) == [f"{i}.mp4" for i in range(5)]
+        # 只有第一页刷新 Alist 服务器缓存，其余页跳过本地缓存
+        assert sorted(list_pages(alist_server)) == [
+            ("/media", 1, True),
+            ("/media", 2, False),
+            ("/media", 3, False),
+        ]
+
+        # 刷新结果写回缓存
+        alist_server.calls.clear()
+        paths = await client.async_api_fs_list("/media", per_page=2)
+        assert names(paths) == [f"{i}.mp4" for i in range(5)]
+        assert list_pages(alist_server) == []
+
+    run(main())
+
+
+def test_pages_of_one_listing_are_never_mixed(alist_server, monkeypatch):
+    # 缓存只能容纳 3 页，列出其他目录后第一页被淘汰，其余两页仍在缓存中
+    monkeypatch.setattr(
+        AlistClient, "_AlistClient__fs_list_cache", TTLCache("test-fs-list", 60, 3)
+    )
+    alist_server.tree = {
+        "/media": [(f"{i}.mkv", "m1") for i in range(5)],
+        "/other": [("a.mkv", "m1")],
+    }
+
+    async def main() -> None:
+        client = AlistClient(alist_server.url, "", "", token="token")
+        await client.async_api_fs_list("/media", per_page=2)
+        await client.async_api_fs_list("/other", per_page=2)
+
+        alist_server.tree["/media"] = [(f"{i}.mp4", "m2") for i in range(5)]
+        paths = await client.async_api_fs_list("/media", per_page=2)
+        assert names(paths) == [f"{i}.mp4" for i in range(5)]
+
+    run(main())
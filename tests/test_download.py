@@ -0,0 +1,142 @@
+from asyncio import run
+from hashlib import sha1
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+
+import pytest
+
+from app.utils import HTTPClient
+from app.utils.http import HashMismatchError
+
+DATA = bytes(range(256)) * 64
+FILES = {"/empty.nfo": b"", "/video.srt": DATA, "/other.srt": DATA}
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        server = self.server
+        data = FILES[self.path]
+        header = self.headers.get("Range", "")
+        server.ranges.append(header)
+        if not header:
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+            return
+
+        start, _, end = header.removeprefix("bytes=").partition("-")
+        start, end = int(start), min(int(end), len(data) - 1)
+        if start >= len(data):
+            self.send_response(416)
+            self.send_header("Content-Range", f"bytes */{len(data)}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        body = data[start : end + 1]
+        if server.corrupt and header != "bytes=0-0":  # 模拟传输过程中数据损坏
+            server.corrupt -= 1
+            body = bytes([body[0] ^ 0xFF]) + body[1:]
+        self.send_response(206)
+        total = "*" if server.unknown_size else len(data)
+        self.send_header("Content-Range", f"bytes {start}-{end}/{total}")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if server.truncate and len(body) > 1:  # 只发送一半数据后断开连接
+            self.wfile.write(body[: len(body) // 2])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), RangeHandler)
+    httpd.ranges = []
+    httpd.truncate = False
+    httpd.corrupt = 0
+    httpd.unknown_size = False
+    Thread(target=httpd.serve_forever, daemon=True).start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def download(server, tmp_path, name: str, **kwargs):
+    async def main():
+        client = HTTPClient()
+        try:
+            return await client.download(
+                f"http://127.0.0.1:{server.server_port}/{name}",
+                tmp_path / name,
+                **kwargs,
+            )
+        finally:
+            await client.async_close()
+
+    return run(main())
+
+
+def test_empty_file_is_downloaded(server, tmp_path):
+    digest = sha1(b"").hexdigest()
+    assert download(server, tmp_path, "empty.nfo", hashes={"sha1": digest}) == (
+        "sha1",
+        digest,
+    )
+    assert (tmp_path / "empty.nfo").read_bytes() == b""
+
+
+def test_unknown_size_downloads_whole_file(server, tmp_path):
+    server.unknown_size = True
+    data = FILES["/video.srt"]
+    download(server, tmp_path, "video.srt", hashes={"sha1": sha1(data).hexdigest()})
+    assert (tmp_path / "video.srt").read_bytes() == data
+    assert server.ranges == ["bytes=0-0", ""]  # 探测后不带 Range 重新请求
+
+
+def test_interrupted_download_resumes(server, tmp_path, monkeypatch):
+    monkeypatch.setattr(HTTPClient, "SEGMENT_SIZE", 4096)
+    monkeypatch.setattr(HTTPClient, "SEGMENT_RETRIES", 1)
+    monkeypatch.setattr(HTTPClient, "ITER_CHUNK_SIZE", 512)
+    data = FILES["/video.srt"]
+    hashes = {"sha1": sha1(data).hexdigest()}
+
+    server.truncate = True
+    with pytest.raises(Exception):
+        download(server, tmp_path, "video.srt", chunk_num=4, hashes=hashes)
+    assert not (tmp_path / "video.srt").exists()
+    assert (tmp_path / ".video.srt.part.json").exists()
+
+    server.truncate = False
+    server.ranges.clear()
+    download(server, tmp_path, "video.srt", chunk_num=4, hashes=hashes)
+    assert (tmp_path / "video.srt").read_bytes() == data
+    assert not (tmp_path / ".video.srt.part.json").exists()
+    # 继续下载时每个分片从中断的位置开始请求，已下载的部分不再重复请求
+    # （某个分片失败时其他分片会被取消，可能还没有收到数据，只能从头请求）
+    ranges = [r[6:].split("-") for r in server.ranges if r != "bytes=0-0"]
+    assert len(ranges) == 4
+    assert any(int(start) % 4096 for start, _ in ranges)
+    assert sum(int(end) - int(start) + 1 for start, end in ranges) < len(data)
+
+
+def test_hash_mismatch_downloads_again(server, tmp_path):
+    data = FILES["/video.srt"]
+    hashes = {"sha1": sha1(data).hexdigest()}
+
+    server.corrupt = 1
+    download(server, tmp_path, "video.srt", chunk_num=1, hashes=hashes)
+    assert (tmp_path / "video.srt").read_bytes() == data
+
+    server.corrupt = 2
+    with pytest.raises(HashMismatchError):
+        download(server, tmp_path, "other.srt", chunk_num=1, hashes=hashes)
+    assert not (tmp_path / "other.srt").exists()
+    assert not (tmp_path / ".other.srt.part").exists()
@@ -0,0 +1,64 @@
+OPTIONS = {"incremental": True, "full_scan_interval": 0}
+
+TREE = {
+    "/media": [("show", "m1"), ("movie", "m1")],
+    "/media/show": [("s1", "m1"), ("s2", "m1")],
+    "/media/show/s1": [("e1.mkv", "m1")],
+    "/media/show/s2": [("e1.mkv", "m1")],
+    "/media/movie": [("movie.mkv", "m1")],
+}
+
+
+def copy_tree() -> dict:
+    return {path: list(entries) for path, entries in TREE.items()}
+
+
+def test_unchanged_subtree_is_not_listed(
+    tmp_path, catalog, fake_client, run_alist2strm
+):
+    run_alist2strm(fake_client(copy_tree(), []), tmp_path, **OPTIONS)
+
+    listed = []
+    run_alist2strm(fake_client(copy_tree(), listed), tmp_path, **OPTIONS)
+
+    # 第一层目录列出后指纹未变化，其下的子目录从本地目录还原
+    assert sorted(listed) == ["/media", "/media/movie", "/media/show"]
+    assert catalog.count_prefix("task", "/media/") == 7
+    assert (tmp_path / "show" / "s2" / "e1.strm").exists()
+
+
+def test_child_count_change_lists_subdirectories(
+    tmp_path, catalog, fake_client, run_alist2strm
+):
+    tree = copy_tree()
+    run_alist2strm(fake_client(tree, []), tmp_path, **OPTIONS)
+
+    # 新增一季，修改时间未更新但直接条目数变化
+    tree["/media/show"].append(("s3", "m1"))
+    tree["/media/show/s3"] = [("e1.mkv", "m1")]
+    listed = []
+    run_alist2strm(fake_client(tree, listed), tmp_path, **OPTIONS)
+
+    assert "/media/show/s1" in listed
+    assert (tmp_path / "show" / "s3" / "e1.strm").exists()
+
+
+def test_grandchild_change_is_found_by_full_scan(
+    tmp_path, catalog, fake_client, run_alist2strm
+):
+    tree = copy_tree()
+    run_alist2strm(fake_client(tree, []), tmp_path, **OPTIONS)
+
+    # 新剧集只更新所在目录的修改时间，上级目录 show 不变
+    tree["/media/show/s2"] = [("e1.mkv", "m1"), ("e2.mkv", "m2")]
+    listed = []
+    run_alist2strm(fake_client(tree, listed), tmp_path, **OPTIONS)
+    assert "/media/show/s2" not in listed
+    assert not (tmp_path / "show" / "s2" / "e2.strm").exists()
+
+    # 超过全量扫描间隔后重新列出整个目录树
+    options = {**OPTIONS, "full_scan_interval": 1e-9}
+    run_alist2strm(fake_client(tree, listed), tmp_path, **options)
+    assert "/media/show/s2" in listed
+    assert (tmp_path / "show" / "s2" / "e2.strm").read_text() == "/media/show/s2/e2.mkv"
+    assert catalog.count_prefix("task", "/media/") == 8
@@ -0,0 +1,135 @@
+from asyncio import gather, run, sleep, wait_for
+from threading import Thread
+from time import monotonic
+
+from app.utils import RateLimiter
+from app.utils.limiter import AIMDController, RequestHedger
+
+
+def test_waiting_tasks_are_served_in_turn():
+    limiter = RateLimiter("fairness", concurrency=1)
+    order = []
+
+    async def request(task_id: str) -> None:
+        async with limiter.limit(task_id):
+            order.append(task_id)
+            await sleep(0)
+
+    async def main() -> None:
+        await limiter.acquire("busy")
+        # 任务 a 先排队 3 个请求，任务 b 后排队 3 个请求
+        tasks = gather(*(request(t) for t in "aaabbb"))
+        await sleep(0)
+        limiter.release()
+        await tasks
+
+    run(main())
+    assert order == list("ababab")
+    assert limiter.stats["active"] == 0
+
+
+def test_cancelled_waiter_returns_its_slot():
+    limiter = RateLimiter("cancel", concurrency=1)
+
+    async def main() -> None:
+        await limiter.acquire()
+        waiter = gather(limiter.acquire())
+        await sleep(0)
+        waiter.cancel()
+        limiter.release()
+        await sleep(0.01)
+        await wait_for(limiter.acquire(), 1)
+        limiter.release()
+
+    run(main())
+    assert limiter.stats["active"] == 0
+
+
+def test_release_from_another_event_loop_wakes_waiter():
+    limiter = RateLimiter("threads", concurrency=1)
+    acquired = []
+
+    async def hold() -> None:
+        await limiter.acquire("cron")
+        thread.start()
+        while limiter.stats["waiting"] == 0:  # 等待 API 线程中的请求排队
+            await sleep(0.01)
+        acquired.append(monotonic())
+        limiter.release()
+
+    async def wait_in_thread() -> None:
+        await wait_for(limiter.acquire("api"), 5)
+        acquired.append(monotonic())
+        limiter.release()
+
+    thread = Thread(target=lambda: run(wait_in_thread()))
+    run(hold())
+    thread.join(6)
+    assert len(acquired) == 2
+    assert acquired[1] - acquired[0] < 1  # 立即唤醒，而不是等到超时
+    assert limiter.stats["active"] == 0
+
+
+def test_rate_limit_timer_wakes_waiter_in_its_own_loop():
+    limiter = RateLimiter("rate", rate=50, burst=1)
+    acquired = []
+
+    async def main() -> None:
+        await limiter.acquire()
+        limiter.release()
+        await wait_for(limiter.acquire(), 1)  # 令牌耗尽，由定时器放行
+        acquired.append(True)
+        limiter.release()
+
+    thread = Thread(target=lambda: run(main()))
+    thread.start()
+    thread.join(3)
+    assert acquired == [True]
+
+
+def test_aimd_decreases_on_overload():
+    limiter = RateLimiter("aimd", concurrency=16)
+    controller = AIMDController(limiter, min_limit=2, max_limit=16, initial=10)
+    for _ in range(10):
+        controller.started()
+    for _ in range(10):
+        controller.finished(0.01, True)
+    assert controller.stats["limit"] == 7
+    assert limiter.concurrency == 7
+
+
+def test_aimd_starts_at_configured_concurrency():
+    limiter = RateLimiter("aimd-start", concurrency=32)
+    controller = AIMDController(limiter, min_limit=2, max_limit=32)
+    assert controller.stats["limit"] == 32
+    assert limiter.concurrency == 32
+    for _ in range(32):
+        controller.started()
+    for _ in range(32):
+        controller.finished(0.01, False)  # 没有过载信号时保持配置的并发上限
+    assert limiter.concurrency == 32
+
+
+def test_hedged_request_waits_for_a_limiter_slot():
+    limiter = RateLimiter("hedge", concurrency=1)
+    hedger = RequestHedger(limiter, budget=1)
+    sent = []
+
+    async def send(delay: float) -> int:
+        sent.append(delay)
+        await sleep(delay)
+        return len(sent)
+
+    async def main() -> None:
+        for _ in range(RequestHedger.MIN_SAMPLES):
+            async with limiter.limit():
+                await hedger.request("/api/fs/list", lambda: send(0))
+        sent.clear()
+        # 主请求占用唯一的配额，对冲请求只能排队，不会额外发出
+        async with limiter.limit():
+            await hedger.request("/api/fs/list", lambda: send(0.2))
+
+    run(main())
+    assert sent == [0.2]
+    assert hedger.stats["hedged"] == 1
+    assert limiter.stats["active"] == 0
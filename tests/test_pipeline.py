@@ -0,0 +1,111 @@
+from asyncio import (
+    CancelledError,
+    Event,
+    all_tasks,
+    create_task,
+    current_task,
+    run,
+    sleep,
+    wait_for,
+)
+
+import pytest
+
+from app.utils import Pipeline
+
+
+async def numbers(count: int, produced: list | None = None):
+    for i in range(count):
+        if produced is not None:
+            produced.append(i)
+        yield i
+
+
+def test_slow_stage_bounds_the_source():
+    release = Event()
+    produced, results = [], []
+
+    async def slow(item: int) -> int:
+        await release.wait()
+        return item
+
+    async def collect(item: int) -> None:
+        results.append(item)
+
+    async def main() -> None:
+        pipeline = Pipeline("test").add_stage("slow", slow, queue_size=2)
+        pipeline.add_stage("collect", collect)
+        task = create_task(pipeline.run(numbers(100, produced)))
+        await sleep(0.05)
+        # 队列中 2 个、处理中 1 个、等待放入队列 1 个
+        assert len(produced) <= 4
+        assert pipeline.stats["slow"]["queue"] == 2
+        release.set()
+        await wait_for(task, 5)
+        assert pipeline.stats["slow"]["processed"] == 100
+
+    run(main())
+    assert sorted(results) == list(range(100))
+
+
+def test_failed_item_does_not_stop_pipeline():
+    results = []
+
+    async def check(item: int) -> int | None:
+        if item == 3:
+            raise ValueError("bad item")
+        return None if item == 5 else item  # 返回 None 时丢弃
+
+    async def collect(item: int) -> None:
+        results.append(item)
+
+    async def main() -> dict:
+        pipeline = Pipeline("test")
+        pipeline.add_stage("check", check, workers=2, queue_size=1)
+        pipeline.add_stage("collect", collect, queue_size=1)
+        await wait_for(pipeline.run(numbers(10)), 5)
+        return pipeline.stats
+
+    stats = run(main())
+    assert sorted(results) == [0, 1, 2, 4, 6, 7, 8, 9]
+    assert stats["source"]["produced"] == 10
+    assert stats["check"]["processed"] == 9
+    assert stats["check"]["failed"] == 1
+    assert stats["collect"]["processed"] == 8
+
+
+def test_cancel_stops_every_worker():
+    started = Event()
+
+    async def block(item: int) -> None:
+        started.set()
+        await Event().wait()
+
+    async def main() -> None:
+        pipeline = Pipeline("test").add_stage("block", block, workers=2, queue_size=1)
+        task = create_task(pipeline.run(numbers(100)))
+        await started.wait()
+        task.cancel()
+        with pytest.raises(CancelledError):
+            await wait_for(task, 5)
+        assert all_tasks() == {current_task()}  # 没有遗留的阶段协程
+
+    run(main())
+
+
+def test_source_error_shuts_down_stages():
+    async def broken_source():
+        yield 1
+        raise RuntimeError("列出目录失败")
+
+    async def stage(item: int) -> int:
+        await sleep(0.01)
+        return item
+
+    async def main() -> None:
+        pipeline = Pipeline("test").add_stage("stage", stage).add_stage("next", stage)
+        await wait_for(pipeline.run(broken_source()), 5)
+
+    with pytest.raises(ExceptionGroup) as e:
+        run(main())
+    assert e.group_contains(RuntimeError)
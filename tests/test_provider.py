@@ -0,0 +1,14 @@
+from app.modules.alist.v3.client import AlistClient
+
+
+def test_get_provider_accepts_relative_paths():
+    client = AlistClient("http://alist.test", "", "", token="token")
+    client._AlistClient__set_provider("/media/", "115 Cloud")
+    client._AlistClient__set_provider("media/local", "Local")
+
+    assert client.get_provider("/media/movie.mkv") == "115 Cloud"
+    assert client.get_provider("media/movie.mkv") == "115 Cloud"
+    assert client.get_provider("/media/local/a/b.mkv") == "Local"
+    assert client.get_provider("other/file.mkv") == ""
+    assert client.get_provider("") == ""
+    assert client.get_provider("/") == ""
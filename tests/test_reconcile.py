@@ -0,0 +1,22 @@
+TREE = {"/media": [("e1.mkv", "m1")]}
+
+
+def test_edited_strm_is_rewritten(tmp_path, catalog, fake_client, run_alist2strm):
+    strm = tmp_path / "e1.strm"
+    run_alist2strm(fake_client(TREE, []), tmp_path, reconcile=True)
+    assert strm.read_text() == "/media/e1.mkv"
+
+    strm.write_text("/media/edited.mkv")
+    run_alist2strm(fake_client(TREE, []), tmp_path, reconcile=True)
+    assert strm.read_text() == "/media/e1.mkv"
+
+
+def test_unchanged_strm_is_not_rewritten(
+    tmp_path, catalog, fake_client, run_alist2strm
+):
+    strm = tmp_path / "e1.strm"
+    run_alist2strm(fake_client(TREE, []), tmp_path, reconcile=True)
+    mtime = strm.stat().st_mtime_ns
+
+    run_alist2strm(fake_client(TREE, []), tmp_path, reconcile=True)
+    assert strm.stat().st_mtime_ns == mtime
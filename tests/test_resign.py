@@ -0,0 +1,28 @@
+from app.utils import AlistSigner
+
+OPTIONS = {"mode": "AlistURL", "catalog": True}
+
+
+def test_resign_rewrites_strm_files_without_listing(
+    tmp_path, catalog, fake_client, run_alist2strm
+):
+    tree = {"/media": [("e1.mkv", "m1"), ("e2.mkv", "m1")]}
+    run_alist2strm(fake_client(tree, []), tmp_path, sign_secret="old", **OPTIONS)
+    old_sign = AlistSigner("old").sign("/media/e1.mkv")
+    assert old_sign in (tmp_path / "e1.strm").read_text()
+    (tmp_path / "e2.strm").unlink()  # 用户删除的文件不会重新生成
+
+    listed = []
+    run_alist2strm(
+        fake_client(tree, listed),
+        tmp_path,
+        action="resign",
+        sign_secret="new",
+        **OPTIONS,
+    )
+
+    assert listed == []
+    content = (tmp_path / "e1.strm").read_text()
+    assert AlistSigner("new").sign("/media/e1.mkv") in content
+    assert old_sign not in content
+    assert not (tmp_path / "e2.strm").exists()
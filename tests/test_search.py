@@ -0,0 +1,85 @@
+from asyncio import run
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.modules.alist import AlistClient
+
+TREE = {
+    "/media": [("show", "m1"), ("a.mkv", "m1"), ("a.nfo", "m1")],
+    "/media/show": [("e1.mkv", "m1"), ("e2.mp4", "m1"), ("poster.jpg", "m1")],
+}
+
+
+def listed_paths(server) -> list[str]:
+    return [body["path"] for path, body in server.calls if path == "/api/fs/list"]
+
+
+def searched_pages(server) -> list[int]:
+    return sorted(
+        body["page"] for path, body in server.calls if path == "/api/fs/search"
+    )
+
+
+def test_search_results_are_paginated(alist_server):
+    alist_server.tree = TREE
+
+    async def main() -> list[str]:
+        client = AlistClient(alist_server.url, "", "", token="token")
+        return [
+            path.path
+            async for path in client.iter_search("/media", per_page=2, max_workers=2)
+        ]
+
+    paths = run(main())
+    expected = [d + "/" + name for d, entries in TREE.items() for name, _ in entries]
+    assert sorted(paths) == sorted(expected)
+    assert searched_pages(alist_server) == [1, 2, 3]
+
+
+def test_search_backend_keeps_only_processed_files(
+    alist_server, tmp_path, catalog, run_alist2strm
+):
+    alist_server.tree = TREE
+    client = AlistClient(alist_server.url, "", "", token="token")
+    run_alist2strm(client, tmp_path, list_backend="search", list_per_page=2)
+
+    strm = sorted(str(p.relative_to(tmp_path)) for p in tmp_path.rglob("*.strm"))
+    assert strm == ["a.strm", "show/e1.strm", "show/e2.strm"]
+    assert listed_paths(alist_server) == []
+    # 列出阶段已丢弃不需要处理的文件，本地目录只记录目录及视频文件
+    assert catalog.count_prefix("task", "/media/") == 4
+
+
+def stale_index() -> dict:
+    last_done = datetime.now(timezone.utc) - timedelta(hours=25)
+    return {"obj_count": 5, "is_done": True, "last_done_time": last_done.isoformat()}
+
+
+@pytest.mark.parametrize(
+    "progress",
+    [
+        None,  # 没有管理员权限或未启用索引，接口返回错误
+        {"obj_count": 0, "is_done": True, "last_done_time": "", "error": ""},
+        {"obj_count": 5, "is_done": False, "last_done_time": "", "error": ""},
+        {"obj_count": 5, "is_done": True, "last_done_time": "", "error": "failed"},
+        stale_index(),
+    ],
+)
+def test_unusable_index_falls_back_to_listing(alist_server, progress):
+    alist_server.tree = TREE
+    alist_server.index_progress = progress
+
+    async def main() -> list[str]:
+        client = AlistClient(alist_server.url, "", "", token="token")
+        return [
+            path.path
+            async for path in client.iter_path(
+                "/media", is_detail=False, backend="search", index_max_age=24 * 3600
+            )
+        ]
+
+    paths = run(main())
+    assert len(paths) == 6
+    assert searched_pages(alist_server) == []
+    assert sorted(listed_paths(alist_server)) == ["/media", "/media/show"]
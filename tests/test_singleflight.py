@@ -0,0 +1,64 @@
+from asyncio import Event, create_task, gather, run, sleep
+
+import pytest
+
+from app.utils import SingleFlight
+
+
+def test_concurrent_calls_share_one_result():
+    flights = SingleFlight()
+    calls = []
+
+    async def load() -> int:
+        calls.append(1)
+        await sleep(0.01)
+        return 42
+
+    async def main() -> list[int]:
+        return await gather(*(flights.do("token", load) for _ in range(5)))
+
+    assert run(main()) == [42] * 5
+    assert len(calls) == 1
+    assert flights.shared == 4
+    assert "token" not in flights
+
+
+def test_error_is_shared_and_next_call_retries():
+    flights = SingleFlight()
+    calls = []
+
+    async def fail() -> None:
+        calls.append(1)
+        await sleep(0.01)
+        raise RuntimeError("login failed")
+
+    async def main() -> None:
+        results = await gather(
+            flights.do("token", fail), flights.do("token", fail), return_exceptions=True
+        )
+        assert all(isinstance(r, RuntimeError) for r in results)
+        with pytest.raises(RuntimeError):
+            await flights.do("token", fail)
+
+    run(main())
+    assert len(calls) == 2
+
+
+def test_cancelled_waiter_does_not_cancel_the_call():
+    flights = SingleFlight()
+    release = Event()
+
+    async def load() -> str:
+        await release.wait()
+        return "done"
+
+    async def main() -> str:
+        first = create_task(flights.do("token", load))
+        second = create_task(flights.do("token", load))
+        await sleep(0)
+        first.cancel()
+        await sleep(0)
+        release.set()
+        return await second
+
+    assert run(main()) == "done"
@@ -0,0 +1,74 @@
+from asyncio import run
+
+import pytest
+
+from app.modules.alist import AlistPath
+
+TREE = {
+    "/media": [("a", "m1"), ("b", "m1"), ("c.mkv", "m1")],
+    "/media/a": [("a1", "m1"), ("a.mkv", "m1")],
+    "/media/a/a1": [("a1.mkv", "m1"), ("a2.mkv", "m1")],
+    "/media/b": [("b.mkv", "m1")],
+}
+
+
+def walk(client, **kwargs) -> list[str]:
+    async def collect() -> list[str]:
+        return [
+            path.path
+            async for path in client.iter_path("/media", is_detail=False, **kwargs)
+        ]
+
+    return run(collect())
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_walks_every_entry_once(fake_client, max_workers):
+    listed = []
+    paths = walk(fake_client(TREE, listed), max_workers=max_workers, max_queue_size=1)
+    expected = {d + "/" + name for d, entries in TREE.items() for name, _ in entries}
+    assert sorted(paths) == sorted(expected)
+    assert sorted(listed) == sorted(TREE)
+
+
+def test_pruned_directory_subtree_is_not_listed(fake_client):
+    listed, counts = [], {}
+
+    def prune(path, count) -> bool:
+        counts[path.path] = count
+        return path.path == "/media/a"
+
+    paths = walk(fake_client(TREE, listed), prune=prune)
+    assert counts == {"/media/a": 2, "/media/b": 1}  # 起始目录不剪枝
+    assert "/media/a" in listed  # 剪枝目录本身仍会列出，用于比较直接条目数
+    assert "/media/a/a1" in paths  # 子目录本身仍会返回
+    assert "/media/a/a1" not in listed
+    assert "/media/a/a1/a1.mkv" not in paths  # 没有 replay 时不返回子树
+
+
+def test_pruned_subtree_is_replayed(fake_client):
+    listed, replayed = [], []
+
+    async def replay(dir_path: str):
+        replayed.append(dir_path)
+        for name in ("a1.mkv", "a2.mkv"):
+            yield AlistPath(path=f"{dir_path}/{name}", name=name)
+
+    paths = walk(
+        fake_client(TREE, listed),
+        prune=lambda path, count: path.path == "/media/a",
+        replay=replay,
+    )
+    assert replayed == ["/media/a/a1"]
+    assert "/media/a/a1" not in listed
+    assert {"/media/a/a1/a1.mkv", "/media/a/a1/a2.mkv"} <= set(paths)
+
+
+def test_listing_error_is_raised_to_consumer(fake_client):
+    tree = {
+        "/media": [("a", "m1"), ("broken", "m1")],
+        "/media/a": [("a.mkv", "m1")],
+        "/media/broken": None,
+    }
+    with pytest.raises(RuntimeError):
+        walk(fake_client(tree, []), max_workers=2)
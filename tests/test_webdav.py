@@ -0,0 +1,93 @@
+from asyncio import run
+
+import pytest
+
+from app.modules.alist import AlistClient
+from app.modules.alist.v3.webdav import PropfindParser
+
+MULTISTATUS = (
+    b'<?xml version="1.0" encoding="utf-8"?>'
+    b'<D:multistatus xmlns:D="DAV:">'
+    b"<D:response><D:href>/dav/media/</D:href><D:propstat><D:prop>"
+    b"<D:resourcetype><D:collection/></D:resourcetype>"
+    b"</D:prop></D:propstat></D:response>"
+    b"<D:response><D:href>http://alist.test/dav/media/%E7%94%B5%E5%BD%B1/</D:href>"
+    b"<D:propstat><D:prop><D:displayname>\xe7\x94\xb5\xe5\xbd\xb1</D:displayname>"
+    b"<D:resourcetype><D:collection/></D:resourcetype>"
+    b"<D:getlastmodified>Mon, 01 Jan 2024 08:00:00 GMT</D:getlastmodified>"
+    b"</D:prop></D:propstat></D:response>"
+    b"<D:response><D:href>/dav/media/a%20b.mkv</D:href><D:propstat><D:prop>"
+    b"<D:resourcetype/><D:getcontentlength>1024</D:getcontentlength>"
+    b"<D:getlastmodified>Tue, 02 Jan 2024 00:00:00 GMT</D:getlastmodified>"
+    b"</D:prop></D:propstat></D:response>"
+    b"<D:response><D:href>/other/x.mkv</D:href><D:propstat><D:prop>"
+    b"<D:resourcetype/></D:prop></D:propstat></D:response>"
+    b"</D:multistatus>"
+)
+
+
+def parse(chunk_size: int) -> list[dict]:
+    parser = PropfindParser("/dav/")
+    items = []
+    for start in range(0, len(MULTISTATUS), chunk_size):
+        items.extend(parser.feed(MULTISTATUS[start : start + chunk_size]))
+    items.extend(parser.close())
+    return items
+
+
+@pytest.mark.parametrize("chunk_size", [7, 64, len(MULTISTATUS)])
+def test_chunked_multistatus_is_parsed(chunk_size):
+    items = {item["path"]: item for item in parse(chunk_size)}
+    # 目录本身（/media）由调用方跳过，根路径之外的 href 被丢弃
+    assert list(items) == ["/media", "/media/电影", "/media/a b.mkv"]
+
+    directory = items["/media/电影"]
+    assert directory["is_dir"] and directory["name"] == "电影"
+    assert directory["modified"] == "2024-01-01T08:00:00Z"
+
+    file = items["/media/a b.mkv"]
+    assert not file["is_dir"]
+    assert file["name"] == "a b.mkv"
+    assert file["size"] == 1024
+    assert file["modified"] == "2024-01-02T00:00:00Z"
+
+
+def test_self_href_is_skipped(alist_server):
+    alist_server.tree = {"/media": [("a.mkv", "2024-01-01T00:00:00Z")]}
+
+    async def main() -> list[str]:
+        client = AlistClient(alist_server.url, "", "", token="token")
+        return [path.path async for path in client.iter_webdav("/media", depth="1")]
+
+    assert run(main()) == ["/media/a.mkv"]
+
+
+@pytest.mark.parametrize("dav_infinity", [True, False])
+def test_webdav_matches_api_listing(alist_server, dav_infinity):
+    alist_server.dav_infinity = dav_infinity  # 不支持时回退为逐个目录列出
+    alist_server.tree = {
+        "/media": [
+            ("电影", "2024-01-01T00:00:00Z"),
+            ("a b.mkv", "2024-01-02T00:00:00Z"),
+        ],
+        "/media/电影": [
+            ("c#1.mkv", "2024-01-03T00:00:00Z"),
+            ("s", "2024-01-04T00:00:00Z"),
+        ],
+        "/media/电影/s": [("d.mkv", "2024-01-05T12:30:00Z")],
+    }
+
+    async def main() -> tuple[list, list]:
+        client = AlistClient(alist_server.url, "", "", token="token")
+        webdav = [path async for path in client.iter_webdav("/media")]
+        api = [path async for path in client.iter_path("/media", is_detail=False)]
+        return webdav, api
+
+    def fields(paths) -> list[tuple]:
+        return sorted((p.path, p.name, p.is_dir, p.size, p.modified) for p in paths)
+
+    webdav, api = run(main())
+    assert fields(webdav) == fields(api)
+    assert len(webdav) == 5
+    depths = [call[1]["depth"] for call in alist_server.calls if "depth" in call[1]]
+    assert depths == (["infinity"] if dav_infinity else ["infinity", "1", "1", "1"])